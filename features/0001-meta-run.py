@@ -0,0 +1,156 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import itertools
+import json
+import os
+import shlex
+import sys
+import threading
+
+from awses_message_decryption_utils import RESULT_STATUSES, load_decrypt_requests, summarize_results
+from awses_message_encryption_utils import load_encrypt_requests
+from handler_protocol_utils import longest_first, run_pooled
+from keys_manifest_utils import load_keys_manifest
+from manifest_schema_utils import manifest_errors
+from manifest_utils import open_manifest, output_stream
+from meta_manifest_utils import aggregate_reports, manifest_graph, run_graph
+
+OPERATIONS = {"awses-encrypt": "encrypt", "awses-decrypt": "decrypt"}
+
+
+def _node_directories(nodes):
+    """Name a distinct output directory for every manifest, in the order in which manifests are listed."""
+    return {
+        name: "{:04d}-{}".format(index, os.path.basename(name).split(".")[0])
+        for index, name in enumerate(nodes)
+    }
+
+
+def _manifest_runner(nodes, parsed, results_stream):
+    """Build the function that validates and runs one manifest of a meta manifest.
+
+    Keys manifests are loaded once, through the per-process cache, and every manifest that depends on them
+    checks its master key references and builds its requests from that same copy.
+    Encrypt and decrypt manifests are run against a pool of warm handlers when a handler command is given;
+    every other manifest is only validated.
+
+    :param dict nodes: Map of node name to manifest node
+    :param parsed: Parsed CLI arguments
+    :param results_stream: Stream to which to write every test result, or None
+    """
+    command = shlex.split(parsed.handler_command) if parsed.handler_command else None
+    directories = _node_directories(nodes)
+    lock = threading.Lock()
+
+    def _run(node):
+        key_names = None
+        for dependency in node.depends_on:
+            if nodes[dependency].type == "keys":
+                key_names = frozenset(load_keys_manifest(dependency)["keys"])
+        with open_manifest(node.name) as (header, tests):
+            errors = list(itertools.islice(manifest_errors(header, tests, key_names), parsed.max_errors))
+        if errors:
+            return {"status": "invalid", "errors": errors}
+
+        if node.type == "keys":
+            return {"status": "pass", "keys": len(load_keys_manifest(node.name)["keys"])}
+        if node.type not in OPERATIONS or command is None:
+            return {"status": "pass", "run": False}
+
+        operation = OPERATIONS[node.type]
+        output_directory = os.path.join(parsed.output_dir, directories[node.name])
+        if operation == "encrypt":
+            plaintext_cache = parsed.plaintext_cache or os.path.join(parsed.output_dir, "plaintexts")
+            requests = load_encrypt_requests(node.name, plaintext_cache)
+        else:
+            requests = load_decrypt_requests(node.name)
+        if parsed.longest_first:
+            requests = longest_first(requests)
+
+        counts = {}
+        results = run_pooled(
+            command,
+            operation,
+            requests,
+            os.path.join(output_directory, operation),
+            parsed.workers,
+            parsed.timeout,
+            parsed.startup_timeout,
+        )
+        for result in summarize_results(results, counts):
+            if results_stream is not None:
+                with lock:
+                    results_stream.write(json.dumps(dict(result, manifest=node.uri)) + "\n")
+                    results_stream.flush()
+        return {"status": "fail" if counts["fail"] + counts["timeout"] else "pass", "run": True, "counts": counts}
+
+    return _run
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Validate and run every manifest that a meta manifest identifies, "
+        "loading shared manifests once and running independent manifests concurrently."
+    )
+    parser.add_argument("manifest", help="Meta manifest to run")
+    parser.add_argument(
+        "--handler-command",
+        help="Command that starts a handler speaking the handler protocol "
+        "(default: only validate encrypt and decrypt manifests)",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of manifests to run at once")
+    parser.add_argument("--workers", type=int, default=1, help="Number of warm handlers for each manifest")
+    parser.add_argument("--timeout", type=float, help="Per-test timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, help="Seconds to wait for each handler to start")
+    parser.add_argument("--output-dir", help="Directory to which handlers write their output")
+    parser.add_argument(
+        "--plaintext-cache",
+        help="Plaintext cache directory for encrypt manifests (default: plaintexts in --output-dir)",
+    )
+    parser.add_argument(
+        "--longest-first", action="store_true", help="Start the most expensive tests first, by cost hint or file size"
+    )
+    parser.add_argument(
+        "--max-errors", type=int, default=100, help="Stop validating a manifest after this many errors (default: 100)"
+    )
+    parser.add_argument("--results", help="File to which to write every test result, tagged with its manifest")
+    parser.add_argument("--output", default="-", help="File to which to write the aggregated report (default: stdout)")
+
+    parsed = parser.parse_args(args)
+    if parsed.handler_command and not parsed.output_dir:
+        parser.error("--output-dir is required with --handler-command")
+
+    nodes = manifest_graph(parsed.manifest)
+    order = {name: index for index, name in enumerate(nodes)}
+    if parsed.results:
+        with output_stream(parsed.results) as results_stream:
+            reports = list(run_graph(nodes, _manifest_runner(nodes, parsed, results_stream), parsed.jobs))
+    else:
+        reports = list(run_graph(nodes, _manifest_runner(nodes, parsed, None), parsed.jobs))
+    reports.sort(key=lambda report: order[report["path"]])
+
+    report = aggregate_reports(reports, RESULT_STATUSES)
+    with output_stream(parsed.output) as stream:
+        stream.write(json.dumps(report, indent=4) + "\n")
+
+    print(json.dumps({"manifests": report["manifests"], "counts": report["counts"]}), file=sys.stderr)
+    return int(any(manifest_report["status"] != "pass" for manifest_report in reports))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,9 @@ import json
 import sys
 
 VERSION = 3
+# Members that every key of each type must define in a keys manifest of this version
+RAW_KEY_MEMBERS = ("key-id", "encrypt", "decrypt", "algorithm", "type", "bits", "encoding", "material")
+AWS_KMS_KEY_MEMBERS = ("type", "key-id", "encrypt", "decrypt")
 AES_KEYS = (
     (128, b"\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x10\x11\x12\x13\x14\x15"),
     (
@@ -172,8 +175,10 @@ def _test_manifest(manifest):
     :param dict manifest: keys manifest to test
     """
     for key, value in manifest["keys"].items():
-        if "key-id" not in value:
-            raise ValueError('Invalid key specification: "{}" does not define key ID.'.format(key))
+        required = AWS_KMS_KEY_MEMBERS if value.get("type") == "aws-kms" else RAW_KEY_MEMBERS
+        missing = [member for member in required if member not in value]
+        if missing:
+            raise ValueError('Invalid key specification: "{}" does not define {}.'.format(key, ", ".join(missing)))
 
 
 def main(args=None):
@@ -0,0 +1,88 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import os
+import shlex
+import sys
+
+from awses_message_decryption_utils import load_archive_requests, load_decrypt_requests, run_tests, summarize_results
+from manifest_utils import output_stream
+from result_report_utils import ResultCollector, collected_results
+from vector_archive_utils import is_archive
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Run an AWS Encryption SDK message decryption manifest against a decrypt handler."
+    )
+    parser.add_argument("manifest", help="Decrypt manifest, or archive written by awses-vector-pack.py, to run")
+    handler = parser.add_mutually_exclusive_group(required=True)
+    handler.add_argument(
+        "--handler-command",
+        help="Command that reads a JSON request on stdin and writes the plaintext to stdout, "
+        "exiting with a non-zero status if decryption fails",
+    )
+    handler.add_argument(
+        "--handler-callable",
+        help='Python callable, as "module:function", that takes a request and returns the plaintext, '
+        "raising an exception if decryption fails",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Maximum number of worker processes")
+    parser.add_argument("--timeout", type=float, help="Per-test timeout in seconds")
+    parser.add_argument(
+        "--keys-cache",
+        help="Directory in which to cache decoded key material for handlers to load quickly "
+        "(not used for archives, which hold their keys)",
+    )
+    parser.add_argument("--output", default="-", help="File to which to write test results (default: stdout)")
+    parser.add_argument(
+        "--summary",
+        help="File to which to write a summary of test timing and resource usage "
+        "by algorithm suite, frame size, and master key provider types",
+    )
+
+    parsed = parser.parse_args(args)
+
+    if parsed.handler_command:
+        handler_kind, handler_spec = "command", shlex.split(parsed.handler_command)
+    else:
+        handler_kind, handler_spec = "callable", parsed.handler_callable
+
+    counts = {}
+    collector = ResultCollector()
+    if is_archive(parsed.manifest):
+        requests = load_archive_requests(parsed.manifest)
+    else:
+        requests = load_decrypt_requests(parsed.manifest, parsed.keys_cache)
+    results = summarize_results(run_tests(handler_kind, handler_spec, requests, parsed.jobs, parsed.timeout), counts)
+    results = collected_results(results, collector)
+    with output_stream(parsed.output) as stream:
+        for result in results:
+            stream.write(json.dumps(result) + "\n")
+            stream.flush()
+
+    if parsed.summary:
+        with output_stream(parsed.summary) as stream:
+            stream.write(json.dumps(collector.summary(), indent=4) + "\n")
+
+    print(json.dumps(counts), file=sys.stderr)
+    return int(counts["fail"] + counts["timeout"] > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
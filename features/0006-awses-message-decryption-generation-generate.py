@@ -14,167 +14,192 @@
 # Only Python 3.7+ compatibility is guaranteed.
 
 import argparse
-import json
-import os
 import sys
-import uuid
-from urllib.parse import urlunparse
 
 from awses_message_encryption_utils import (
-    ALGORITHM_SUITES,
-    ENCRYPTION_CONTEXTS,
-    FRAME_SIZES,
-    PLAINTEXTS,
+    BYTE_TAMPERINGS,
     RAW_RSA_PADDING_ALGORITHMS,
+    TAMPERINGS,
     UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
-    _providers,
+    CoverageCheck,
+    TestCountCheck,
     _raw_aes_providers,
+    build_throughput_tests,
+    deterministic_test_id_builder,
+    expected_test_counts,
+    expected_throughput_test_counts,
+    matrix_dimensions,
+    random_test_id,
+    scenario_matrix,
 )
+from generator_utils import ManifestGenerator, add_generator_arguments, run_generator
+from keys_manifest_utils import keys_manifest
+from manifest_utils import MESSAGE_MANIFEST_VERSION as MANIFEST_VERSION
+from manifest_utils import SHARED_TAMPERING_MANIFEST_VERSION
 
-MANIFEST_VERSION = 2
-
-TAMPERINGS = (
-    "truncate",
-    "mutate",
-    "half-sign",
-)
+# Plaintexts of the scenario matrix
+MATRIX_PLAINTEXTS = ("small", "zero")
 
 
-def _build_tests(keys):
+def _build_tests(
+    keys, test_id=random_test_id, throughput=False, coverage=None, coverage_seed=0, shared_tamperings=False
+):
     """Build all tests to define in manifest, building from current rules and provided keys manifest.
 
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
+    :param callable test_id: Function that builds a test ID given a test description
+    :param bool throughput: Whether to also build the throughput tests
+    :param int coverage: Number of dimensions whose every combination of values must be covered,
+        or None for every scenario in the matrix
+    :param int coverage_seed: Seed that selects between equally small sets of covering scenarios
+    :param bool shared_tamperings: Whether to build a single test for all byte tamperings,
+        so that they are all derived from one encryption
     """
-    for algorithm in ALGORITHM_SUITES:
-        for frame_size in FRAME_SIZES:
-            for ec in ENCRYPTION_CONTEXTS:
-                for provider_set in _providers(keys):
-                    yield (
-                        str(uuid.uuid4()),
-                        {
-                            "encryption-scenario": {
-                                "plaintext": "small",
-                                "algorithm": algorithm,
-                                "frame-size": frame_size,
-                                "encryption-context": ec,
-                                "master-keys": provider_set,
-                            }
-                        },
-                    )
-
-    for algorithm in ALGORITHM_SUITES:
-        for frame_size in FRAME_SIZES:
-            for ec in ENCRYPTION_CONTEXTS:
-                for provider_set in _providers(keys):
-                    yield (
-                        str(uuid.uuid4()),
-                        {
-                            "encryption-scenario": {
-                                "plaintext": "zero",
-                                "algorithm": algorithm,
-                                "frame-size": frame_size,
-                                "encryption-context": ec,
-                                "master-keys": provider_set,
-                            }
-                        },
-                    )
-
-    yield (
-        str(uuid.uuid4()),
-        {
-            "encryption-scenario": {
-                "plaintext": "tiny",
-                "algorithm": "0178",
-                "frame-size": 512,
-                "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
-                "master-keys": next(_raw_aes_providers(keys)),
-            },
-            "decryption-method": "streaming-unsigned-only",
+    keys = keys_manifest(keys)
+    raw_aes_provider = next(_raw_aes_providers(keys))
+
+    for scenario in scenario_matrix(matrix_dimensions(keys, MATRIX_PLAINTEXTS), coverage, coverage_seed):
+        test = {"encryption-scenario": scenario}
+        yield test_id(test), test
+
+    test = {
+        "encryption-scenario": {
+            "plaintext": "tiny",
+            "algorithm": "0178",
+            "frame-size": 512,
+            "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
+            "master-keys": raw_aes_provider,
         },
-    )
-
-    yield (
-        str(uuid.uuid4()),
-        {
+        "decryption-method": "streaming-unsigned-only",
+    }
+    yield test_id(test), test
+
+    test = {
+        "encryption-scenario": {
+            "plaintext": "tiny",
+            "algorithm": "0378",
+            "frame-size": 512,
+            "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
+            "master-keys": raw_aes_provider,
+        },
+        "decryption-method": "streaming-unsigned-only",
+        "result": {"error": {"error-description": "Signed message input to streaming unsigned-only decryption method"}},
+    }
+    yield test_id(test), test
+
+    tamperings = TAMPERINGS
+    if shared_tamperings:
+        # Half-sign changes how the message is encrypted, so it cannot share the encryption
+        tamperings = [list(BYTE_TAMPERINGS)]
+        tamperings.extend(tampering for tampering in TAMPERINGS if tampering not in BYTE_TAMPERINGS)
+    for tampering in tamperings:
+        test = {
             "encryption-scenario": {
                 "plaintext": "tiny",
-                "algorithm": "0378",
+                "algorithm": "0478" if tampering == "half-sign" else "0578",
                 "frame-size": 512,
                 "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
-                "master-keys": next(_raw_aes_providers(keys)),
-            },
-            "decryption-method": "streaming-unsigned-only",
-            "result": {
-                "error": {"error-description": "Signed message input to streaming unsigned-only decryption method"}
+                "master-keys": raw_aes_provider,
             },
+            "tampering": tampering,
+        }
+        yield test_id(test), test
+
+    test = {
+        "encryption-scenario": {
+            "plaintext": "tiny",
+            "algorithm": "0578",
+            "frame-size": 512,
+            "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
+            "master-keys": raw_aes_provider,
         },
-    )
+        "tampering": {"change-edk-provider-info": ["arn:aws:kms:us-west-2:658956600833:alias/EncryptOnly"]},
+        "decryption-master-keys": [{"type": "aws-kms", "key": "us-west-2-encrypt-only"}],
+    }
+    yield test_id(test), test
 
-    for tampering in TAMPERINGS:
-        yield (
-            str(uuid.uuid4()),
-            {
-                "encryption-scenario": {
-                    "plaintext": "tiny",
-                    "algorithm": "0478" if tampering == "half-sign" else "0578",
-                    "frame-size": 512,
-                    "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
-                    "master-keys": next(_raw_aes_providers(keys)),
-                },
-                "tampering": tampering,
-            },
-        )
+    if throughput:
+        for _name, scenario in build_throughput_tests(keys, lambda _test: None):
+            test = {"encryption-scenario": scenario}
+            yield test_id(test), test
 
-    yield (
-        str(uuid.uuid4()),
-        {
-            "encryption-scenario": {
-                "plaintext": "tiny",
-                "algorithm": "0578",
-                "frame-size": 512,
-                "encryption-context": UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
-                "master-keys": next(_raw_aes_providers(keys)),
-            },
-            "tampering": {"change-edk-provider-info": ["arn:aws:kms:us-west-2:658956600833:alias/EncryptOnly"]},
-            "decryption-master-keys": [{"type": "aws-kms", "key": "us-west-2-encrypt-only"}],
-        },
-    )
+
+def _encryption_scenario(test):
+    """Extract the encryption scenario from a decrypt generation test description.
+
+    :param dict test: Decrypt generation test description
+    """
+    return test["encryption-scenario"]
 
 
-def build_manifest(keys_filename):
-    """Build the test-case manifest which directs the behavior of cross-compatibility clients.
+def _expected_test_counts(keys, throughput=False, shared_tamperings=False):
+    """Count the tests that ``_build_tests`` builds for each master key family.
 
-    :param str keys_file: Name of file containing the keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
+    :param bool throughput: Whether to count the throughput tests
+    :param bool shared_tamperings: Whether all byte tamperings share a single test
     """
-    with open(keys_filename, "r") as keys_file:
-        keys = json.load(keys_file)
+    counts = {family: len(MATRIX_PLAINTEXTS) * count for family, count in expected_test_counts(keys).items()}
+    tampering_count = len(TAMPERINGS)
+    if shared_tamperings:
+        tampering_count += 1 - len(BYTE_TAMPERINGS)
+    # Both streaming-unsigned-only tests, every tampering, and the changed EDK provider info test
+    # all use the first raw AES provider.
+    counts["aes"] += 2 + tampering_count + 1
+    if throughput:
+        for family, count in expected_throughput_test_counts(keys).items():
+            counts[family] += count
+    return counts
+
+
+def _test_check(keys, scenario_options):
+    """Build the validation of the tests of a manifest: exact test counts for the full scenario matrix,
+    or complete coverage for a covering subset of it.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    :param dict scenario_options: Keyword arguments for ``_build_tests``
+    """
+    if scenario_options.get("coverage") is None:
+        return TestCountCheck(
+            _expected_test_counts(
+                keys, scenario_options.get("throughput", False), scenario_options.get("shared_tamperings", False)
+            )
+        )
+    return CoverageCheck(matrix_dimensions(keys, MATRIX_PLAINTEXTS), scenario_options["coverage"])
 
-    keys_path = "/".join(keys_filename.split(os.path.sep))
-    keys_uri = urlunparse(("file", keys_path, "", "", "", ""))
 
-    return {
-        "manifest": {"type": "awses-decrypt-generate", "version": MANIFEST_VERSION},
-        "keys": keys_uri,
-        "plaintexts": PLAINTEXTS,
-        "tests": dict(_build_tests(keys)),
-    }
+GENERATOR = ManifestGenerator(
+    "awses-decrypt-generate",
+    _build_tests,
+    _test_check,
+    _encryption_scenario,
+    {"shared_tamperings": SHARED_TAMPERING_MANIFEST_VERSION},
+)
+
+build_manifest = GENERATOR.build_manifest
+stream_manifest = GENERATOR.stream_manifest
+stream_sharded_manifest = GENERATOR.stream_sharded_manifest
 
 
 def main(args=None):
     """Entry point for CLI"""
     parser = argparse.ArgumentParser(description="Build an AWS Encryption SDK decrypt message generation manifest.")
-    parser.add_argument("--human", action="store_true", help="Print human-readable JSON")
-    parser.add_argument("--keys", required=True, help="Keys manifest to use")
+    add_generator_arguments(parser, "plaintext, algorithm suite, frame size, encryption context, and master keys")
+    parser.add_argument(
+        "--shared-tamperings",
+        action="store_true",
+        help="Build a single test for all byte tamperings, so that they are derived from one encryption",
+    )
 
     parsed = parser.parse_args(args)
 
-    manifest = build_manifest(parsed.keys)
-
-    kwargs = {}
-    if parsed.human:
-        kwargs["indent"] = 4
-
-    return json.dumps(manifest, **kwargs)
+    scenario_options = {
+        "throughput": parsed.throughput,
+        "coverage": parsed.coverage,
+        "coverage_seed": parsed.coverage_seed,
+        "shared_tamperings": parsed.shared_tamperings,
+    }
+    return run_generator(GENERATOR, parser, parsed, scenario_options)
 
 
 if __name__ == "__main__":
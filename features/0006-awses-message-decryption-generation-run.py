@@ -0,0 +1,145 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import os
+import shlex
+import sys
+
+from awses_message_decryption_generation_utils import (
+    load_encryption_groups,
+    tampered_vectors,
+    tampering_methods,
+    write_chunks,
+)
+from awses_message_encryption_utils import encrypt_request
+from handler_protocol_utils import output_path, run_pooled
+from keys_manifest_utils import load_keys_manifest
+from manifest_utils import file_uri, write_manifest
+from plaintext_utils import PlaintextCache
+
+DECRYPT_MANIFEST_VERSION = 3
+
+
+def _decrypt_tests(name, test, ciphertext, output_directory, plaintext):
+    """Derive the decrypt tests of one decrypt generation test from the ciphertext of its encryption scenario.
+
+    Each tampered vector is written to a file next to the good ciphertext before its test is yielded.
+
+    :param str name: Test ID of the decrypt generation test
+    :param dict test: Decrypt generation test description in the inline layout
+    :param str ciphertext: Path to the good ciphertext of the encryption scenario
+    :param str output_directory: Directory containing the decrypt manifest
+    :param str plaintext: Path to the plaintext of the encryption scenario
+    :returns: Iterator of (test ID, decrypt test description) pairs
+    """
+    base = {"master-keys": test.get("decryption-master-keys", test["encryption-scenario"]["master-keys"])}
+    if "decryption-method" in test:
+        base["decryption-method"] = test["decryption-method"]
+
+    if "tampering" not in test:
+        result = test.get("result", {"output": {"plaintext": file_uri(plaintext, output_directory)}})
+        yield name, dict(base, ciphertext=file_uri(ciphertext, output_directory), result=result)
+        return
+
+    for method in tampering_methods(test["tampering"]):
+        for suffix, description, chunks in tampered_vectors(method, ciphertext):
+            vector_name = "{}-{}".format(name, suffix)
+            vector = output_path(os.path.dirname(ciphertext), vector_name)
+            write_chunks(chunks, vector)
+            result = {"error": {"error-description": description}}
+            yield vector_name, dict(base, ciphertext=file_uri(vector, output_directory), result=result)
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Generate an AWS Encryption SDK message decryption manifest and its vectors "
+        "from a decryption generation manifest, encrypting each scenario once on a pool of warm handlers."
+    )
+    parser.add_argument("manifest", help="Decrypt generation manifest to run")
+    parser.add_argument(
+        "--handler-command", required=True, help="Command that starts a handler speaking the handler protocol"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of warm handlers")
+    parser.add_argument("--timeout", type=float, help="Per-encryption timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, help="Seconds to wait for each handler to start")
+    parser.add_argument(
+        "--output-dir", required=True, help="Directory to which to write the decrypt manifest and its vectors"
+    )
+    parser.add_argument("--plaintext-cache", help="Plaintext cache directory (default: plaintexts in --output-dir)")
+    parser.add_argument("--client-name", required=True, help="Name of the client that the handler runs")
+    parser.add_argument("--client-version", required=True, help="Version of the client that the handler runs")
+    parser.add_argument("--human", action="store_true", help="Write human-readable JSON")
+
+    parsed = parser.parse_args(args)
+
+    os.makedirs(parsed.output_dir, exist_ok=True)
+    header, keys_filename, groups, underivable = load_encryption_groups(parsed.manifest)
+    keys = load_keys_manifest(keys_filename)
+    plaintext_cache = parsed.plaintext_cache or os.path.join(parsed.output_dir, "plaintexts")
+    plaintexts = PlaintextCache(plaintext_cache).paths(header["plaintexts"])
+    by_name = {group.name: group for group in groups}
+    requests = (encrypt_request(group.name, group.scenario, keys, keys_filename, plaintexts) for group in groups)
+    results = run_pooled(
+        shlex.split(parsed.handler_command),
+        "encrypt",
+        requests,
+        os.path.join(parsed.output_dir, "ciphertexts"),
+        parsed.workers,
+        parsed.timeout,
+        parsed.startup_timeout,
+    )
+
+    failed = []
+
+    def _tests():
+        # Vectors of each scenario are derived and written as soon as its encryption finishes
+        for result in results:
+            group = by_name[result["test"]]
+            if result["status"] != "pass":
+                failed.append({"test": group.name, "status": result["status"], "detail": result.get("detail")})
+                continue
+            ciphertext = output_path(os.path.join(parsed.output_dir, "ciphertexts"), group.name)
+            for name, test in group.tests:
+                for decrypt_test in _decrypt_tests(
+                    name, test, ciphertext, parsed.output_dir, plaintexts[group.scenario["plaintext"]]
+                ):
+                    yield decrypt_test
+
+    decrypt_header = {
+        "manifest": {"type": "awses-decrypt", "version": DECRYPT_MANIFEST_VERSION},
+        "client": {"name": parsed.client_name, "version": parsed.client_version},
+        "keys": file_uri(keys_filename, parsed.output_dir),
+    }
+    with open(os.path.join(parsed.output_dir, "manifest.json"), "w") as manifest_file:
+        written = write_manifest(manifest_file, decrypt_header, _tests(), 4 if parsed.human else None)
+        manifest_file.write("\n")
+
+    report = {
+        "encryptions": len(groups),
+        "tests": written,
+        "failed": failed,
+        "underivable": [
+            {"test": name, "tampering": tampering_methods(test["tampering"])} for name, test in underivable
+        ],
+    }
+    print(json.dumps(report), file=sys.stderr)
+    return int(bool(failed))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
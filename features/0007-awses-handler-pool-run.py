@@ -0,0 +1,100 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import os
+import shlex
+import sys
+
+from awses_message_decryption_utils import load_decrypt_requests, summarize_results
+from awses_message_encryption_utils import load_encrypt_requests
+from handler_protocol_utils import longest_first, run_pooled
+from manifest_utils import open_manifest, output_stream
+from result_report_utils import ResultCollector, collected_results
+
+OPERATIONS = {"awses-encrypt": "encrypt", "awses-decrypt": "decrypt"}
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Run an AWS Encryption SDK message encryption or decryption manifest "
+        "against a pool of warm handlers."
+    )
+    parser.add_argument("manifest", help="Encrypt or decrypt manifest to run")
+    parser.add_argument(
+        "--handler-command", required=True, help="Command that starts a handler speaking the handler protocol"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of warm handlers")
+    parser.add_argument("--timeout", type=float, help="Per-test timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, help="Seconds to wait for each handler to start")
+    parser.add_argument("--output-dir", required=True, help="Directory to which handlers write their output")
+    parser.add_argument(
+        "--plaintext-cache",
+        help="Plaintext cache directory for encrypt manifests (default: plaintexts in --output-dir)",
+    )
+    parser.add_argument(
+        "--longest-first", action="store_true", help="Start the most expensive tests first, by cost hint or file size"
+    )
+    parser.add_argument("--output", default="-", help="File to which to write test results (default: stdout)")
+    parser.add_argument(
+        "--summary",
+        help="File to which to write a summary of test timing and resource usage "
+        "by algorithm suite, frame size, and master key provider types",
+    )
+
+    parsed = parser.parse_args(args)
+
+    with open_manifest(parsed.manifest) as (header, _tests):
+        manifest_type = header["manifest"]["type"]
+    if manifest_type not in OPERATIONS:
+        parser.error('Unsupported manifest type: "{}"'.format(manifest_type))
+
+    operation = OPERATIONS[manifest_type]
+    if operation == "encrypt":
+        plaintext_cache = parsed.plaintext_cache or os.path.join(parsed.output_dir, "plaintexts")
+        requests = load_encrypt_requests(parsed.manifest, plaintext_cache)
+    else:
+        requests = load_decrypt_requests(parsed.manifest)
+    if parsed.longest_first:
+        requests = longest_first(requests)
+
+    counts = {}
+    collector = ResultCollector()
+    results = run_pooled(
+        shlex.split(parsed.handler_command),
+        operation,
+        requests,
+        os.path.join(parsed.output_dir, operation),
+        parsed.workers,
+        parsed.timeout,
+        parsed.startup_timeout,
+    )
+    with output_stream(parsed.output) as stream:
+        for result in collected_results(summarize_results(results, counts), collector):
+            stream.write(json.dumps(result) + "\n")
+            stream.flush()
+
+    if parsed.summary:
+        with output_stream(parsed.summary) as stream:
+            stream.write(json.dumps(collector.summary(), indent=4) + "\n")
+
+    print(json.dumps(counts), file=sys.stderr)
+    return int(counts["fail"] + counts["timeout"] > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GENERATORS = {
+    "0003": "0003-awses-message-encryption-generate.py",
+    "0006": "0006-awses-message-decryption-generation-generate.py",
+}
+CANONICAL_KEYS = os.path.join(HERE, "CANONICAL-GENERATED-MANIFESTS", "0002-keys.v3.json")
+MODES = ("build", "stream")
+# Baseline for the default scales in every mode, measured with --save-baseline
+BASELINE = os.path.join(HERE, "awses-generator-benchmark-baseline.json")
+
+
+def _load_generator(generator):
+    """Import a generator script, whose file name is not a valid module name.
+
+    :param str generator: Generator feature number
+    """
+    spec = importlib.util.spec_from_file_location("generator_" + generator, os.path.join(HERE, GENERATORS[generator]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _peak_rss_bytes():
+    """Get the peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak
+    return peak * 1024
+
+
+def measure(generator, keys_filename, mode):
+    """Run a generator once in this process and measure it.
+
+    The "build" mode builds the whole manifest in memory and serializes it, as the CLI does by default.
+    The "stream" mode writes each test to a temporary file as it is built.
+
+    :param str generator: Generator feature number
+    :param str keys_filename: Name of file containing the keys manifest
+    :param str mode: "build" or "stream"
+    :returns: Map of metric name to value
+    :rtype: dict
+    """
+    module = _load_generator(generator)
+    build_test_id = module.deterministic_test_id_builder()
+    test_count = [0]
+
+    def test_id(test):
+        test_count[0] += 1
+        return build_test_id(test)
+
+    start = time.perf_counter()
+    if mode == "build":
+        output_bytes = len(json.dumps(module.build_manifest(keys_filename, test_id)).encode("utf-8"))
+    else:
+        with tempfile.TemporaryFile("w+") as output_file:
+            module.stream_manifest(keys_filename, output_file, test_id=test_id)
+            output_bytes = output_file.tell()
+    return {
+        "wall-seconds": time.perf_counter() - start,
+        "peak-rss-bytes": _peak_rss_bytes(),
+        "output-bytes": output_bytes,
+        "test-count": test_count[0],
+    }
+
+
+def scaled_keys_manifest(keys_filename, scale, output_filename):
+    """Write a synthetic keys manifest with ``scale`` copies of every key in a keys manifest.
+
+    :param str keys_filename: Name of file containing the keys manifest to scale
+    :param int scale: Number of copies of every key
+    :param str output_filename: Name of file to which to write the scaled keys manifest
+    """
+    with open(keys_filename, "r") as keys_file:
+        manifest = json.load(keys_file)
+
+    keys = {}
+    for copy in range(scale):
+        for name, key in manifest["keys"].items():
+            keys[name if copy == 0 else "{}-x{}".format(name, copy)] = key
+    manifest["keys"] = keys
+
+    with open(output_filename, "w") as output_file:
+        json.dump(manifest, output_file)
+
+
+def _measure_in_subprocess(generator, directory, keys_filename, mode):
+    """Measure a generator in a fresh interpreter, so that peak memory is not shared between cases.
+
+    The generator runs in the directory of the keys manifest, so that the keys URI that it writes
+    and therefore the output size do not depend on where the keys manifest is.
+    """
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", generator, keys_filename, mode],
+        stdout=subprocess.PIPE,
+        cwd=directory,
+        check=True,
+    )
+    return json.loads(completed.stdout.decode("utf-8"))
+
+
+def run_benchmarks(generators, scales, modes, keys_filename=CANONICAL_KEYS):
+    """Measure every combination of generator, keys scale, and mode.
+
+    :param list generators: Generator feature numbers
+    :param list scales: Keys manifest scale factors
+    :param list modes: Generator modes
+    :param str keys_filename: Name of file containing the keys manifest to scale
+    :returns: Map of case name to map of metric name to value
+    :rtype: dict
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for scale in scales:
+            scaled_keys = "keys-x{}.json".format(scale)
+            scaled_keys_manifest(keys_filename, scale, os.path.join(scratch, scaled_keys))
+            for generator in generators:
+                for mode in modes:
+                    case = "{}/keys-x{}/{}".format(generator, scale, mode)
+                    results[case] = _measure_in_subprocess(generator, scratch, scaled_keys, mode)
+    return results
+
+
+def compare_to_baseline(results, baseline, thresholds):
+    """Find every measurement that exceeds its baseline by more than the threshold for its metric.
+
+    Cases that are not in the baseline, and metrics that are not in the baseline or have no threshold,
+    are not compared.
+
+    :param dict results: Map of case name to map of metric name to value
+    :param dict baseline: Map of case name to map of metric name to baseline value
+    :param dict thresholds: Map of metric name to largest allowed relative increase
+    :returns: Descriptions of all regressions
+    :rtype: list
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric not in thresholds or case not in baseline or metric not in baseline[case]:
+                continue
+            limit = baseline[case][metric] * (1 + thresholds[metric])
+            if value > limit:
+                regressions.append(
+                    "{case} {metric}: {value:.6g} exceeds baseline {baseline:.6g} by more than {threshold:.0%}".format(
+                        case=case,
+                        metric=metric,
+                        value=value,
+                        baseline=baseline[case][metric],
+                        threshold=thresholds[metric],
+                    )
+                )
+    return regressions
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the message manifest generators against scaled keys manifests."
+    )
+    parser.add_argument("--measure", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--generators", nargs="+", default=sorted(GENERATORS), choices=sorted(GENERATORS), help="Generators to run"
+    )
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10], help="Keys manifest scale factors")
+    parser.add_argument("--modes", nargs="+", default=["build"], choices=MODES, help="Generator modes")
+    parser.add_argument("--keys", default=CANONICAL_KEYS, help="Keys manifest to scale")
+    parser.add_argument(
+        "--baseline", help="Baseline results to compare against (default with --check: the committed baseline)"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with an error if the output size or test count of any case exceeds the baseline",
+    )
+    parser.add_argument(
+        "--check-resources",
+        action="store_true",
+        help="Also compare wall time and peak memory, which only match a baseline recorded on the same machine",
+    )
+    parser.add_argument("--save-baseline", help="File to which to write the results as a new baseline")
+    parser.add_argument(
+        "--time-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative increase in wall time, with --check-resources",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative increase in peak memory, with --check-resources",
+    )
+    parser.add_argument(
+        "--output-threshold", type=float, default=0.0, help="Allowed relative increase in output size"
+    )
+
+    parsed = parser.parse_args(args)
+
+    if parsed.measure:
+        print(json.dumps(measure(*parsed.measure)))
+        return None
+
+    results = run_benchmarks(parsed.generators, parsed.scales, parsed.modes, parsed.keys)
+    print(json.dumps(results, indent=4))
+
+    if parsed.save_baseline:
+        with open(parsed.save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=4)
+
+    baseline_filename = parsed.baseline or (BASELINE if parsed.check or parsed.check_resources else None)
+    if baseline_filename:
+        if not os.path.exists(baseline_filename):
+            print(
+                "No baseline at {}; nothing to compare against. Record one with --save-baseline.".format(
+                    baseline_filename
+                ),
+                file=sys.stderr,
+            )
+            return None
+        with open(baseline_filename, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        # Output size and test count do not depend on the machine, but wall time and peak memory do
+        thresholds = {"output-bytes": parsed.output_threshold, "test-count": 0.0}
+        if parsed.check_resources:
+            thresholds.update({"wall-seconds": parsed.time_threshold, "peak-rss-bytes": parsed.memory_threshold})
+        regressions = compare_to_baseline(results, baseline, thresholds)
+        if regressions:
+            return "Benchmark regressions:\n" + "\n".join(regressions)
+
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
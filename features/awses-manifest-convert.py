@@ -0,0 +1,113 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import sys
+
+from awses_message_encryption_utils import ScenarioTables
+from manifest_utils import (
+    COMPRESSIONS,
+    MANIFEST_FORMATS,
+    MANIFEST_WRITERS,
+    MESSAGE_MANIFEST_VERSION,
+    NORMALIZED_MANIFEST_VERSION,
+    SERIALIZED_MANIFEST_VERSION,
+    SHARED_TAMPERING_MANIFEST_VERSION,
+    open_manifest,
+    output_stream,
+)
+
+CONVERTIBLE_TYPES = ("awses-encrypt", "awses-decrypt-generate")
+
+
+def _converted_version(version, manifest_format, layout, compression="none"):
+    """Determine the lowest manifest version that can describe the converted manifest.
+
+    :param int version: Version of the source manifest
+    :param str manifest_format: Serialization of the converted manifest
+    :param str layout: Layout of the converted manifest
+    :param str compression: Compression of the converted manifest
+    """
+    if version >= SHARED_TAMPERING_MANIFEST_VERSION:
+        return version
+    if layout == "normalized":
+        return max(version, NORMALIZED_MANIFEST_VERSION)
+    if manifest_format != "json" or compression != "none":
+        return SERIALIZED_MANIFEST_VERSION
+    return min(version, MESSAGE_MANIFEST_VERSION)
+
+
+def convert_manifest(filename, stream, manifest_format="json", layout="inline", indent=None, compression="none"):
+    """Convert a message encrypt or decrypt generation manifest to another serialization and/or layout.
+
+    Converting to the inline layout reads the source manifest once.
+    Converting to the normalized layout reads it twice, so that the complete tables can be written
+    before any test, while still only holding one test in memory at a time.
+
+    :param str filename: Name of file containing the source manifest
+    :param stream: Stream to which to write the converted manifest
+    :param str manifest_format: Serialization to write: "json", "jsonl", or "msgpack"
+    :param str layout: Layout to write: "inline" or "normalized"
+    :param int indent: Indentation width, or None for compact output
+    :param str compression: Compression that the stream applies: "none", "gzip", or "zstd"
+    """
+    with open_manifest(filename) as (header, tests):
+        if header["manifest"]["type"] not in CONVERTIBLE_TYPES:
+            raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+        tables = ScenarioTables(
+            {table: header.pop(table) for table in ("encryption-contexts", "master-key-sets") if table in header}
+        )
+        if layout == "normalized":
+            for _name, test in tests:
+                tables.normalize(tables.expand(test))
+            header.update(tables.tables)
+
+    header["manifest"]["version"] = _converted_version(
+        header["manifest"]["version"], manifest_format, layout, compression
+    )
+    convert = tables.normalize if layout == "normalized" else lambda test: test
+
+    with open_manifest(filename) as (_header, tests):
+        converted = ((name, convert(tables.expand(test))) for name, test in tests)
+        return MANIFEST_WRITERS[manifest_format](stream, header, converted, indent)
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Convert an AWS Encryption SDK encrypt or decrypt generation manifest to another layout."
+    )
+    parser.add_argument("manifest", help="Manifest to convert")
+    parser.add_argument("--human", action="store_true", help="Print human-readable JSON")
+    parser.add_argument("--output", default="-", help="File to which to write the manifest (default: stdout)")
+    parser.add_argument("--format", default="json", choices=MANIFEST_FORMATS, help="Serialization of the manifest")
+    parser.add_argument("--compression", default="none", choices=COMPRESSIONS, help="Compression of the manifest")
+    parser.add_argument("--layout", default="inline", choices=("inline", "normalized"), help="Layout of the manifest")
+
+    parsed = parser.parse_args(args)
+
+    kwargs = {}
+    if parsed.human:
+        kwargs["indent"] = 4
+
+    with output_stream(parsed.output, parsed.format == "msgpack", parsed.compression) as stream:
+        convert_manifest(
+            parsed.manifest, stream, parsed.format, parsed.layout, compression=parsed.compression, **kwargs
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
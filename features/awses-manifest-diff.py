@@ -0,0 +1,280 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import collections
+import json
+import sys
+
+from awses_message_encryption_utils import ENCRYPTION_CONTEXT_NAMES, ScenarioTables, _preferred_name
+from manifest_utils import open_manifest, scenario_digest
+
+DIFFABLE_TYPES = ("awses-encrypt", "awses-decrypt-generate")
+TABLES = ("encryption-contexts", "master-key-sets")
+
+# Members that identify the scenario of a test; tests with the same scenario but other differences have changed
+SCENARIO_MEMBERS = ("plaintext", "algorithm", "frame-size", "encryption-context", "master-keys")
+GENERATION_SCENARIO_MEMBERS = ("encryption-scenario", "tampering", "decryption-method")
+
+
+def _scenario(test):
+    """Select the members of a test description that identify its scenario."""
+    members = GENERATION_SCENARIO_MEMBERS if "encryption-scenario" in test else SCENARIO_MEMBERS
+    return {member: test[member] for member in members if member in test}
+
+
+def _encryption_context_label(encryption_context):
+    """Build a readable label for an encryption context."""
+    for name, value in ENCRYPTION_CONTEXT_NAMES:
+        if value == encryption_context:
+            return name
+    return json.dumps(encryption_context, sort_keys=True)
+
+
+def _dimensions(test):
+    """Describe a test by the value of each dimension of the scenario matrix.
+
+    :param dict test: Test description in the inline layout
+    :returns: Map of dimension name to readable value
+    :rtype: dict
+    """
+    scenario = test.get("encryption-scenario", test)
+    dimensions = {
+        "plaintext": str(scenario.get("plaintext")),
+        "algorithm": str(scenario.get("algorithm")),
+        "frame-size": str(scenario.get("frame-size")),
+        "encryption-context": _encryption_context_label(scenario.get("encryption-context")),
+        "master-keys": _preferred_name("master-key-sets", scenario.get("master-keys", [])),
+    }
+    if "encryption-scenario" in test:
+        tampering = test.get("tampering", "none")
+        dimensions["tampering"] = tampering if isinstance(tampering, str) else ",".join(sorted(tampering))
+        dimensions["decryption-method"] = test.get("decryption-method", "default")
+    return dimensions
+
+
+class _Differences(object):
+    """Tally of one kind of difference between manifests, by dimension value.
+
+    :param int examples: Number of example test IDs to keep
+    """
+
+    def __init__(self, examples):
+        self.count = 0
+        self.by_dimension = {}
+        self.examples = []
+        self._examples = examples
+
+    def add(self, name, dimensions):
+        """Tally a test.
+
+        :param str name: Test ID
+        :param dict dimensions: Value of each dimension of the test, from :func:`_dimensions`
+        """
+        self.count += 1
+        for dimension, value in dimensions.items():
+            values = self.by_dimension.setdefault(dimension, {})
+            values[value] = values.get(value, 0) + 1
+        if len(self.examples) < self._examples:
+            self.examples.append(name)
+
+    def report(self):
+        """Build the report of this kind of difference."""
+        return {
+            "count": self.count,
+            "by-dimension": {
+                dimension: dict(sorted(values.items())) for dimension, values in sorted(self.by_dimension.items())
+            },
+            "examples": self.examples,
+        }
+
+
+def _expanded_tests(header, tests):
+    """Expand the tests of a manifest of either layout to the inline layout."""
+    tables = ScenarioTables({table: header[table] for table in TABLES if table in header})
+    for name, test in tests:
+        yield name, tables.expand(test)
+
+
+def _member_digests(test):
+    """Build a digest of each top-level member of a test description."""
+    return {member: scenario_digest(value) for member, value in test.items()}
+
+
+def _normalized_header(header):
+    """Select the top-level members of a manifest that do not depend on its layout or serialization.
+
+    The manifest version and the scenario tables only record how tests are written,
+    and any difference in what the tests describe is found by comparing the tests themselves.
+    """
+    normalized = {member: value for member, value in header.items() if member not in TABLES}
+    normalized["manifest"] = {"type": header["manifest"]["type"]}
+    return normalized
+
+
+def _check_type(header):
+    """Check that a manifest is of a type that can be compared."""
+    if header["manifest"]["type"] not in DIFFABLE_TYPES:
+        raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+
+def _member_changes(old_members, new_members, changed_members):
+    """Count each top-level member whose digest differs between two versions of a test."""
+    for member in sorted(set(old_members) | set(new_members)):
+        if old_members.get(member) != new_members.get(member):
+            changed_members[member] = changed_members.get(member, 0) + 1
+
+
+def diff_manifests(old_filename, new_filename, examples=5):
+    """Compare two message encrypt or decrypt generation manifests test by test.
+
+    Tests with the same ID in both manifests are unchanged only if their whole descriptions are identical.
+    The remaining tests are matched by content, so that manifests generated with different test IDs
+    can still be compared: a test with an identical description is unchanged, a test with the same
+    scenario but other differences has changed, and any other test has been added or removed.
+
+    Each manifest is read once, one test at a time, and only the digests and dimension values of old tests
+    and of new tests without a matching ID are kept, so memory grows with the number of tests but not their size.
+    Manifests of either layout and any serialization can be compared with each other; the manifest versions
+    are reported but are not a difference, because they only record the layout and serialization.
+
+    :param str old_filename: Name of file containing the old manifest
+    :param str new_filename: Name of file containing the new manifest
+    :param int examples: Number of example test IDs to report for each kind of difference
+    :returns: Report of the manifest versions, of differences in the other top-level members,
+        and of added, removed, and changed tests
+    :rtype: dict
+    """
+    # Map of test ID to content digest, scenario digest, member digests, and dimensions of every old test
+    old_tests = {}
+    with open_manifest(old_filename) as (old_header, tests):
+        _check_type(old_header)
+        for name, test in _expanded_tests(old_header, tests):
+            old_tests[name] = (
+                scenario_digest(test),
+                scenario_digest(_scenario(test)),
+                _member_digests(test),
+                _dimensions(test),
+            )
+    old_count = len(old_tests)
+
+    added = _Differences(examples)
+    changed = _Differences(examples)
+    changed_members = {}
+    unchanged = new_count = 0
+    # New tests whose IDs are not in the old manifest, in the same form as old tests
+    unidentified = []
+    with open_manifest(new_filename) as (new_header, tests):
+        _check_type(new_header)
+        if old_header["manifest"]["type"] != new_header["manifest"]["type"]:
+            raise ValueError("Cannot compare manifests of different types")
+        for name, test in _expanded_tests(new_header, tests):
+            new_count += 1
+            content = scenario_digest(test)
+            old = old_tests.pop(name, None)
+            if old is None:
+                unidentified.append(
+                    (name, content, scenario_digest(_scenario(test)), _member_digests(test), _dimensions(test))
+                )
+            elif old[0] == content:
+                unchanged += 1
+            else:
+                changed.add(name, _dimensions(test))
+                _member_changes(old[2], _member_digests(test), changed_members)
+
+    # Old tests whose IDs are not in the new manifest, by content digest and by scenario digest
+    by_content = {}
+    by_scenario = {}
+    for name, (content, scenario, _members, _old_dimensions) in old_tests.items():
+        by_content.setdefault(content, collections.deque()).append(name)
+        by_scenario.setdefault(scenario, collections.deque()).append(name)
+
+    def _claim(candidates):
+        """Take the first old test of a group that no new test has matched yet."""
+        while candidates:
+            name = candidates.popleft()
+            if name in old_tests:
+                return old_tests.pop(name)
+        return None
+
+    similar = []
+    for name, content, scenario, members, dimensions in unidentified:
+        if _claim(by_content.get(content)) is not None:
+            unchanged += 1
+        else:
+            similar.append((name, scenario, members, dimensions))
+    for name, scenario, members, dimensions in similar:
+        old = _claim(by_scenario.get(scenario))
+        if old is not None:
+            changed.add(name, dimensions)
+            _member_changes(old[2], members, changed_members)
+        else:
+            added.add(name, dimensions)
+
+    removed = _Differences(examples)
+    for name, (_content, _scenario_digest, _members, dimensions) in old_tests.items():
+        removed.add(name, dimensions)
+
+    old_normalized, new_normalized = _normalized_header(old_header), _normalized_header(new_header)
+    header_changes = {}
+    for member in sorted(set(old_normalized) | set(new_normalized)):
+        if old_normalized.get(member) != new_normalized.get(member):
+            header_changes[member] = {"old": old_normalized.get(member), "new": new_normalized.get(member)}
+
+    changed_report = changed.report()
+    changed_report["members"] = dict(sorted(changed_members.items()))
+    return {
+        "versions": {"old": old_header["manifest"]["version"], "new": new_header["manifest"]["version"]},
+        "header": header_changes,
+        "tests": {"old": old_count, "new": new_count, "unchanged": unchanged},
+        "added": added.report(),
+        "removed": removed.report(),
+        "changed": changed_report,
+    }
+
+
+def has_differences(report):
+    """Determine whether a report from :func:`diff_manifests` found any difference.
+
+    :param dict report: Difference report
+    """
+    return bool(report["header"]) or any(report[kind]["count"] for kind in ("added", "removed", "changed"))
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Compare two AWS Encryption SDK message encryption or decryption generation manifests "
+        "test by test, matching tests by ID and then by content."
+    )
+    parser.add_argument("old", help="Old manifest")
+    parser.add_argument("new", help="New manifest")
+    parser.add_argument(
+        "--examples", type=int, default=5, help="Number of example test IDs to report for each kind of difference"
+    )
+    parser.add_argument("--check", action="store_true", help="Exit with an error if the manifests differ")
+
+    parsed = parser.parse_args(args)
+
+    report = diff_manifests(parsed.old, parsed.new, parsed.examples)
+    print(json.dumps(report, indent=4))
+
+    if parsed.check and has_differences(report):
+        return "Manifests differ"
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import sys
+
+from manifest_schema_utils import validate_manifest
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Validate keys, encrypt, decrypt generation, and decrypt manifests against their feature specs."
+    )
+    parser.add_argument("manifests", nargs="+", help="Manifests to validate")
+    parser.add_argument(
+        "--max-errors", type=int, default=100, help="Stop validating a manifest after this many errors (default: 100)"
+    )
+    parser.add_argument(
+        "--no-check-keys", action="store_true", help="Do not check master key references against the keys manifest"
+    )
+
+    parsed = parser.parse_args(args)
+
+    invalid = 0
+    for filename in parsed.manifests:
+        error_count = 0
+        for error in validate_manifest(filename, check_keys=not parsed.no_check_keys):
+            print("{}: {}".format(filename, error))
+            error_count += 1
+            if error_count >= parsed.max_errors:
+                print("{}: too many errors, stopping".format(filename))
+                break
+        if error_count:
+            invalid += 1
+
+    if invalid:
+        return "{} of {} manifests are invalid".format(invalid, len(parsed.manifests))
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
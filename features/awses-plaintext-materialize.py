@@ -0,0 +1,47 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import sys
+
+from manifest_utils import open_manifest, output_stream
+from plaintext_utils import PlaintextCache
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Materialize the plaintexts of an AWS Encryption SDK encrypt or decrypt generation manifest "
+        "into a shared content-addressed cache."
+    )
+    parser.add_argument("manifest", help="Manifest whose plaintexts to materialize")
+    parser.add_argument("--cache", required=True, help="Plaintext cache directory")
+    parser.add_argument(
+        "--output", default="-", help="File to which to write the map of plaintext names to paths (default: stdout)"
+    )
+
+    parsed = parser.parse_args(args)
+
+    with open_manifest(parsed.manifest) as (header, _tests):
+        plaintexts = header["plaintexts"]
+
+    paths = PlaintextCache(parsed.cache).materialize(plaintexts)
+    with output_stream(parsed.output) as stream:
+        json.dump(paths, stream, indent=4)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
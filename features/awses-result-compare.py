@@ -0,0 +1,117 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import sys
+
+from manifest_utils import output_stream
+from result_report_utils import (
+    RESULT_METRICS,
+    SUMMARY_DIMENSIONS,
+    compare_results,
+    describe_outlier,
+    read_results,
+    results_label,
+)
+
+
+def _load_runs(arguments):
+    """Load the test results of every run, given as ``LABEL=FILE`` or ``FILE``.
+
+    :returns: Map of run label to list of test results
+    :raises ValueError: if two runs have the same label
+    """
+    runs = {}
+    for argument in arguments:
+        label, separator, filename = argument.partition("=")
+        if not separator:
+            label, filename = None, argument
+        results = list(read_results(filename))
+        label = label or results_label(results, filename)
+        if label in runs:
+            raise ValueError('Duplicate run label: "{}"'.format(label))
+        runs[label] = results
+    return runs
+
+
+def _format_table(report):
+    """Format the scenarios of a comparison as a text table, one column per run
+    with its median and its ratio to the reference run of each scenario."""
+    labels = list(report["runs"])
+    header = list(SUMMARY_DIMENSIONS) + labels
+    lines = [header]
+    for row in report["scenarios"]:
+        line = [str(row["dimensions"][dimension]) for dimension in SUMMARY_DIMENSIONS]
+        for label in labels:
+            run = row["runs"][label]
+            ratio = "-" if run["ratio"] is None else "{:.2f}x".format(run["ratio"])
+            line.append("{:.6g} ({})".format(run["median"], ratio))
+        lines.append(line)
+    widths = [max(len(line[column]) for line in lines) for column in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in lines)
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Compare the test results of several handlers running the same manifest, "
+        "scenario by scenario, and flag every handler that is much slower than the others."
+    )
+    parser.add_argument(
+        "runs",
+        nargs="+",
+        metavar="[LABEL=]RESULTS",
+        help="Test result files, one per handler, optionally labelled "
+        "(default label: the client that the handler announced, or the handler)",
+    )
+    parser.add_argument(
+        "--join",
+        choices=("test", "scenario"),
+        default="test",
+        help="Compare results of the same test ID, or all results of the same scenario (default: test)",
+    )
+    parser.add_argument("--metric", choices=RESULT_METRICS, default="duration", help="Metric to compare")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=2.0,
+        help="Smallest ratio to the reference handler that is flagged as an outlier (default: 2.0)",
+    )
+    parser.add_argument("--baseline", help="Label of the run to compare to (default: the fastest run per scenario)")
+    parser.add_argument("--output", help="File to which to write the full comparison report as JSON")
+
+    parsed = parser.parse_args(args)
+
+    try:
+        runs = _load_runs(parsed.runs)
+    except ValueError as error:
+        parser.error(str(error))
+
+    report = compare_results(runs, parsed.join, parsed.metric, parsed.threshold, parsed.baseline)
+    if parsed.output:
+        with output_stream(parsed.output) as stream:
+            stream.write(json.dumps(report, indent=4) + "\n")
+
+    print(_format_table(report))
+    for mismatch in report["status-mismatches"]:
+        print("Status mismatch on test {}: {}".format(mismatch["test"], json.dumps(mismatch["statuses"])))
+    if report["outliers"]:
+        return "Outliers:\n" + "\n".join(describe_outlier(outlier, parsed.metric) for outlier in report["outliers"])
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import sys
+
+from result_report_utils import SUMMARY_DIMENSIONS, ResultCollector, read_results
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Summarize the timing and resource usage of test results written by the runners, "
+        "overall and for every value of every dimension."
+    )
+    parser.add_argument("results", nargs="+", help="Test result files, one JSON result per line")
+    parser.add_argument(
+        "--dimensions",
+        nargs="+",
+        default=list(SUMMARY_DIMENSIONS),
+        help="Dimensions by which to group results (default: {})".format(" ".join(SUMMARY_DIMENSIONS)),
+    )
+
+    parsed = parser.parse_args(args)
+
+    collector = ResultCollector(parsed.dimensions)
+    for filename in parsed.results:
+        for result in read_results(filename):
+            collector.add(result)
+    print(json.dumps(collector.summary(), indent=4))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import os
+import sys
+
+from vector_dedup_utils import dedup_manifest
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Deduplicate the ciphertexts and plaintexts of an AWS Encryption SDK message decryption "
+        "manifest into shared content-addressed files."
+    )
+    parser.add_argument("manifest", help="Decrypt manifest to deduplicate")
+    parser.add_argument("--output", required=True, help="File to which to write the rewritten manifest")
+    parser.add_argument(
+        "--objects", help="Directory in which to store content-addressed files (default: objects next to --output)"
+    )
+    parser.add_argument(
+        "--move", action="store_true", help="Move files into the objects directory and remove duplicates"
+    )
+    parser.add_argument("--human", action="store_true", help="Print human-readable JSON")
+
+    parsed = parser.parse_args(args)
+
+    kwargs = {}
+    if parsed.human:
+        kwargs["indent"] = 4
+
+    objects_directory = parsed.objects or os.path.join(os.path.dirname(os.path.abspath(parsed.output)), "objects")
+    report = dedup_manifest(parsed.manifest, parsed.output, objects_directory, parsed.move, **kwargs)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
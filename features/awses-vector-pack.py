@@ -0,0 +1,39 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import json
+import sys
+
+from vector_archive_utils import pack_archive
+
+
+def main(args=None):
+    """Entry point for CLI"""
+    parser = argparse.ArgumentParser(
+        description="Pack an AWS Encryption SDK message decryption manifest, its keys manifest, "
+        "and all of its ciphertexts and plaintexts into a single indexed archive."
+    )
+    parser.add_argument("manifest", help="Decrypt manifest to pack")
+    parser.add_argument("--output", required=True, help="Archive file to write")
+
+    parsed = parser.parse_args(args)
+
+    tests, blobs = pack_archive(parsed.manifest, parsed.output)
+    print(json.dumps({"tests": tests, "blobs": blobs}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import os
+
+from awses_message_encryption_utils import BYTE_TAMPERINGS, ScenarioTables
+from manifest_utils import open_manifest, resolve_uri, scenario_digest
+
+_READ_SIZE = 1024 * 1024
+
+
+def tampering_methods(tampering):
+    """List the tampering methods named by the ``tampering`` member of a decrypt generation test.
+
+    :param tampering: A method name, a list of byte tampering method names, or an object with one member
+        naming the method
+    :rtype: list
+    """
+    if isinstance(tampering, str):
+        return [tampering]
+    return list(tampering)
+
+
+def derivable(test):
+    """Determine whether every vector of a decrypt generation test can be derived from the ciphertext
+    of its encryption scenario, as encrypted without any customization.
+
+    :param dict test: Decrypt generation test description
+    """
+    return all(method in BYTE_TAMPERINGS for method in tampering_methods(test.get("tampering", [])))
+
+
+def _file_chunks(filename, length=None):
+    """Read a file, or its first ``length`` bytes, in chunks."""
+    with open(filename, "rb") as source_file:
+        while length is None or length > 0:
+            chunk = source_file.read(_READ_SIZE if length is None else min(_READ_SIZE, length))
+            if not chunk:
+                return
+            if length is not None:
+                length -= len(chunk)
+            yield chunk
+
+
+def truncated_chunks(filename, length):
+    """Stream a ciphertext truncated to its first ``length`` bytes.
+
+    :param str filename: Name of file containing the ciphertext
+    :param int length: Number of bytes to keep
+    """
+    return _file_chunks(filename, length)
+
+
+def mutated_chunks(filename, bit):
+    """Stream a ciphertext with a single bit flipped.
+
+    Bits are numbered from the least significant bit of the first byte.
+
+    :param str filename: Name of file containing the ciphertext
+    :param int bit: Index of the bit to flip
+    """
+    offset = 0
+    for chunk in _file_chunks(filename):
+        if offset <= bit // 8 < offset + len(chunk):
+            position = bit // 8 - offset
+            chunk = chunk[:position] + bytes([chunk[position] ^ (1 << (bit % 8))]) + chunk[position + 1 :]
+        offset += len(chunk)
+        yield chunk
+
+
+def tampered_vectors(method, filename):
+    """Derive the ciphertexts of a byte tampering from a good ciphertext, one at a time.
+
+    :param str method: Byte tampering method
+    :param str filename: Name of file containing the good ciphertext
+    :returns: Iterator of (vector name suffix, description of why decryption must fail, iterator of chunks)
+    """
+    size = os.path.getsize(filename)
+    if method == "truncate":
+        for length in range(1, size):
+            description = "Truncated to {} bytes".format(length)
+            yield "truncate-{}".format(length), description, truncated_chunks(filename, length)
+    elif method == "mutate":
+        for bit in range(8 * size):
+            description = "Flipped bit {}".format(bit)
+            yield "mutate-{}".format(bit), description, mutated_chunks(filename, bit)
+    else:
+        raise ValueError('Unsupported byte tampering: "{}"'.format(method))
+
+
+def write_chunks(chunks, filename):
+    """Write chunks to a file.
+
+    :param chunks: Iterable of bytes
+    :param str filename: Name of file to write
+    """
+    with open(filename, "wb") as output_file:
+        for chunk in chunks:
+            output_file.write(chunk)
+
+
+class EncryptionGroup(object):
+    """All tests of a decrypt generation manifest that derive their vectors from the same encryption.
+
+    :param str name: Test ID of the first test of the group, which names its ciphertext
+    :param dict scenario: Encryption scenario in the inline layout
+    """
+
+    def __init__(self, name, scenario):
+        self.name = name
+        self.scenario = scenario
+        self.tests = []
+
+
+def load_encryption_groups(filename):
+    """Load an AWS Encryption SDK message decryption generation manifest and group its tests by encryption scenario,
+    so that each scenario is encrypted only once however many tests and tamperings derive vectors from it.
+
+    Tests whose vectors cannot be derived from a plain encryption of their scenario, such as half-sign,
+    are returned separately.
+
+    :param str filename: Name of file containing the decrypt generation manifest
+    :returns: Manifest header, path to the keys manifest, list of :class:`EncryptionGroup`,
+        and list of (test ID, test description) pairs that cannot be derived
+    :rtype: tuple
+    """
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    groups = {}
+    underivable = []
+    with open_manifest(filename) as (header, tests):
+        if header["manifest"]["type"] != "awses-decrypt-generate":
+            raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+        tables = ScenarioTables(
+            {table: header[table] for table in ("encryption-contexts", "master-key-sets") if table in header}
+        )
+        for name, test in tests:
+            test = tables.expand(test)
+            if not derivable(test):
+                underivable.append((name, test))
+                continue
+            digest = scenario_digest(test["encryption-scenario"])
+            if digest not in groups:
+                groups[digest] = EncryptionGroup(name, test["encryption-scenario"])
+            groups[digest].tests.append((name, test))
+
+    return header, resolve_uri(header["keys"], base_directory), list(groups.values()), underivable
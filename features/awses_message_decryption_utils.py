@@ -0,0 +1,357 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import concurrent.futures
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from keys_manifest_utils import load_keys_manifest
+from manifest_utils import open_manifest, resolve_uri
+from result_report_utils import process_usage, request_dimensions, reset_peak_memory, rusage_usage
+from vector_archive_utils import open_archive
+
+# Handler kinds: a command that reads a request on stdin and writes the plaintext to stdout,
+# or a "module:function" callable that takes a request and returns the plaintext
+HANDLER_KINDS = ("command", "callable")
+
+RESULT_STATUSES = ("pass", "fail", "timeout")
+
+_READ_SIZE = 1024 * 1024
+
+
+class TestTimeout(BaseException):
+    """Raised when a handler exceeds the per-test timeout.
+
+    This is not an Exception, so that a handler callable that catches every Exception cannot swallow it.
+    """
+
+
+def _build_request(name, test, keys):
+    """Build the members of the request that a handler receives for a single decrypt test
+    that do not depend on where its ciphertext and plaintext are stored.
+
+    :param str name: Test ID
+    :param dict test: Decrypt test description
+    :param KeysManifest keys: Keys manifest identified by the decrypt manifest
+    :rtype: dict
+    """
+    request = {
+        "test": name,
+        "key-descriptions": {
+            master_key["key"]: keys["keys"][master_key["key"]]
+            for master_key in test["master-keys"]
+            if "key" in master_key
+        },
+        "master-keys": test["master-keys"],
+    }
+    if "decryption-method" in test:
+        request["decryption-method"] = test["decryption-method"]
+    return request
+
+
+def load_decrypt_requests(filename, keys_cache=None):
+    """Load an AWS Encryption SDK message decryption manifest and the keys manifest that it identifies
+    and build the handler request for every test.
+
+    :param str filename: Name of file containing the decrypt manifest
+    :param str keys_cache: Keys cache directory to fill and pass on to handlers (optional)
+    :returns: Iterator of handler requests
+    """
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    with open_manifest(filename) as (header, tests):
+        if header["manifest"]["type"] != "awses-decrypt":
+            raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+        keys_filename = resolve_uri(header["keys"], base_directory)
+        keys = load_keys_manifest(keys_filename, keys_cache)
+        for name, test in tests:
+            request = _build_request(name, test, keys)
+            request["keys"] = keys_filename
+            request["ciphertext"] = resolve_uri(test["ciphertext"], base_directory)
+            if keys_cache is not None:
+                request["keys-cache"] = keys_cache
+            if "result" not in test:
+                # Version 1 test cases always succeed, and name their plaintext directly
+                request["expected-plaintext"] = resolve_uri(test["plaintext"], base_directory)
+            elif "output" in test["result"]:
+                request["expected-plaintext"] = resolve_uri(test["result"]["output"]["plaintext"], base_directory)
+            yield request
+
+
+def load_archive_requests(filename):
+    """Build the handler request for every test in an archive written by ``pack_archive``.
+
+    Requests locate the ciphertext and expected plaintext of each test in the archive
+    instead of naming a file for each, and carry no keys manifest path: handlers read the keys
+    and every blob from the single archive file.
+
+    :param str filename: Name of archive file
+    :returns: Iterator of handler requests
+    """
+    filename = os.path.abspath(filename)
+    archive = open_archive(filename)
+    for name, test in archive.manifest["tests"].items():
+        locations = archive.locations(name)
+        request = _build_request(name, test, archive.keys)
+        request["archive"] = filename
+        request["ciphertext-location"] = locations["ciphertext"]
+        if "plaintext" in locations:
+            request["expected-plaintext-location"] = locations["plaintext"]
+        yield request
+
+
+def file_digest(filename):
+    """Calculate the SHA256 digest of a file without reading it into memory all at once.
+
+    :param str filename: Name of file to digest
+    :rtype: bytes
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as data_file:
+        for chunk in iter(lambda: data_file.read(_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _ciphertext_size(request):
+    """Get the size of the ciphertext of a decrypt request, whether it is a file or stored in an archive.
+
+    :param dict request: Handler request
+    :rtype: int
+    """
+    if "archive" in request:
+        return request["ciphertext-location"][1]
+    return os.path.getsize(request["ciphertext"])
+
+
+def _wait_command(command, request, timeout):
+    """Run a handler command and wait for it with ``os.wait4``, which reports the resource usage of that one process.
+
+    :returns: Exit status, output, and resource usage of the handler process
+    :rtype: tuple
+    """
+    timed_out = threading.Event()
+    with tempfile.TemporaryFile() as output_file:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=output_file, stderr=subprocess.DEVNULL)
+
+        def _kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, _kill) if timeout is not None else None
+        if timer is not None:
+            timer.start()
+        try:
+            try:
+                process.stdin.write(json.dumps(request).encode("utf-8"))
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+            _pid, wait_status, usage = os.wait4(process.pid, 0)
+            # Recorded before the timer can fire, so that the reaped process is neither killed nor waited for again
+            process.returncode = os.WEXITSTATUS(wait_status) if os.WIFEXITED(wait_status) else -1
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if timed_out.is_set() and not os.WIFEXITED(wait_status):
+            raise TestTimeout()
+        output_file.seek(0)
+        return process.returncode, output_file.read(), usage
+
+
+def _run_command(command, request, timeout):
+    """Decrypt with a handler command.
+
+    The command receives the request as JSON on stdin and must write the plaintext to stdout.
+    A non-zero exit status means that decryption failed.
+    The CPU time and peak memory of the handler process are measured where the platform supports ``os.wait4``.
+
+    :param list command: Handler command arguments
+    :param dict request: Handler request
+    :param float timeout: Seconds after which to stop the handler, or None to wait indefinitely
+    :returns: Plaintext, or None if decryption failed, and the resource usage of the handler
+    :rtype: tuple
+    """
+    if hasattr(os, "wait4"):
+        returncode, stdout, usage = _wait_command(command, request, timeout)
+        return (stdout if returncode == 0 else None), rusage_usage(usage)
+
+    try:
+        completed = subprocess.run(
+            command,
+            input=json.dumps(request).encode("utf-8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired as error:
+        raise TestTimeout() from error
+    if completed.returncode != 0:
+        return None, {}
+    return completed.stdout, {}
+
+
+def _raise_timeout(_signum, _frame):
+    raise TestTimeout()
+
+
+def _run_callable(function_name, request, timeout):
+    """Decrypt with a handler callable.
+
+    The callable receives the request and must return the plaintext.
+    Any exception means that decryption failed.
+    Timeouts are only enforced on platforms with ``SIGALRM``.
+
+    :param str function_name: Handler callable, as "module:function"
+    :param dict request: Handler request
+    :param float timeout: Seconds after which to stop the handler, or None to wait indefinitely
+    :returns: Plaintext, or None if decryption failed, and the resource usage of the call
+    :rtype: tuple
+    """
+    module_name, _sep, attribute = function_name.partition(":")
+    function = getattr(importlib.import_module(module_name), attribute)
+
+    alarm = timeout is not None and hasattr(signal, "SIGALRM")
+    if alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    # Each worker process runs one test at a time, so its own usage is the usage of the call
+    peak_reset = reset_peak_memory(os.getpid())
+    cpu_start = time.process_time()
+    try:
+        plaintext = function(request)
+    except Exception:  # Handlers signal failed decryption by raising anything at all
+        plaintext = None
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    usage = {"cpu-time": time.process_time() - cpu_start}
+    if peak_reset:
+        peak_memory = process_usage(os.getpid()).get("peak-memory")
+        if peak_memory is not None:
+            usage["peak-memory"] = peak_memory
+    return plaintext, usage
+
+
+def _expected_digest(request):
+    """Calculate the SHA256 digest of the expected plaintext of a decrypt request."""
+    if "archive" not in request:
+        return file_digest(request["expected-plaintext"])
+    with open_archive(request["archive"]).plaintext(request["test"]) as plaintext:
+        return hashlib.sha256(plaintext).digest()
+
+
+def check_decryption(request, plaintext_digest):
+    """Check the result of decryption against the expected result of a decrypt test.
+
+    :param dict request: Handler request
+    :param bytes plaintext_digest: SHA256 digest of the decrypted plaintext, or None if decryption failed
+    :returns: Test status and failure detail, or None if the test passed
+    :rtype: tuple
+    """
+    if "expected-plaintext" not in request and "expected-plaintext-location" not in request:
+        if plaintext_digest is None:
+            return "pass", None
+        return "fail", "Decryption succeeded but was expected to fail"
+    if plaintext_digest is None:
+        return "fail", "Decryption failed but was expected to succeed"
+    if plaintext_digest != _expected_digest(request):
+        return "fail", "Decrypted plaintext does not match expected plaintext"
+    return "pass", None
+
+
+_HANDLER_RUNNERS = {"command": _run_command, "callable": _run_callable}
+
+
+def run_test(handler_kind, handler, request, timeout=None):
+    """Run a single decrypt test and check the result.
+
+    :param str handler_kind: "command" or "callable"
+    :param handler: Handler command arguments or "module:function" callable name
+    :param dict request: Handler request
+    :param float timeout: Seconds after which to stop the handler, or None to wait indefinitely
+    :returns: Test result, with the timing and resource usage members of a result report
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    plaintext, usage = None, {}
+    try:
+        plaintext, usage = _HANDLER_RUNNERS[handler_kind](handler, request, timeout)
+    except TestTimeout:
+        status, detail = "timeout", "Handler did not finish within {} seconds".format(timeout)
+    else:
+        status, detail = check_decryption(request, None if plaintext is None else hashlib.sha256(plaintext).digest())
+
+    result = {"test": request["test"], "status": status, "duration": time.perf_counter() - start}
+    if detail is not None:
+        result["detail"] = detail
+    result.update(usage)
+    result["bytes"] = _ciphertext_size(request) + (0 if plaintext is None else len(plaintext))
+    result["handler"] = {
+        "kind": handler_kind,
+        "name": handler if handler_kind == "callable" else " ".join(handler),
+        "worker": os.getpid(),
+    }
+    result["dimensions"] = request_dimensions(request)
+    return result
+
+
+def run_tests(handler_kind, handler, requests, jobs=None, timeout=None):
+    """Run decrypt tests across a pool of worker processes.
+
+    :param str handler_kind: "command" or "callable"
+    :param handler: Handler command arguments or "module:function" callable name
+    :param requests: Iterable of handler requests
+    :param int jobs: Maximum number of worker processes (default: number of CPUs)
+    :param float timeout: Per-test timeout in seconds, or None to wait indefinitely
+    :returns: Iterator of test results, in the order in which tests finish
+    """
+    if handler_kind not in HANDLER_KINDS:
+        raise ValueError('Unsupported handler kind: "{}"'.format(handler_kind))
+
+    jobs = jobs or os.cpu_count() or 1
+    requests = iter(requests)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Only a few tests per worker are in flight at once, so requests are read as workers free up
+        pending = set()
+        while True:
+            for request in itertools.islice(requests, 2 * jobs - len(pending)):
+                pending.add(executor.submit(run_test, handler_kind, handler, request, timeout))
+            if not pending:
+                return
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def summarize_results(results, counts):
+    """Pass test results through unchanged while counting them by status.
+
+    :param results: Iterable of test results
+    :param dict counts: Map of status to test count, updated in place
+    """
+    for status in RESULT_STATUSES:
+        counts.setdefault(status, 0)
+    for result in results:
+        counts[result["status"]] += 1
+        yield result
@@ -15,8 +15,15 @@
 
 import functools
 import itertools
+import json
+import os
 import uuid
 
+from coverage_utils import covering_array, uncovered_combinations
+from keys_manifest_utils import keys_manifest, load_keys_manifest
+from manifest_utils import open_manifest, resolve_uri
+from plaintext_utils import PlaintextCache
+
 # AWS Encryption SDK supported algorithm suites
 # https://docs.aws.amazon.com/encryption-sdk/latest/developer-guide/algorithms-reference.html
 ALGORITHM_SUITES = ("0014", "0046", "0078", "0114", "0146", "0178", "0214", "0346", "0378", "0478", "0578")
@@ -31,6 +38,42 @@ FRAME_SIZES = (
     20480,  # frame size larger than plaintext size
 )
 
+# Throughput tests pair large plaintexts with realistic frame sizes
+# and are only built on request, to keep them out of the main matrix
+THROUGHPUT_PLAINTEXTS = {"large": 16 * 1024 * 1024, "huge": 1024 * 1024 * 1024}
+THROUGHPUT_FRAME_SIZES = (
+    4096,  # many small frames
+    65536,  # typical streaming buffer size
+    1048576,  # few large frames
+)
+# Representative algorithm suites for throughput tests: with and without key commitment and signatures
+THROUGHPUT_ALGORITHM_SUITES = ("0178", "0378", "0478", "0578")
+
+# Algorithm suites that sign messages with ECDSA
+SIGNED_ALGORITHM_SUITES = ("0214", "0346", "0378", "0578")
+
+# Methods of deriving decrypt test vectors that must fail from a good message
+TAMPERINGS = (
+    "truncate",
+    "mutate",
+    "half-sign",
+)
+
+# Tamperings that derive their vectors from the bytes of a finished good message,
+# so that all of them can share a single encryption of their scenario
+BYTE_TAMPERINGS = ("truncate", "mutate")
+
+# Orders in which generators can emit tests
+TEST_ORDERS = ("matrix", "interleaved", "risk")
+# Estimated cost of each part of a test, relative to the cost of processing one byte of plaintext
+COST_WEIGHTS = {
+    "frame": 1024,
+    "signature": 256 * 1024,
+    "aes": 0,
+    "rsa": 64 * 1024,
+    "aws-kms": 1024 * 1024,
+}
+
 EMPTY_ENCRYPTION_CONTEXT = {}
 NON_UNICODE_ENCRYPTION_CONTEXT = {"key1": "val1", "key2": "val2"}
 UNICODE_ENCRYPTION_CONTEXT = {
@@ -47,6 +90,13 @@ ENCRYPTION_CONTEXTS = (
     UNICODE_ENCRYPTION_CONTEXT,
     UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT,
 )
+# Names of encryption contexts in normalized manifests
+ENCRYPTION_CONTEXT_NAMES = (
+    ("empty", EMPTY_ENCRYPTION_CONTEXT),
+    ("non-unicode", NON_UNICODE_ENCRYPTION_CONTEXT),
+    ("unicode", UNICODE_ENCRYPTION_CONTEXT),
+    ("unprintable-unicode", UNPRINTABLE_UNICODE_ENCRYPTION_CONTEXT),
+)
 
 # Padding algorithms to test with each RSA Raw Master Key
 RAW_RSA_PADDING_ALGORITHMS = (
@@ -62,49 +112,68 @@ RAW_RSA_BLACKHOLE_ARGUMENTS_OVERRIDE = {
     "padding-hash": "sha256",
 }
 
+# Namespace from which all deterministic test IDs are derived
+TEST_ID_NAMESPACE = uuid.UUID("1b4bd5a2-c1bc-4b28-8b0b-3bd6a4e1c2f1")
+
+
+def random_test_id(_test):
+    """Build a random test ID.
+
+    :param dict _test: Test description
+    """
+    return str(uuid.uuid4())
+
+
+def deterministic_test_id_builder(seed=""):
+    """Build a function that derives each test ID from the content of the test description.
+
+    IDs are name-based UUIDs in a namespace derived from the seed, so regenerating an
+    unchanged set of tests with the same seed will always result in the same IDs.
+
+    :param str seed: Seed from which to derive the test ID namespace
+    """
+    namespace = uuid.uuid5(TEST_ID_NAMESPACE, seed)
+
+    def _test_id(test):
+        return str(uuid.uuid5(namespace, json.dumps(test, sort_keys=True)))
+
+    return _test_id
+
 
 def _keys_for_algorithm(algorithm_name, keys):
     """Filter keys manifest keys by type.
 
     :param str algorithm_name: Key algorithm name for which to filter
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
     """
-    for name, key in keys["keys"].items():
-        if key.get("algorithm", None) == algorithm_name:
-            yield name, key
+    return iter(keys_manifest(keys).for_algorithm(algorithm_name))
 
 
 def _keys_for_type(type_name, keys):
     """Filter keys manifest keys by type.
 
     :param str type_name: Key type name for which to filter
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
     """
-    for name, key in keys["keys"].items():
-        if key["type"] == type_name:
-            yield name, key
+    return iter(keys_manifest(keys).for_type(type_name))
 
 
 def _keys_for_encryptval(encrypt_value, keys):
     """Filter keys manifest keys by type.
 
     :param boolean encrypt_value: True/False value for which to filter encrypt
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
     """
-    for name, key in keys["keys"].items():
-        if key["encrypt"] == encrypt_value:
-            yield name, key
+    return iter(keys_manifest(keys).for_encrypt(encrypt_value))
 
 
 def _keys_for_decryptval(decrypt_value, keys):
     """Filter keys manifest keys by type.
 
     :param boolean encrypt_value: True/False value for which to filter decrypt
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
     """
-    for name, key in keys["keys"].items():
-        if key["decrypt"] == decrypt_value:
-            yield name, key
+    return iter(keys_manifest(keys).for_decrypt(decrypt_value))
 
 
 def _split_on_decryptable(keys, filter_function, key_builder):
@@ -198,27 +267,532 @@ def _raw_rsa_providers(keys):
 def _providers(keys):
     """Build all master key provider configurations to test.
 
-    :param dict keys: Parsed keys manifest
+    :param keys: Parsed keys manifest or KeysManifest
     """
+    keys = keys_manifest(keys)
     return itertools.chain(_aws_kms_providers(keys), _raw_aes_providers(keys), _raw_rsa_providers(keys))
 
 
-def build_tests(keys):
-    """Build all tests to define in manifest, building from current rules and provided keys manifest.
+def provider_family(master_keys):
+    """Identify the master key family to which a provider configuration belongs.
+
+    :param list master_keys: Master key configurations
+    :returns: "aws-kms", "aes", or "rsa"
+    """
+    master_key = master_keys[0]
+    if master_key["type"] == "aws-kms":
+        return "aws-kms"
+    return master_key["encryption-algorithm"]
+
+
+def provider_counts(keys):
+    """Count the master key provider configurations that ``_providers`` builds for each family,
+    computed directly from the key counts in a single pass over the keys manifest.
 
     :param dict keys: Parsed keys manifest
     """
-    for algorithm in ALGORITHM_SUITES:
-        for frame_size in FRAME_SIZES:
-            for ec in ENCRYPTION_CONTEXTS:
-                for provider_set in _providers(keys):
-                    yield (
-                        str(uuid.uuid4()),
-                        {
-                            "plaintext": "small",
-                            "algorithm": algorithm,
-                            "frame-size": frame_size,
-                            "encryption-context": ec,
-                            "master-keys": provider_set,
-                        },
-                    )
+    kms_cyclable = kms_encrypt_only = aes = rsa_cyclable = rsa_encrypt_only = 0
+    for key in keys["keys"].values():
+        if key["type"] == "aws-kms":
+            if key["encrypt"]:
+                kms_cyclable += key["decrypt"]
+                kms_encrypt_only += not key["decrypt"]
+        elif key.get("algorithm", None) == "aes":
+            aes += 1
+        elif key.get("algorithm", None) == "rsa":
+            if key["encrypt"]:
+                rsa_cyclable += key["decrypt"]
+                rsa_encrypt_only += not key["decrypt"]
+
+    return {
+        "aes": aes,
+        "rsa": rsa_cyclable * len(RAW_RSA_PADDING_ALGORITHMS) * (1 + rsa_encrypt_only),
+        "aws-kms": kms_cyclable * (1 + kms_encrypt_only),
+    }
+
+
+def expected_test_counts(keys, throughput=False):
+    """Count the tests that ``build_tests`` builds for each master key family.
+
+    :param dict keys: Parsed keys manifest
+    :param bool throughput: Whether to count the throughput tests
+    """
+    iterations = len(ALGORITHM_SUITES) * len(FRAME_SIZES) * len(ENCRYPTION_CONTEXTS)
+    counts = {family: count * iterations for family, count in provider_counts(keys).items()}
+    if throughput:
+        for family, count in expected_throughput_test_counts(keys).items():
+            counts[family] += count
+    return counts
+
+
+def throughput_providers(keys):
+    """Build one representative master key provider configuration for each family to use in throughput tests.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    """
+    keys = keys_manifest(keys)
+    for family_providers in (_aws_kms_providers(keys), _raw_aes_providers(keys), _raw_rsa_providers(keys)):
+        for provider_set in family_providers:
+            yield provider_set
+            break
+
+
+def expected_throughput_test_counts(keys):
+    """Count the tests that ``build_throughput_tests`` builds for each master key family.
+
+    :param dict keys: Parsed keys manifest
+    """
+    iterations = len(THROUGHPUT_PLAINTEXTS) * len(THROUGHPUT_ALGORITHM_SUITES) * len(THROUGHPUT_FRAME_SIZES)
+    return {family: min(count, 1) * iterations for family, count in provider_counts(keys).items()}
+
+
+def manifest_plaintexts(throughput=False):
+    """Build the plaintexts member of a manifest.
+
+    :param bool throughput: Whether the manifest includes throughput tests
+    """
+    plaintexts = PLAINTEXTS.copy()
+    if throughput:
+        plaintexts.update(THROUGHPUT_PLAINTEXTS)
+    return plaintexts
+
+
+def counting_tests(tests, counts, scenario=lambda test: test):
+    """Pass tests through unchanged while counting them by master key family.
+
+    :param tests: Iterable of (test ID, test description) pairs
+    :param dict counts: Map of master key family to test count, updated in place
+    :param callable scenario: Function that returns the encryption scenario from a test description
+    """
+    for name, test in tests:
+        family = provider_family(scenario(test)["master-keys"])
+        counts[family] = counts.get(family, 0) + 1
+        yield name, test
+
+
+def check_test_counts(expected, actual):
+    """Test that the number of tests built for each master key family is actually complete.
+
+    :param dict expected: Map of master key family to expected test count
+    :param dict actual: Map of master key family to actual test count
+    """
+    families = (("AES", "aes"), ("RSA", "rsa"), ("AWS-KMS", "aws-kms"))
+    if not all(0 < expected[family] == actual.get(family, 0) for _label, family in families):
+        raise ValueError(
+            "Unexpected test count: \n"
+            + "\n".join(
+                "{label}: Expected: {expected} Actual: {actual}".format(
+                    label=label, expected=expected[family], actual=actual.get(family, 0)
+                )
+                for label, family in families
+            )
+        )
+
+
+class TestCountCheck(object):
+    """Validation that a manifest contains exactly the expected number of tests for each master key family.
+
+    :param dict expected: Map of master key family to expected test count
+    """
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.counts = {}
+
+    def add(self, scenario):
+        """Count an encryption scenario.
+
+        :param dict scenario: Encryption scenario
+        """
+        family = provider_family(scenario["master-keys"])
+        self.counts[family] = self.counts.get(family, 0) + 1
+
+    def check(self):
+        """Test that all expected tests were counted."""
+        check_test_counts(self.expected, self.counts)
+
+
+class CoverageCheck(object):
+    """Validation that the encryption scenarios of a manifest cover every combination of values
+    of every ``strength`` dimensions of the scenario matrix.
+
+    Scenarios with any value outside the matrix, such as throughput tests, are ignored.
+
+    :param dimensions: Scenario matrix dimensions, as built by ``matrix_dimensions``
+    :param int strength: Number of dimensions whose combinations must be covered
+    """
+
+    def __init__(self, dimensions, strength):
+        self.strength = strength
+        self._members = [member for member, _values in dimensions]
+        self._sizes = [len(values) for _member, values in dimensions]
+        self._indexes = [
+            {json.dumps(value, sort_keys=True): index for index, value in enumerate(values)}
+            for _member, values in dimensions
+        ]
+        self._rows = set()
+
+    def add(self, scenario):
+        """Record the combinations that an encryption scenario covers.
+
+        :param dict scenario: Encryption scenario
+        """
+        row = []
+        for member, index in zip(self._members, self._indexes):
+            value_index = index.get(json.dumps(scenario.get(member), sort_keys=True))
+            if value_index is None:
+                return
+            row.append(value_index)
+        self._rows.add(tuple(row))
+
+    def check(self):
+        """Test that every combination was covered."""
+        uncovered, total = uncovered_combinations(self._sizes, self._rows, self.strength)
+        if uncovered:
+            raise ValueError(
+                "Incomplete coverage: {uncovered} of {total} {strength}-way combinations are not covered".format(
+                    uncovered=uncovered, total=total, strength=self.strength
+                )
+            )
+
+
+def checked_tests(tests, test_check, scenario=lambda test: test):
+    """Pass tests through unchanged while recording them in a test count or coverage check.
+
+    :param tests: Iterable of (test ID, test description) pairs
+    :param test_check: TestCountCheck or CoverageCheck
+    :param callable scenario: Function that returns the encryption scenario from a test description
+    """
+    for name, test in tests:
+        test_check.add(scenario(test))
+        yield name, test
+
+
+def matrix_dimensions(keys, plaintexts=("small",)):
+    """Build the dimensions of the encryption scenario matrix.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    :param tuple plaintexts: Names of the plaintexts to encrypt
+    :returns: Tuple of (scenario member, values) pairs
+    """
+    return (
+        ("plaintext", plaintexts),
+        ("algorithm", ALGORITHM_SUITES),
+        ("frame-size", FRAME_SIZES),
+        ("encryption-context", ENCRYPTION_CONTEXTS),
+        ("master-keys", tuple(_providers(keys_manifest(keys)))),
+    )
+
+
+def scenario_matrix(dimensions, coverage=None, coverage_seed=0):
+    """Build encryption scenarios from the scenario matrix.
+
+    :param dimensions: Scenario matrix dimensions, as built by ``matrix_dimensions``
+    :param int coverage: Number of dimensions whose every combination of values must be covered,
+        or None for every scenario in the matrix
+    :param int coverage_seed: Seed that selects between equally small sets of covering scenarios
+    :returns: Iterator of encryption scenarios
+    """
+    values = [dimension_values for _member, dimension_values in dimensions]
+    if coverage is None:
+        rows = itertools.product(*(range(len(dimension_values)) for dimension_values in values))
+    else:
+        rows = covering_array([len(dimension_values) for dimension_values in values], coverage, coverage_seed)
+    for row in rows:
+        yield {member: values[dimension][row[dimension]] for dimension, (member, _values) in enumerate(dimensions)}
+
+
+def _interleaved(tests, scenario):
+    """Order tests round-robin across algorithm suites, keeping the order of the tests for each suite."""
+    suites = {}
+    for test in tests:
+        suites.setdefault(scenario(test)["algorithm"], []).append(test)
+    for group in itertools.zip_longest(*suites.values()):
+        for test in group:
+            if test is not None:
+                yield test
+
+
+def _risk_tier(test, scenario):
+    """Rank a test by how likely it is to find a defect: tamperings first, then signed algorithm suites."""
+    if "tampering" in test:
+        return 0
+    if scenario(test)["algorithm"] in SIGNED_ALGORITHM_SUITES:
+        return 1
+    return 2
+
+
+def ordered_tests(tests, order="matrix", scenario=lambda test: test):
+    """Reorder tests so that a runner that stops early has still covered as much as possible.
+
+    "matrix" keeps the order in which tests are built.
+    "interleaved" visits every algorithm suite before visiting any suite twice.
+    "risk" emits tampering tests first and then tests of signed algorithm suites,
+    interleaving algorithm suites within each of those tiers.
+
+    :param tests: Iterable of test descriptions
+    :param str order: "matrix", "interleaved", or "risk"
+    :param callable scenario: Function that returns the encryption scenario from a test description
+    :returns: Iterator of test descriptions
+    """
+    if order not in TEST_ORDERS:
+        raise ValueError('Unsupported test order: "{}"'.format(order))
+    if order == "matrix":
+        return iter(tests)
+    if order == "interleaved":
+        return _interleaved(list(tests), scenario)
+
+    tiers = {}
+    for test in tests:
+        tiers.setdefault(_risk_tier(test, scenario), []).append(test)
+    return itertools.chain.from_iterable(_interleaved(tiers[tier], scenario) for tier in sorted(tiers))
+
+
+def cost_hints(scenario):
+    """Estimate the cost of a test, so that runners can schedule the most expensive tests first.
+
+    :param dict scenario: Encryption scenario
+    :returns: Plaintext size, frame count, master key families, whether the message is signed,
+        and a relative weight that combines all of them
+    :rtype: dict
+    """
+    plaintext_bytes = dict(PLAINTEXTS, **THROUGHPUT_PLAINTEXTS)[scenario["plaintext"]]
+    frames = 1
+    if scenario["frame-size"]:
+        # Framed messages always end with a final frame, which may be empty
+        frames = plaintext_bytes // scenario["frame-size"] + 1
+    families = [provider_family([master_key]) for master_key in scenario["master-keys"]]
+    signed = scenario["algorithm"] in SIGNED_ALGORITHM_SUITES
+
+    weight = plaintext_bytes + frames * COST_WEIGHTS["frame"] + sum(COST_WEIGHTS[family] for family in families)
+    if signed:
+        weight += COST_WEIGHTS["signature"]
+    return {
+        "plaintext-bytes": plaintext_bytes,
+        "frames": frames,
+        "key-families": families,
+        "signed": signed,
+        "weight": weight,
+    }
+
+
+def costed_tests(tests, scenario=lambda test: test):
+    """Add cost hints to tests.
+
+    :param tests: Iterable of (test ID, test description) pairs
+    :param callable scenario: Function that returns the encryption scenario from a test description
+    """
+    for name, test in tests:
+        yield name, dict(test, cost=cost_hints(scenario(test)))
+
+
+# Test and encryption scenario members that normalized manifests may replace with
+# the name of an entry in a top-level table
+NORMALIZED_MEMBERS = {
+    "encryption-context": "encryption-contexts",
+    "master-keys": "master-key-sets",
+    "decryption-master-keys": "master-key-sets",
+}
+
+
+def _master_key_name(master_key):
+    """Build a readable name for a master key configuration.
+
+    :param dict master_key: Master key configuration
+    """
+    name = master_key["key"]
+    if "padding-algorithm" in master_key:
+        name += ":" + master_key["padding-algorithm"]
+        if "padding-hash" in master_key:
+            name += "-" + master_key["padding-hash"]
+    return name
+
+
+def _preferred_name(table, value):
+    """Build the preferred name for a normalized manifest table entry.
+
+    :param str table: Table name
+    :param value: Table entry
+    """
+    if table == "master-key-sets":
+        return "+".join(_master_key_name(master_key) for master_key in value)
+    for name, encryption_context in ENCRYPTION_CONTEXT_NAMES:
+        if encryption_context == value:
+            return name
+    return "encryption-context"
+
+
+class ScenarioTables(object):
+    """Named encryption contexts and master key sets shared by all tests of a normalized manifest.
+
+    :param dict tables: Existing top-level tables from a normalized manifest (optional)
+    """
+
+    def __init__(self, tables=None):
+        self.tables = {"encryption-contexts": {}, "master-key-sets": {}}
+        self._names = {table: {} for table in self.tables}
+        for table, entries in (tables or {}).items():
+            for name, value in entries.items():
+                self._add(table, name, value)
+
+    def _add(self, table, name, value):
+        self.tables[table][name] = value
+        self._names[table][json.dumps(value, sort_keys=True)] = name
+
+    def reference(self, table, value):
+        """Find the name of a table entry, adding the entry if it is not yet in the table.
+
+        :param str table: Table name
+        :param value: Table entry
+        """
+        name = self._names[table].get(json.dumps(value, sort_keys=True))
+        if name is not None:
+            return name
+
+        name = preferred = _preferred_name(table, value)
+        suffix = 1
+        while name in self.tables[table]:
+            suffix += 1
+            name = "{}-{}".format(preferred, suffix)
+        self._add(table, name, value)
+        return name
+
+    def _replace(self, test, replace):
+        test = dict(test)
+        for member, table in NORMALIZED_MEMBERS.items():
+            if member in test:
+                test[member] = replace(table, test[member])
+        if "encryption-scenario" in test:
+            test["encryption-scenario"] = self._replace(test["encryption-scenario"], replace)
+        return test
+
+    def normalize(self, test):
+        """Replace shared members of a test description with references to table entries.
+
+        :param dict test: Test description in the inline layout
+        """
+        return self._replace(test, self.reference)
+
+    def expand(self, test):
+        """Replace all references in a test description with the table entries they name.
+
+        :param dict test: Test description in the normalized layout
+        """
+
+        def _lookup(table, value):
+            if isinstance(value, str):
+                return self.tables[table][value]
+            return value
+
+        return self._replace(test, _lookup)
+
+    def normalizing_tests(self, tests):
+        """Normalize tests as they are built.
+
+        :param tests: Iterable of (test ID, test description) pairs in the inline layout
+        """
+        for name, test in tests:
+            yield name, self.normalize(test)
+
+
+def scenario_tables(tests):
+    """Build the tables for a normalized manifest with an entry for every shared member of the given tests.
+
+    :param tests: Iterable of test descriptions in the inline layout
+    """
+    tables = ScenarioTables()
+    for test in tests:
+        tables.normalize(test)
+    return tables
+
+
+def build_tests(keys, test_id=random_test_id, throughput=False, coverage=None, coverage_seed=0):
+    """Build all tests to define in manifest, building from current rules and provided keys manifest.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    :param callable test_id: Function that builds a test ID given a test description
+    :param bool throughput: Whether to also build the throughput tests
+    :param int coverage: Number of dimensions whose every combination of values must be covered,
+        or None for every scenario in the matrix
+    :param int coverage_seed: Seed that selects between equally small sets of covering scenarios
+    """
+    for test in scenario_matrix(matrix_dimensions(keys), coverage, coverage_seed):
+        yield test_id(test), test
+
+    if throughput:
+        for name, test in build_throughput_tests(keys, test_id):
+            yield name, test
+
+
+def build_throughput_tests(keys, test_id=random_test_id):
+    """Build the opt-in throughput tests, which pair large plaintexts with realistic frame sizes
+    for one representative provider of each master key family.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    :param callable test_id: Function that builds a test ID given a test description
+    """
+    provider_sets = tuple(throughput_providers(keys))
+    for plaintext in THROUGHPUT_PLAINTEXTS:
+        for algorithm in THROUGHPUT_ALGORITHM_SUITES:
+            for frame_size in THROUGHPUT_FRAME_SIZES:
+                for provider_set in provider_sets:
+                    test = {
+                        "plaintext": plaintext,
+                        "algorithm": algorithm,
+                        "frame-size": frame_size,
+                        "encryption-context": NON_UNICODE_ENCRYPTION_CONTEXT,
+                        "master-keys": provider_set,
+                    }
+                    yield test_id(test), test
+
+
+def encrypt_request(name, scenario, keys, keys_filename, plaintexts):
+    """Build the request that a handler receives to encrypt a single scenario.
+
+    :param str name: Test ID
+    :param dict scenario: Encryption scenario in the inline layout
+    :param KeysManifest keys: Keys manifest identified by the manifest
+    :param str keys_filename: Path to the keys manifest
+    :param dict plaintexts: Map of plaintext names to paths
+    :rtype: dict
+    """
+    return {
+        "test": name,
+        "keys": keys_filename,
+        "key-descriptions": {
+            master_key["key"]: keys["keys"][master_key["key"]] for master_key in scenario["master-keys"]
+        },
+        "plaintext": plaintexts[scenario["plaintext"]],
+        "algorithm": scenario["algorithm"],
+        "frame-size": scenario["frame-size"],
+        "encryption-context": scenario["encryption-context"],
+        "master-keys": scenario["master-keys"],
+    }
+
+
+def load_encrypt_requests(filename, plaintext_cache):
+    """Load an AWS Encryption SDK message encryption manifest and the keys manifest that it identifies
+    and build the handler request for every test.
+
+    :param str filename: Name of file containing the encrypt manifest
+    :param str plaintext_cache: Plaintext cache directory in which to materialize each plaintext
+        when the first request that encrypts it is built
+    :returns: Iterator of handler requests
+    """
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    with open_manifest(filename) as (header, tests):
+        if header["manifest"]["type"] != "awses-encrypt":
+            raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+        keys_filename = resolve_uri(header["keys"], base_directory)
+        keys = load_keys_manifest(keys_filename)
+        plaintexts = PlaintextCache(plaintext_cache).paths(header["plaintexts"])
+        tables = ScenarioTables(
+            {table: header[table] for table in ("encryption-contexts", "master-key-sets") if table in header}
+        )
+        for name, test in tests:
+            test = tables.expand(test)
+            request = encrypt_request(name, test, keys, keys_filename, plaintexts)
+            if "cost" in test:
+                request["cost"] = test["cost"]
+            yield request
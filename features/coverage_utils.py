@@ -0,0 +1,139 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import itertools
+import random
+
+# Number of candidate rows to build before keeping the one that covers the most new combinations
+_CANDIDATES = 10
+
+
+def coverage_strength(value):
+    """Parse a coverage level: "full", "pairwise", or "<t>-way".
+
+    :param str value: Coverage level
+    :returns: Number of dimensions whose every combination of values must be covered,
+        or None for the full cartesian product
+    """
+    if value == "full":
+        return None
+    if value == "pairwise":
+        return 2
+    if value.endswith("-way") and value[: -len("-way")].isdigit() and int(value[: -len("-way")]) >= 1:
+        return int(value[: -len("-way")])
+    raise ValueError('Unsupported coverage: "{}"'.format(value))
+
+
+def _combinations(sizes, strength):
+    """List every combination of values of every set of ``strength`` dimensions.
+
+    :returns: List of (dimension indices, value indices) pairs
+    """
+    combinations = []
+    for dimensions in itertools.combinations(range(len(sizes)), strength):
+        for values in itertools.product(*(range(sizes[dimension]) for dimension in dimensions)):
+            combinations.append((dimensions, values))
+    return combinations
+
+
+def _row_combinations(row, dimension_sets):
+    """List the combinations covered by a row of value indices."""
+    return [(dimensions, tuple(row[dimension] for dimension in dimensions)) for dimensions in dimension_sets]
+
+
+def _candidate(sizes, dimension_sets, seed_combination, uncovered, rng):
+    """Build a row that covers a given combination, filling the remaining dimensions in random order
+    with whichever value covers the most uncovered combinations with the dimensions filled so far.
+    """
+    row = [None] * len(sizes)
+    seed_dimensions, seed_values = seed_combination
+    for dimension, value in zip(seed_dimensions, seed_values):
+        row[dimension] = value
+
+    remaining = [dimension for dimension in range(len(sizes)) if row[dimension] is None]
+    rng.shuffle(remaining)
+    for dimension in remaining:
+        completed = [dimensions for dimensions in dimension_sets if dimension in dimensions]
+        completed = [
+            dimensions
+            for dimensions in completed
+            if all(row[other] is not None for other in dimensions if other != dimension)
+        ]
+        best_gain = -1
+        best_values = []
+        for value in range(sizes[dimension]):
+            row[dimension] = value
+            gain = sum(
+                (dimensions, tuple(row[member] for member in dimensions)) in uncovered for dimensions in completed
+            )
+            if gain > best_gain:
+                best_gain, best_values = gain, [value]
+            elif gain == best_gain:
+                best_values.append(value)
+        row[dimension] = rng.choice(best_values)
+    return tuple(row)
+
+
+def covering_array(sizes, strength=2, seed=0):
+    """Select rows of value indices such that every combination of values of every ``strength`` dimensions
+    appears in at least one row.
+
+    Rows are chosen greedily, each covering as many not yet covered combinations as possible,
+    so the result is close to the smallest such set. The same sizes, strength, and seed always
+    select the same rows.
+
+    :param list sizes: Number of values of each dimension
+    :param int strength: Number of dimensions whose combinations must be covered
+    :param seed: Seed for tie-breaking between equally good rows
+    :returns: List of tuples of value indices, one per dimension
+    """
+    strength = min(strength, len(sizes))
+    dimension_sets = list(itertools.combinations(range(len(sizes)), strength))
+    pending = _combinations(sizes, strength)
+    uncovered = set(pending)
+    rng = random.Random(seed)
+
+    rows = []
+    next_pending = 0
+    while uncovered:
+        while pending[next_pending] not in uncovered:
+            next_pending += 1
+        best_row, best_gain = None, -1
+        for _candidate_index in range(_CANDIDATES):
+            row = _candidate(sizes, dimension_sets, pending[next_pending], uncovered, rng)
+            gain = sum(combination in uncovered for combination in _row_combinations(row, dimension_sets))
+            if gain > best_gain:
+                best_row, best_gain = row, gain
+        rows.append(best_row)
+        uncovered.difference_update(_row_combinations(best_row, dimension_sets))
+    return rows
+
+
+def uncovered_combinations(sizes, rows, strength):
+    """Count the combinations of values of every ``strength`` dimensions that no row covers.
+
+    :param list sizes: Number of values of each dimension
+    :param rows: Iterable of tuples of value indices
+    :param int strength: Number of dimensions whose combinations must be covered
+    :returns: Number of uncovered combinations and total number of combinations
+    :rtype: tuple
+    """
+    strength = min(strength, len(sizes))
+    dimension_sets = list(itertools.combinations(range(len(sizes)), strength))
+    uncovered = set(_combinations(sizes, strength))
+    total = len(uncovered)
+    for row in rows:
+        uncovered.difference_update(_row_combinations(row, dimension_sets))
+    return len(uncovered), total
@@ -0,0 +1,553 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+import os
+from urllib.parse import urlunparse
+
+from awses_message_encryption_utils import (
+    TEST_ORDERS,
+    ScenarioTables,
+    checked_tests,
+    costed_tests,
+    deterministic_test_id_builder,
+    manifest_plaintexts,
+    ordered_tests,
+    random_test_id,
+    scenario_tables,
+)
+from coverage_utils import coverage_strength
+from keys_manifest_utils import load_keys_manifest
+from manifest_utils import (
+    COMPRESSIONS,
+    MANIFEST_FORMATS,
+    MANIFEST_WRITERS,
+    MESSAGE_MANIFEST_VERSION,
+    NORMALIZED_MANIFEST_VERSION,
+    SERIALIZED_MANIFEST_VERSION,
+    IncrementalTestIds,
+    encode_tests,
+    interleave_shards,
+    open_manifest,
+    output_stream,
+    run_shards,
+    shard_tests,
+    write_encoded_manifest,
+)
+
+
+def _whole_test(test):
+    """Treat a whole test description as its encryption scenario."""
+    return test
+
+
+class ManifestGenerator(object):
+    """Generator of an AWS Encryption SDK message manifest, which builds, validates, and writes its tests
+    as a single document, as a stream, or as shards built concurrently.
+
+    Instances are passed to shard worker processes, so every function they hold must be defined at module level.
+
+    :param str manifest_type: Type of manifest to generate
+    :param callable build_tests: Function that builds all (test ID, test description) pairs
+        given a keys manifest, a test ID builder, and scenario options
+    :param callable test_check: Function that builds the test count or coverage check of a manifest
+        given a keys manifest and a map of scenario options
+    :param callable scenario: Function that extracts the encryption scenario from a test description
+        (default: the whole test description)
+    :param dict option_versions: Map of scenario options to the manifest version that introduced them
+    """
+
+    def __init__(self, manifest_type, build_tests, test_check, scenario=_whole_test, option_versions=None):
+        self.manifest_type = manifest_type
+        self.build_tests = build_tests
+        self.test_check = test_check
+        self.scenario = scenario
+        self.option_versions = option_versions or {}
+
+    def version(self, scenario_options, manifest_format="json", layout="inline", compression="none"):
+        """Determine the lowest manifest version that can describe a manifest.
+
+        :param dict scenario_options: Keyword arguments for ``build_tests``
+        :param str manifest_format: Serialization of the manifest: "json", "jsonl", or "msgpack"
+        :param str layout: Layout of the manifest: "inline" or "normalized"
+        :param str compression: Compression of the manifest: "none", "gzip", or "zstd"
+        """
+        version = MESSAGE_MANIFEST_VERSION
+        if manifest_format != "json" or compression != "none":
+            version = SERIALIZED_MANIFEST_VERSION
+        if layout == "normalized":
+            version = NORMALIZED_MANIFEST_VERSION
+        for option, option_version in self.option_versions.items():
+            if scenario_options.get(option):
+                version = max(version, option_version)
+        return version
+
+    def header(self, keys_filename, version=MESSAGE_MANIFEST_VERSION, throughput=False):
+        """Build all top-level manifest members other than the tests.
+
+        :param str keys_file: Name of file containing the keys manifest
+        :param int version: Manifest version to identify
+        :param bool throughput: Whether the manifest includes the throughput tests
+        """
+        keys_path = "/".join(keys_filename.split(os.path.sep))
+        keys_uri = urlunparse(("file", keys_path, "", "", "", ""))
+
+        return {
+            "manifest": {"type": self.manifest_type, "version": version},
+            "keys": keys_uri,
+            "plaintexts": manifest_plaintexts(throughput),
+        }
+
+    def test_manifest(self, keys, manifest, **scenario_options):
+        """Test that the manifest is actually complete.
+
+        :param keys: Parsed keys manifest or KeysManifest
+        :param dict manifest: Full manifest to test
+        :param scenario_options: Keyword arguments with which ``build_tests`` built the tests
+        """
+        test_check = self.test_check(keys, scenario_options)
+        for _name, _test in checked_tests(manifest["tests"].items(), test_check, self.scenario):
+            pass
+        test_check.check()
+
+    def build_manifest(
+        self, keys_filename, test_id=random_test_id, order="matrix", cost_hints=False, keys=None, **scenario_options
+    ):
+        """Build the test-case manifest which directs the behavior of cross-compatibility clients.
+
+        :param str keys_file: Name of file containing the keys manifest
+        :param callable test_id: Function that builds a test ID given a test description
+        :param str order: Order in which to list tests: "matrix", "interleaved", or "risk"
+        :param bool cost_hints: Whether to add cost hints to every test
+        :param keys: Parsed keys manifest or KeysManifest, if already loaded from ``keys_filename``
+        :param scenario_options: Keyword arguments for ``build_tests``
+        """
+        if keys is None:
+            keys = load_keys_manifest(keys_filename)
+
+        version = self.version(scenario_options)
+        manifest = self.header(keys_filename, version, scenario_options.get("throughput", False))
+        tests = (test for _name, test in self.build_tests(keys, lambda _test: None, **scenario_options))
+        tests = ordered_tests(tests, order, self.scenario)
+        tests = ((test_id(test), test) for test in tests)
+        if cost_hints:
+            tests = costed_tests(tests, self.scenario)
+        manifest["tests"] = dict(tests)
+        self.test_manifest(keys, manifest, **scenario_options)
+        return manifest
+
+    def manifest_parts(
+        self,
+        keys_filename,
+        test_id,
+        scenario_options,
+        order,
+        cost_hints,
+        manifest_format,
+        layout,
+        shard_count,
+        shard_index,
+        compression="none",
+    ):
+        """Build the parts of a streamed test-case manifest.
+
+        :param str keys_file: Name of file containing the keys manifest
+        :param callable test_id: Function that builds a test ID given a test description
+        :param dict scenario_options: Keyword arguments for ``build_tests``
+        :param str order: Order in which to list tests: "matrix", "interleaved", or "risk"
+        :param bool cost_hints: Whether to add cost hints to every test
+        :param str manifest_format: Serialization to write: "json", "jsonl", or "msgpack"
+        :param str layout: Layout of the manifest: "inline" or "normalized"
+        :param int shard_count: Number of shards into which to split the tests
+        :param int shard_index: Index of the shard of tests to build
+        :param str compression: Compression of the manifest: "none", "gzip", or "zstd"
+        :returns: Manifest header, iterator of (test ID, test description) pairs,
+            and a callable that validates test counts or coverage once all tests have been consumed
+        """
+        keys = load_keys_manifest(keys_filename)
+        version = self.version(scenario_options, manifest_format, layout, compression)
+        header = self.header(keys_filename, version, scenario_options.get("throughput", False))
+
+        test_check = self.test_check(keys, scenario_options)
+        tests = checked_tests(self.build_tests(keys, lambda _test: None, **scenario_options), test_check, self.scenario)
+        tests = ordered_tests((test for _name, test in tests), order, self.scenario)
+        tests = shard_tests(tests, test_id, shard_count, shard_index)
+        if cost_hints:
+            tests = costed_tests(tests, self.scenario)
+        if layout == "normalized":
+            tables = scenario_tables(
+                test for _name, test in self.build_tests(keys, lambda _test: None, **scenario_options)
+            )
+            header.update(tables.tables)
+            tests = tables.normalizing_tests(tests)
+
+        return header, tests, test_check.check
+
+    def stream_manifest(
+        self,
+        keys_filename,
+        stream,
+        indent=None,
+        test_id=random_test_id,
+        manifest_format="json",
+        layout="inline",
+        shard_count=1,
+        shard_index=0,
+        order="matrix",
+        cost_hints=False,
+        compression="none",
+        **scenario_options
+    ):
+        """Write the test-case manifest to a stream as each test is built,
+        validating test counts or coverage once all tests are written.
+
+        :param str keys_file: Name of file containing the keys manifest
+        :param stream: Stream to which to write the manifest
+        :param int indent: Indentation width, or None for compact output
+        :param callable test_id: Function that builds a test ID given a test description
+        :param str manifest_format: Serialization to write: "json", "jsonl", or "msgpack"
+        :param str layout: Layout of the manifest: "inline" or "normalized"
+        :param int shard_count: Number of shards into which to split the tests
+        :param int shard_index: Index of the shard of tests to write
+        :param str order: Order in which to list tests: "matrix", "interleaved", or "risk"
+        :param bool cost_hints: Whether to add cost hints to every test
+        :param str compression: Compression that the stream applies: "none", "gzip", or "zstd"
+        :param scenario_options: Keyword arguments for ``build_tests``
+        """
+        header, tests, validate = self.manifest_parts(
+            keys_filename,
+            test_id,
+            scenario_options,
+            order,
+            cost_hints,
+            manifest_format,
+            layout,
+            shard_count,
+            shard_index,
+            compression,
+        )
+        MANIFEST_WRITERS[manifest_format](stream, header, tests, indent)
+        validate()
+
+    def stream_sharded_manifest(
+        self,
+        keys_filename,
+        stream,
+        shard_count,
+        jobs,
+        indent=None,
+        id_seed=None,
+        manifest_format="json",
+        layout="inline",
+        order="matrix",
+        cost_hints=False,
+        compression="none",
+        **scenario_options
+    ):
+        """Build all shards of the test-case manifest concurrently and write them to a stream as a single manifest.
+
+        Tests are written in the same order as an unsharded manifest.
+
+        :param str keys_file: Name of file containing the keys manifest
+        :param stream: Stream to which to write the manifest
+        :param int shard_count: Number of shards into which to split the tests
+        :param int jobs: Maximum number of worker processes
+        :param int indent: Indentation width, or None for compact output
+        :param str id_seed: Seed for deterministic test IDs, or None for random test IDs
+        :param str manifest_format: Serialization to write: "json", "jsonl", or "msgpack"
+        :param str layout: Layout of the manifest: "inline" or "normalized"
+        :param str order: Order in which to list tests: "matrix", "interleaved", or "risk"
+        :param bool cost_hints: Whether to add cost hints to every test
+        :param str compression: Compression that the stream applies: "none", "gzip", or "zstd"
+        :param scenario_options: Keyword arguments for ``build_tests``
+        """
+        header, _tests, _validate = self.manifest_parts(
+            keys_filename,
+            random_test_id,
+            scenario_options,
+            order,
+            cost_hints,
+            manifest_format,
+            layout,
+            1,
+            0,
+            compression,
+        )
+        shards = run_shards(
+            _encode_shard,
+            shard_count,
+            jobs,
+            self,
+            keys_filename,
+            id_seed,
+            scenario_options,
+            order,
+            cost_hints,
+            manifest_format,
+            layout,
+            indent,
+        )
+        write_encoded_manifest(manifest_format, stream, header, interleave_shards(shards), indent)
+
+
+def _shard_test_id(id_seed):
+    """Build the test ID builder for a shard worker process.
+
+    :param str id_seed: Seed for deterministic test IDs, or None for random test IDs
+    """
+    if id_seed is None:
+        return random_test_id
+    return deterministic_test_id_builder(id_seed)
+
+
+def _encode_shard(
+    generator,
+    keys_filename,
+    id_seed,
+    scenario_options,
+    order,
+    cost_hints,
+    manifest_format,
+    layout,
+    indent,
+    shard_count,
+    shard_index,
+):
+    """Build and serialize a single shard of tests in a worker process.
+
+    :returns: List of serialized tests
+    """
+    _header, tests, validate = generator.manifest_parts(
+        keys_filename,
+        _shard_test_id(id_seed),
+        scenario_options,
+        order,
+        cost_hints,
+        manifest_format,
+        layout,
+        shard_count,
+        shard_index,
+    )
+    encoded = list(encode_tests(manifest_format, tests, indent))
+    validate()
+    return encoded
+
+
+def _write_shard(
+    generator,
+    keys_filename,
+    id_seed,
+    scenario_options,
+    order,
+    cost_hints,
+    manifest_format,
+    layout,
+    indent,
+    compression,
+    output,
+    shard_count,
+    shard_index,
+):
+    """Write a single shard of tests as a complete manifest in a worker process."""
+    with output_stream(output.format(index=shard_index), manifest_format == "msgpack", compression) as stream:
+        generator.stream_manifest(
+            keys_filename,
+            stream,
+            indent,
+            _shard_test_id(id_seed),
+            manifest_format,
+            layout,
+            shard_count,
+            shard_index,
+            order,
+            cost_hints,
+            compression,
+            **scenario_options
+        )
+
+
+def add_generator_arguments(parser, coverage_dimensions):
+    """Add the arguments that every message manifest generator accepts.
+
+    :param parser: Argument parser of the generator CLI
+    :param str coverage_dimensions: Description of the dimensions of the scenario matrix
+    """
+    parser.add_argument("--human", action="store_true", help="Print human-readable JSON")
+    parser.add_argument("--keys", required=True, help="Keys manifest to use")
+    parser.add_argument("--stream", action="store_true", help="Write each test as it is built")
+    parser.add_argument(
+        "--throughput", action="store_true", help="Include tests that pair large plaintexts with realistic frame sizes"
+    )
+    parser.add_argument(
+        "--coverage",
+        type=coverage_strength,
+        default="full",
+        help='Scenarios to include: "full" for every combination of {}, or "pairwise" or "<t>-way" '
+        "for a minimal set that covers every combination of values of any 2 or t of those "
+        "(default: full)".format(coverage_dimensions),
+    )
+    parser.add_argument(
+        "--coverage-seed", type=int, default=0, help="Seed that selects between equally small covering sets"
+    )
+    parser.add_argument(
+        "--order",
+        default="matrix",
+        choices=TEST_ORDERS,
+        help="Order of the tests: as built, interleaved across algorithm suites, "
+        "or tamperings and signed algorithm suites first (default: matrix)",
+    )
+    parser.add_argument(
+        "--cost-hints", action="store_true", help="Add estimated cost hints to every test for runner scheduling"
+    )
+    parser.add_argument("--output", help="File to which to write the manifest (implies --stream, default: stdout)")
+    parser.add_argument(
+        "--deterministic-ids", action="store_true", help="Derive test IDs from test content rather than at random"
+    )
+    parser.add_argument("--id-seed", default="", help="Seed for deterministic test IDs")
+    parser.add_argument(
+        "--update-from", help="Previously generated manifest from which to reuse the IDs of unchanged tests"
+    )
+    parser.add_argument("--delta-report", help="File to which to write the differences from --update-from")
+    parser.add_argument(
+        "--format", default="json", choices=MANIFEST_FORMATS, help="Serialization of the manifest (implies --stream)"
+    )
+    parser.add_argument(
+        "--compression", default="none", choices=COMPRESSIONS, help="Compression of the manifest (implies --stream)"
+    )
+    parser.add_argument(
+        "--layout",
+        default="inline",
+        choices=("inline", "normalized"),
+        help="Layout of the manifest (normalized implies --stream)",
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1, help="Number of shards into which to split the tests (implies --stream)"
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        help="Write only this shard of the tests; otherwise build all shards concurrently and write them "
+        'as a single manifest, or as one manifest per shard if --output contains "{index}"',
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Maximum number of shard worker processes")
+
+
+def run_generator(generator, parser, parsed, scenario_options):
+    """Generate a manifest as directed by the arguments from :func:`add_generator_arguments`.
+
+    :param ManifestGenerator generator: Generator of the manifest
+    :param parser: Argument parser of the generator CLI, used to report invalid combinations of arguments
+    :param parsed: Parsed CLI arguments
+    :param dict scenario_options: Keyword arguments for ``build_tests``
+    :returns: The manifest as a JSON string if it was built as a single document, otherwise None
+    """
+    if parsed.delta_report and not parsed.update_from:
+        parser.error("--delta-report requires --update-from")
+    if parsed.shards < 1:
+        parser.error("--shards must be at least 1")
+    if parsed.shard_index is not None and not 0 <= parsed.shard_index < parsed.shards:
+        parser.error("--shard-index must be less than --shards")
+    if parsed.update_from and parsed.shards > 1:
+        parser.error("--update-from cannot be combined with --shards")
+
+    kwargs = {}
+    if parsed.human:
+        kwargs["indent"] = 4
+
+    test_id = random_test_id
+    id_seed = None
+    if parsed.deterministic_ids:
+        test_id = deterministic_test_id_builder(parsed.id_seed)
+        id_seed = parsed.id_seed
+
+    if parsed.update_from:
+        # The previous manifest may use any serialization, compression, or layout
+        with open_manifest(parsed.update_from) as (header, tests):
+            tables = ScenarioTables(
+                {table: header[table] for table in ("encryption-contexts", "master-key-sets") if table in header}
+            )
+            test_id = IncrementalTestIds(((name, tables.expand(test)) for name, test in tests), test_id)
+
+    binary = parsed.format == "msgpack"
+    streaming = (
+        parsed.stream
+        or parsed.output
+        or parsed.format != "json"
+        or parsed.compression != "none"
+        or parsed.layout != "inline"
+        or parsed.shards > 1
+    )
+    manifest = None
+    if parsed.shards > 1 and parsed.shard_index is None:
+        if parsed.output and "{index}" in parsed.output:
+            run_shards(
+                _write_shard,
+                parsed.shards,
+                parsed.jobs,
+                generator,
+                parsed.keys,
+                id_seed,
+                scenario_options,
+                parsed.order,
+                parsed.cost_hints,
+                parsed.format,
+                parsed.layout,
+                kwargs.get("indent"),
+                parsed.compression,
+                parsed.output,
+            )
+        else:
+            with output_stream(parsed.output or "-", binary, parsed.compression) as stream:
+                generator.stream_sharded_manifest(
+                    parsed.keys,
+                    stream,
+                    parsed.shards,
+                    parsed.jobs,
+                    id_seed=id_seed,
+                    manifest_format=parsed.format,
+                    layout=parsed.layout,
+                    order=parsed.order,
+                    cost_hints=parsed.cost_hints,
+                    compression=parsed.compression,
+                    **scenario_options,
+                    **kwargs
+                )
+    elif streaming:
+        with output_stream(parsed.output or "-", binary, parsed.compression) as stream:
+            generator.stream_manifest(
+                parsed.keys,
+                stream,
+                test_id=test_id,
+                manifest_format=parsed.format,
+                layout=parsed.layout,
+                shard_count=parsed.shards,
+                shard_index=parsed.shard_index or 0,
+                order=parsed.order,
+                cost_hints=parsed.cost_hints,
+                compression=parsed.compression,
+                **scenario_options,
+                **kwargs
+            )
+    else:
+        manifest = generator.build_manifest(parsed.keys, test_id, parsed.order, parsed.cost_hints, **scenario_options)
+
+    if parsed.delta_report:
+        with open(parsed.delta_report, "w") as delta_file:
+            json.dump(test_id.delta_report(), delta_file, indent=4)
+
+    if manifest is None:
+        return None
+
+    return json.dumps(manifest, **kwargs)
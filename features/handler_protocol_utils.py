@@ -0,0 +1,355 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from urllib.parse import quote
+
+from awses_message_decryption_utils import TestTimeout, check_decryption, file_digest
+from result_report_utils import process_usage, request_dimensions, reset_peak_memory
+
+PROTOCOL_NAME = "awses-handler"
+PROTOCOL_VERSION = 1
+OPERATIONS = ("encrypt", "decrypt")
+
+# Seconds to wait for a handler to exit after its stdin is closed before killing it
+_STOP_TIMEOUT = 5
+
+
+class HandlerExited(Exception):
+    """Raised when a handler process exits or closes its stdout unexpectedly."""
+
+
+class HandlerStartTimeout(Exception):
+    """Raised when a handler does not say hello within the startup timeout."""
+
+
+class HandlerProtocolError(ValueError):
+    """Raised when a handler writes a message that does not follow the handler protocol."""
+
+
+def _read_lines(stream, lines):
+    """Forward each line of a stream to a queue, followed by None once the stream is closed."""
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+class WarmHandler(object):
+    """Persistent handler process that serves one request at a time over newline-delimited JSON.
+
+    :param list command: Handler command arguments
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.operations = ()
+        self.client = None
+        self._process = None
+        self._lines = None
+        self._last_id = 0
+
+    def start(self, timeout=None):
+        """Start the handler process and wait for its hello message.
+
+        :param float timeout: Seconds to wait for the hello message, or None to wait indefinitely
+        """
+        self._process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=_read_lines, args=(self._process.stdout, self._lines), daemon=True).start()
+
+        try:
+            hello = self._receive(timeout)
+        except TestTimeout as error:
+            self.kill()
+            raise HandlerStartTimeout("Handler did not start within {} seconds".format(timeout)) from error
+        if hello.get("protocol") != PROTOCOL_NAME or hello.get("version") != PROTOCOL_VERSION:
+            self.kill()
+            raise ValueError("Unsupported handler protocol: {}".format(json.dumps(hello)))
+        self.operations = tuple(hello.get("operations", ()))
+        self.client = hello.get("client")
+
+    @property
+    def pid(self):
+        """Process ID of the running handler process."""
+        return self._process.pid
+
+    def identity(self):
+        """Describe the handler process for test results.
+
+        :rtype: dict
+        """
+        identity = {"kind": "warm", "name": " ".join(self.command), "pid": self.pid}
+        if self.client is not None:
+            identity["client"] = self.client
+        return identity
+
+    def _receive(self, timeout):
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty as error:
+            raise TestTimeout() from error
+        if line is None:
+            raise HandlerExited()
+        try:
+            message = json.loads(line)
+        except ValueError as error:
+            raise HandlerProtocolError("Handler wrote a message that is not JSON: {!r}".format(line)) from error
+        if not isinstance(message, dict):
+            raise HandlerProtocolError("Handler wrote a message that is not a JSON object: {!r}".format(line))
+        return message
+
+    def call(self, operation, request, timeout=None):
+        """Send a request to the handler and wait for its response.
+
+        :param str operation: "encrypt" or "decrypt"
+        :param dict request: Handler request
+        :param float timeout: Seconds to wait for the response, or None to wait indefinitely
+        :returns: Handler response
+        :rtype: dict
+        """
+        self._last_id += 1
+        message = {"id": self._last_id, "operation": operation, "request": request}
+        try:
+            self._process.stdin.write(json.dumps(message) + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as error:
+            raise HandlerExited() from error
+
+        response = self._receive(timeout)
+        if response.get("id") != self._last_id:
+            raise HandlerProtocolError("Handler response does not match request: {}".format(json.dumps(response)))
+        if response.get("status") not in ("ok", "error"):
+            raise HandlerProtocolError("Handler response has no valid status: {}".format(json.dumps(response)))
+        return response
+
+    def stop(self):
+        """Ask the handler to exit by closing its stdin, killing it if it does not exit promptly."""
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=_STOP_TIMEOUT)
+        except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        """Kill the handler immediately."""
+        self._process.kill()
+        self._process.wait()
+
+    def restart(self, timeout=None):
+        """Replace a handler that timed out or exited with a new process.
+
+        :param float timeout: Seconds to wait for the hello message, or None to wait indefinitely
+        """
+        self.kill()
+        self.start(timeout)
+
+
+def _check_encryption(request, response):
+    """Check the response to an encrypt request.
+
+    Encryption tests pass once the handler has written a ciphertext;
+    decrypting the ciphertexts is the job of a later decrypt manifest.
+    """
+    if response["status"] != "ok":
+        return "fail", response.get("error", "Encryption failed")
+    if not os.path.isfile(request["output"]):
+        return "fail", "Handler did not write the ciphertext"
+    return "pass", None
+
+
+def _check_decryption(request, response):
+    """Check the response to a decrypt request against the expected result, then remove the decrypted plaintext."""
+    plaintext_digest = None
+    if response["status"] == "ok":
+        if not os.path.isfile(request["output"]):
+            return "fail", "Handler did not write the plaintext"
+        plaintext_digest = file_digest(request["output"])
+        os.remove(request["output"])
+    return check_decryption(request, plaintext_digest)
+
+
+_CHECKS = {"encrypt": _check_encryption, "decrypt": _check_decryption}
+
+
+def _file_size(filename):
+    """Get the size of a file, or 0 if it does not exist."""
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def _run_request(handler, operation, request, timeout, startup_timeout):
+    """Run a single test on a warm handler, restarting the handler if it times out, exits,
+    or violates the handler protocol.
+
+    The CPU time and peak memory of the handler while it serves the test are measured where the platform
+    exposes them for running processes (Linux).
+
+    :returns: Test result, with the timing and resource usage members of a result report
+    :rtype: dict
+    """
+    identity = handler.identity()
+    peak_reset = reset_peak_memory(handler.pid)
+    usage_before = process_usage(handler.pid)
+    start = time.perf_counter()
+    usage, output_size = {}, 0
+    try:
+        response = handler.call(operation, request, timeout)
+    except TestTimeout:
+        handler.restart(startup_timeout)
+        status, detail = "timeout", "Handler did not respond within {} seconds".format(timeout)
+    except HandlerExited:
+        handler.restart(startup_timeout)
+        status, detail = "fail", "Handler exited"
+    except HandlerProtocolError as error:
+        handler.restart(startup_timeout)
+        status, detail = "fail", str(error)
+    else:
+        usage = process_usage(handler.pid)
+        output_size = _file_size(request["output"])
+        status, detail = _CHECKS[operation](request, response)
+
+    result = {"test": request["test"], "status": status, "duration": time.perf_counter() - start}
+    if detail is not None:
+        result["detail"] = detail
+    if "cpu-time" in usage and "cpu-time" in usage_before:
+        result["cpu-time"] = usage["cpu-time"] - usage_before["cpu-time"]
+    if peak_reset and "peak-memory" in usage:
+        result["peak-memory"] = usage["peak-memory"]
+    result["bytes"] = _file_size(request["plaintext" if operation == "encrypt" else "ciphertext"]) + output_size
+    result["handler"] = identity
+    result["dimensions"] = request_dimensions(request)
+    return result
+
+
+def _serve(command, operation, requests, results, timeout, startup_timeout):
+    """Run tests from a queue on one warm handler until the queue yields None."""
+    try:
+        handler = WarmHandler(command)
+        handler.start(startup_timeout)
+        if operation not in handler.operations:
+            handler.stop()
+            raise ValueError('Handler does not support the "{}" operation'.format(operation))
+        try:
+            for request in iter(requests.get, None):
+                results.put(_run_request(handler, operation, request, timeout, startup_timeout))
+        finally:
+            handler.stop()
+    except Exception as error:  # Re-raised by the driver thread
+        results.put(error)
+    results.put(None)
+
+
+def longest_first(requests):
+    """Order requests by decreasing cost, so that the most expensive tests start first
+    and all handlers in a pool finish at about the same time.
+
+    The cost of a request is the weight of its cost hints if it has any,
+    or otherwise the size of the file that it encrypts or decrypts.
+
+    :param requests: Iterable of handler requests
+    :rtype: list
+    """
+
+    def _weight(request):
+        if "cost" in request:
+            return request["cost"]["weight"]
+        return os.path.getsize(request["plaintext"] if "plaintext" in request else request["ciphertext"])
+
+    return sorted(requests, key=_weight, reverse=True)
+
+
+def output_path(output_directory, test_id):
+    """Build the path to which a handler writes its output for a test.
+
+    Test IDs are percent-encoded, so that every ID maps to a distinct file directly in the output directory.
+
+    :param str output_directory: Directory to which handlers write their output
+    :param str test_id: Test ID
+    :raises ValueError: if the test ID does not name a file in the output directory
+    :rtype: str
+    """
+    filename = quote(test_id, safe="")
+    path = os.path.join(output_directory, filename)
+    if filename in ("", ".", "..") or os.path.dirname(os.path.abspath(path)) != os.path.abspath(output_directory):
+        raise ValueError('Test ID does not name a file in the output directory: "{}"'.format(test_id))
+    return path
+
+
+def run_pooled(command, operation, requests, output_directory, workers=1, timeout=None, startup_timeout=None):
+    """Run tests across a pool of warm handlers, each of which serves many tests.
+
+    Each handler writes its output for a test to the path built by :func:`output_path`.
+    Ciphertexts from encrypt tests are kept there; plaintexts from decrypt tests are removed once checked.
+
+    :param list command: Handler command arguments
+    :param str operation: "encrypt" or "decrypt"
+    :param requests: Iterable of handler requests
+    :param str output_directory: Directory to which handlers write their output
+    :param int workers: Number of warm handlers
+    :param float timeout: Per-test timeout in seconds, or None to wait indefinitely
+    :param float startup_timeout: Seconds to wait for each handler to start, or None to wait indefinitely
+    :returns: Iterator of test results, in the order in which tests finish
+    """
+    if operation not in OPERATIONS:
+        raise ValueError('Unsupported operation: "{}"'.format(operation))
+    os.makedirs(output_directory, exist_ok=True)
+
+    pending = queue.Queue(maxsize=2 * workers)
+    results = queue.Queue()
+    threads = [
+        threading.Thread(
+            target=_serve, args=(command, operation, pending, results, timeout, startup_timeout), daemon=True
+        )
+        for _worker in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def _feed():
+        try:
+            for request in requests:
+                request = dict(request, output=output_path(output_directory, request["test"]))
+                pending.put(request)
+        except Exception as error:  # Re-raised by the driver thread
+            results.put(error)
+        finally:
+            for _thread in threads:
+                pending.put(None)
+
+    threading.Thread(target=_feed, daemon=True).start()
+
+    running = len(threads)
+    while running:
+        result = results.get()
+        if result is None:
+            running -= 1
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            yield result
@@ -0,0 +1,270 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import base64
+import collections
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+# Version of the layout of keys cache files, so that stale caches are ignored rather than misread
+KEYS_CACHE_VERSION = 1
+
+
+def _serialization():
+    """Import the optional cryptography serialization module."""
+    try:
+        from cryptography.hazmat.primitives import serialization
+    except ImportError as error:
+        raise ImportError('Parsing RSA keys requires the "cryptography" package') from error
+    return serialization
+
+
+def _load_der_private_key(serialization, der):
+    """Load a DER private key that was already validated when it was first parsed."""
+    try:
+        return serialization.load_der_private_key(der, password=None, unsafe_skip_rsa_key_validation=True)
+    except TypeError:  # cryptography < 39 always validates
+        return serialization.load_der_private_key(der, password=None)
+
+
+def key_material_text(key):
+    """Get the encoded key material of a key description as a single string.
+
+    Version 1 keys manifests store key material as a list of lines,
+    joined by the key's ``line-separator``.
+
+    :param dict key: Key description
+    :rtype: str
+    """
+    material = key["material"]
+    if isinstance(material, list):
+        return key.get("line-separator", "").join(material)
+    return material
+
+
+class KeysManifest(object):
+    """Parsed keys manifest, indexed by the key attributes that generators filter on.
+
+    Indexes are built once on creation, so filtering keys never rescans the manifest.
+    Items are exposed as they appear in the parsed manifest, so ``keys_manifest["keys"]``
+    behaves exactly as it would for the parsed manifest itself.
+
+    Key material is only decoded and parsed the first time each key is requested,
+    and is then memoized for the lifetime of the KeysManifest.
+
+    :param dict manifest: Parsed keys manifest
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self._material = {}
+        self._der = {}
+        self._parsed = {}
+        self._by_algorithm = collections.defaultdict(list)
+        self._by_type = collections.defaultdict(list)
+        self._by_encrypt = collections.defaultdict(list)
+        self._by_decrypt = collections.defaultdict(list)
+
+        for name, key in manifest["keys"].items():
+            self._by_algorithm[key.get("algorithm", None)].append((name, key))
+            self._by_type[key["type"]].append((name, key))
+            self._by_encrypt[key["encrypt"]].append((name, key))
+            self._by_decrypt[key["decrypt"]].append((name, key))
+
+    @classmethod
+    def load(cls, filename, cache_directory=None):
+        """Load and index a keys manifest file.
+
+        If a cache directory is given, the decoded key material is read from a cache file
+        keyed by the digest of the keys manifest, or written to one if there is none yet.
+
+        :param str filename: Name of file containing the keys manifest
+        :param str cache_directory: Keys cache directory (optional)
+        """
+        with open(filename, "rb") as keys_file:
+            raw_manifest = keys_file.read()
+        keys = cls(json.loads(raw_manifest.decode("utf-8")))
+
+        if cache_directory is not None:
+            cache_filename = os.path.join(
+                cache_directory, "keys-{}.pickle".format(hashlib.sha256(raw_manifest).hexdigest())
+            )
+            if not keys._read_cache(cache_filename):
+                keys._write_cache(cache_filename)
+        return keys
+
+    def _read_cache(self, cache_filename):
+        """Read decoded key material from a cache file.
+
+        :returns: False if the cache is missing, stale, or cannot be loaded for any reason
+        """
+        try:
+            with open(cache_filename, "rb") as cache_file:
+                cache = pickle.load(cache_file)
+            if cache["version"] != KEYS_CACHE_VERSION:
+                return False
+            material, der = dict(cache["material"]), dict(cache["der"])
+        except Exception:  # A cache that cannot be loaded is a miss, and is rewritten
+            return False
+        self._material.update(material)
+        self._der.update(der)
+        return True
+
+    def _write_cache(self, cache_filename):
+        """Decode all key material and write it to a cache file.
+
+        Parsed key objects cannot be pickled, so PEM keys are cached as DER,
+        which loads without decoding and, having been validated once here, without validation.
+        """
+        material = {}
+        der = {}
+        for name, key in self.manifest["keys"].items():
+            if key["type"] == "aws-kms":
+                continue
+            if key["encoding"] == "pem":
+                der[name] = self._der_bytes(name)
+            else:
+                material[name] = self.material(name)
+
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(cache_filename), prefix=".tmp-")
+        with os.fdopen(descriptor, "wb") as cache_file:
+            pickle.dump({"version": KEYS_CACHE_VERSION, "material": material, "der": der}, cache_file)
+        os.replace(temporary_path, cache_filename)
+
+    def __getitem__(self, member):
+        """Look up a top-level member of the parsed manifest.
+
+        :param str member: Manifest member name
+        """
+        return self.manifest[member]
+
+    def material(self, name):
+        """Get the decoded key material of a key: raw key bytes for base64 keys, or PEM bytes for PEM keys.
+
+        :param str name: Key name
+        :rtype: bytes
+        """
+        if name not in self._material:
+            key = self.manifest["keys"][name]
+            text = key_material_text(key)
+            if key["encoding"] == "base64":
+                self._material[name] = base64.b64decode(text)
+            elif key["encoding"] == "pem":
+                self._material[name] = text.encode("utf-8")
+            else:
+                raise ValueError('Unsupported key encoding: "{}"'.format(key["encoding"]))
+        return self._material[name]
+
+    def _der_bytes(self, name):
+        serialization = _serialization()
+        parsed = self.key(name)
+        if self.manifest["keys"][name]["type"] == "private":
+            return parsed.private_bytes(
+                serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )
+        return parsed.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+    def key(self, name):
+        """Get the parsed key for a key name: key bytes for symmetric keys, a cryptography key object for
+        RSA keys, or the key ID for AWS KMS keys.
+
+        :param str name: Key name
+        """
+        if name not in self._parsed:
+            key = self.manifest["keys"][name]
+            if key["type"] == "aws-kms":
+                parsed = key["key-id"]
+            elif key["type"] == "symmetric":
+                parsed = self.material(name)
+            elif name in self._der:
+                serialization = _serialization()
+                if key["type"] == "private":
+                    parsed = _load_der_private_key(serialization, self._der[name])
+                else:
+                    parsed = serialization.load_der_public_key(self._der[name])
+            elif key["type"] == "private":
+                parsed = _serialization().load_pem_private_key(self.material(name), password=None)
+            elif key["type"] == "public":
+                parsed = _serialization().load_pem_public_key(self.material(name))
+            else:
+                raise ValueError('Unsupported key type: "{}"'.format(key["type"]))
+            self._parsed[name] = parsed
+        return self._parsed[name]
+
+    def for_algorithm(self, algorithm_name):
+        """List (name, key) pairs for all keys with the given algorithm.
+
+        :param str algorithm_name: Key algorithm name
+        """
+        return self._by_algorithm.get(algorithm_name, [])
+
+    def for_type(self, type_name):
+        """List (name, key) pairs for all keys with the given type.
+
+        :param str type_name: Key type name
+        """
+        return self._by_type.get(type_name, [])
+
+    def for_encrypt(self, encrypt_value):
+        """List (name, key) pairs for all keys with the given encrypt value.
+
+        :param bool encrypt_value: Encrypt value
+        """
+        return self._by_encrypt.get(encrypt_value, [])
+
+    def for_decrypt(self, decrypt_value):
+        """List (name, key) pairs for all keys with the given decrypt value.
+
+        :param bool decrypt_value: Decrypt value
+        """
+        return self._by_decrypt.get(decrypt_value, [])
+
+
+def keys_manifest(keys):
+    """Get an indexed keys manifest, indexing a parsed keys manifest if necessary.
+
+    :param keys: Parsed keys manifest or KeysManifest
+    :rtype: KeysManifest
+    """
+    if isinstance(keys, KeysManifest):
+        return keys
+    return KeysManifest(keys)
+
+
+@functools.lru_cache()
+def _load_keys_manifest(filename, _mtime, _size, cache_directory):
+    """Load a keys manifest, memoized by absolute file name and by the modification time and size of the file."""
+    return KeysManifest.load(filename, cache_directory)
+
+
+def load_keys_manifest(filename, cache_directory=None):
+    """Load a keys manifest at most once per process, so that every test that uses it
+    shares the same memoized keys.
+
+    Every manifest that refers to the same file shares it, however the file name is spelled,
+    until the file is replaced or modified.
+
+    :param str filename: Name of file containing the keys manifest
+    :param str cache_directory: Keys cache directory (optional)
+    :rtype: KeysManifest
+    """
+    filename = os.path.abspath(filename)
+    status = os.stat(filename)
+    return _load_keys_manifest(filename, status.st_mtime_ns, status.st_size, cache_directory)
@@ -0,0 +1,450 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import functools
+import json
+import os
+
+from awses_message_encryption_utils import ALGORITHM_SUITES, BYTE_TAMPERINGS, TAMPERINGS
+from manifest_utils import NORMALIZED_MANIFEST_VERSION, SHARED_TAMPERING_MANIFEST_VERSION, open_manifest, resolve_uri
+
+# Manifest versions described by the feature documents
+SUPPORTED_VERSIONS = {
+    "keys": (1, 2, 3),
+    "awses-encrypt": (1, 2, 3, 4),
+    "awses-decrypt-generate": (1, 2, 3, 4, 5),
+    "awses-decrypt": (1, 2, 3),
+}
+
+# A validator is a function of a value, the location of the value in the manifest, and a validation context.
+# It appends a message to the context's errors for every problem that it finds, and returns whether it found none.
+# The context also holds the names that references may resolve to, or None where those names are unknown.
+
+
+def _location(location, member):
+    """Build the location of a member of the value at a location."""
+    if not location:
+        return str(member)
+    return "{}/{}".format(location, member)
+
+
+def _fail(context, location, message):
+    """Record a validation error and report failure."""
+    context["errors"].append("{}: {}".format(location or "(root)", message))
+    return False
+
+
+def _typed(value_type, description):
+    """Build a validator that accepts values of a single JSON type."""
+
+    def _validate(value, location, context):
+        if isinstance(value, value_type) and (value_type is bool or not isinstance(value, bool)):
+            return True
+        return _fail(context, location, "must be " + description)
+
+    return _validate
+
+
+def _any(_value, _location, _context):
+    """Accept any value."""
+    return True
+
+
+_STRING = _typed(str, "a string")
+_BOOLEAN = _typed(bool, "a boolean")
+
+
+def _integer(minimum):
+    """Build a validator that accepts integers of at least ``minimum``."""
+
+    def _validate(value, location, context):
+        if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+            return _fail(context, location, "must be an integer of at least {}".format(minimum))
+        return True
+
+    return _validate
+
+
+def _enum(values):
+    """Build a validator that accepts one of a fixed set of values."""
+    allowed = frozenset(values)
+    description = "must be one of " + ", ".join(json.dumps(value) for value in values)
+
+    def _validate(value, location, context):
+        if isinstance(value, (str, int)) and not isinstance(value, bool) and value in allowed:
+            return True
+        return _fail(context, location, description)
+
+    return _validate
+
+
+def _list_of(item, min_items=0):
+    """Build a validator that accepts lists whose every item ``item`` accepts."""
+
+    def _validate(value, location, context):
+        if not isinstance(value, list):
+            return _fail(context, location, "must be a list")
+        if len(value) < min_items:
+            return _fail(context, location, "must have at least {} items".format(min_items))
+        valid = True
+        for index, member in enumerate(value):
+            valid = item(member, _location(location, index), context) and valid
+        return valid
+
+    return _validate
+
+
+def _map_of(item):
+    """Build a validator that accepts objects with any names whose every value ``item`` accepts."""
+
+    def _validate(value, location, context):
+        if not isinstance(value, dict):
+            return _fail(context, location, "must be an object")
+        valid = True
+        for name, member in value.items():
+            valid = item(member, _location(location, name), context) and valid
+        return valid
+
+    return _validate
+
+
+def _object(required, optional=None, check=None):
+    """Build a validator that accepts objects with exactly the required members and any of the optional members.
+
+    :param dict required: Map of required member name to validator
+    :param dict optional: Map of optional member name to validator
+    :param callable check: Validator of constraints between members, only run if all members are valid
+    """
+    members = dict(optional or {}, **required)
+
+    def _validate(value, location, context):
+        if not isinstance(value, dict):
+            return _fail(context, location, "must be an object")
+        valid = True
+        for name in required:
+            if name not in value:
+                valid = _fail(context, location, 'missing required member "{}"'.format(name))
+        for name, member in value.items():
+            if name not in members:
+                valid = _fail(context, location, 'unexpected member "{}"'.format(name))
+            else:
+                valid = members[name](member, _location(location, name), context) and valid
+        if valid and check is not None:
+            valid = check(value, location, context)
+        return valid
+
+    return _validate
+
+
+def _exactly_one(members):
+    """Build a validator that accepts objects with exactly one of a set of members."""
+    validate_object = _object({}, members)
+    description = "must contain exactly one of " + ", ".join('"{}"'.format(name) for name in members)
+
+    def _validate(value, location, context):
+        if not validate_object(value, location, context):
+            return False
+        if len(value) != 1:
+            return _fail(context, location, description)
+        return True
+
+    return _validate
+
+
+def _by_type(alternatives, description):
+    """Build a validator that picks a validator by the JSON type of the value.
+
+    :param dict alternatives: Map of Python type to validator
+    :param str description: Description of the accepted types
+    """
+
+    def _validate(value, location, context):
+        for value_type, validator in alternatives.items():
+            if isinstance(value, value_type):
+                return validator(value, location, context)
+        return _fail(context, location, "must be " + description)
+
+    return _validate
+
+
+def _reference(table):
+    """Build a validator that accepts the names of entries of a table, such as the plaintexts of the header.
+
+    Any string is accepted if the names in the table are not known.
+    """
+
+    def _validate(value, location, context):
+        if not _STRING(value, location, context):
+            return False
+        names = context.get(table)
+        if names is not None and value not in names:
+            return _fail(context, location, 'unknown name "{}" in {}'.format(value, table))
+        return True
+
+    return _validate
+
+
+def _master_key_requirements(value, location, context):
+    """Test the members that raw master keys require, as defined in 0005-awses-master-key."""
+    valid = True
+    required = []
+    if value["type"] == "raw":
+        required.extend(("provider-id", "encryption-algorithm"))
+        if value.get("encryption-algorithm") == "rsa":
+            required.append("padding-algorithm")
+        if value.get("padding-algorithm") == "oaep-mgf1":
+            required.append("padding-hash")
+    for name in required:
+        if name not in value:
+            valid = _fail(context, location, 'missing member "{}" required for this master key'.format(name))
+    return valid
+
+
+_MASTER_KEY = _object(
+    required={"type": _enum(("aws-kms", "raw")), "key": _reference("keys")},
+    optional={
+        "provider-id": _STRING,
+        "encryption-algorithm": _enum(("aes", "rsa")),
+        "padding-algorithm": _enum(("pkcs1", "oaep-mgf1")),
+        "padding-hash": _enum(("sha1", "sha256", "sha384", "sha512")),
+    },
+    check=_master_key_requirements,
+)
+_MASTER_KEYS = _list_of(_MASTER_KEY, min_items=1)
+_ENCRYPTION_CONTEXT = _map_of(_STRING)
+# Cost hints are advisory, and the specs allow them in manifests of every version
+_COST = _object(
+    required={
+        "plaintext-bytes": _integer(0),
+        "frames": _integer(1),
+        "key-families": _list_of(_enum(("aws-kms", "aes", "rsa"))),
+        "signed": _BOOLEAN,
+        "weight": _integer(0),
+    }
+)
+_RESULT = _exactly_one(
+    {
+        "output": _object({"plaintext": _STRING}),
+        "error": _object({"error-description": _STRING}),
+    }
+)
+
+
+def _manifest_identity(manifest_type):
+    """Build the validator of the ``manifest`` member of a manifest of a given type."""
+    return _object({"type": _enum((manifest_type,)), "version": _enum(SUPPORTED_VERSIONS[manifest_type])})
+
+
+def _keys_validators(version):
+    """Build the validators of a keys manifest, as defined in 0002-keys."""
+    material = _STRING
+    raw_optional = {}
+    if version == 1:
+        material = _list_of(_STRING)
+        raw_optional = {"key-id": _STRING, "line-separator": _STRING}
+    raw_required = {
+        "encrypt": _BOOLEAN,
+        "decrypt": _BOOLEAN,
+        "algorithm": _enum(("aes", "rsa")),
+        "type": _enum(("symmetric", "private", "public")),
+        "bits": _integer(1),
+        "encoding": _enum(("base64", "pem")),
+        "material": material,
+    }
+    if version > 1:
+        raw_required["key-id"] = _STRING
+    raw_key = _object(raw_required, raw_optional)
+    aws_kms_key = _object(
+        {"type": _enum(("aws-kms",)), "key-id": _STRING}, {"encrypt": _BOOLEAN, "decrypt": _BOOLEAN}
+    )
+
+    def _key(value, location, context):
+        if isinstance(value, dict) and value.get("type") == "aws-kms":
+            return aws_kms_key(value, location, context)
+        return raw_key(value, location, context)
+
+    header = _object({"manifest": _manifest_identity("keys"), "keys": _map_of(_key)})
+    return header, None
+
+
+def _scenario_members(version):
+    """Build the validators of the members of an encryption scenario, as defined in 0003-awses-message-encryption."""
+    encryption_context = _ENCRYPTION_CONTEXT
+    master_keys = _MASTER_KEYS
+    if version >= NORMALIZED_MANIFEST_VERSION:
+        encryption_context = _by_type(
+            {dict: _ENCRYPTION_CONTEXT, str: _reference("encryption-contexts")}, "an object or a string"
+        )
+        master_keys = _by_type({list: _MASTER_KEYS, str: _reference("master-key-sets")}, "a list or a string")
+    return {
+        "plaintext": _reference("plaintexts"),
+        "algorithm": _enum(ALGORITHM_SUITES),
+        "frame-size": _integer(0),
+        "encryption-context": encryption_context,
+        "master-keys": master_keys,
+    }
+
+
+def _generator_header(manifest_type, version):
+    """Build the validator of the header of an encrypt or decrypt generation manifest."""
+    optional = {}
+    if version >= NORMALIZED_MANIFEST_VERSION:
+        optional = {
+            "encryption-contexts": _map_of(_ENCRYPTION_CONTEXT),
+            "master-key-sets": _map_of(_MASTER_KEYS),
+        }
+    return _object(
+        {"manifest": _manifest_identity(manifest_type), "keys": _STRING, "plaintexts": _map_of(_integer(0))},
+        optional,
+    )
+
+
+def _encrypt_validators(version):
+    """Build the validators of an encrypt manifest, as defined in 0003-awses-message-encryption."""
+    test = _object(_scenario_members(version), {"cost": _COST})
+    return _generator_header("awses-encrypt", version), test
+
+
+def _decrypt_generate_validators(version):
+    """Build the validators of a decrypt generation manifest, as defined in 0006-awses-message-decryption-generation."""
+    master_keys = _MASTER_KEYS
+    if version >= NORMALIZED_MANIFEST_VERSION:
+        master_keys = _by_type({list: _MASTER_KEYS, str: _reference("master-key-sets")}, "a list or a string")
+    tamperings = {tampering: _any for tampering in TAMPERINGS}
+    tamperings["change-edk-provider-info"] = _list_of(_STRING, min_items=1)
+    tampering_types = {str: _enum(TAMPERINGS), dict: _exactly_one(tamperings)}
+    expected = "a string or an object"
+    if version >= SHARED_TAMPERING_MANIFEST_VERSION:
+        tampering_types[list] = _list_of(_enum(BYTE_TAMPERINGS), min_items=1)
+        expected = "a string, a list, or an object"
+    tampering = _by_type(tampering_types, expected)
+    test = _object(
+        {"encryption-scenario": _object(_scenario_members(version))},
+        {
+            "tampering": tampering,
+            "decryption-master-keys": master_keys,
+            "decryption-method": _enum(("streaming-unsigned-only",)),
+            "result": _RESULT,
+            "cost": _COST,
+        },
+    )
+    return _generator_header("awses-decrypt-generate", version), test
+
+
+def _decrypt_validators(version):
+    """Build the validators of a decrypt manifest, as defined in 0004-awses-message-decryption."""
+    header = _object(
+        {
+            "manifest": _manifest_identity("awses-decrypt"),
+            "client": _object({"name": _STRING, "version": _STRING}),
+            "keys": _STRING,
+        }
+    )
+    required = {"ciphertext": _STRING, "master-keys": _MASTER_KEYS}
+    optional = {"description": _STRING}
+    if version == 1:
+        required["plaintext"] = _STRING
+    else:
+        required["result"] = _RESULT
+    if version >= 3:
+        optional["decryption-method"] = _enum(("streaming-unsigned-only",))
+    return header, _object(required, optional)
+
+
+_VALIDATOR_BUILDERS = {
+    "keys": _keys_validators,
+    "awses-encrypt": _encrypt_validators,
+    "awses-decrypt-generate": _decrypt_generate_validators,
+    "awses-decrypt": _decrypt_validators,
+}
+
+
+@functools.lru_cache()
+def manifest_validators(manifest_type, version):
+    """Build the validators of a manifest type and version once, for use with any number of manifests.
+
+    :param str manifest_type: Manifest type
+    :param int version: Manifest version
+    :returns: Validator of all top-level members other than the tests,
+        and validator of a single test description, or None for manifests without tests
+    :rtype: tuple
+    """
+    if manifest_type not in SUPPORTED_VERSIONS:
+        raise ValueError('Unsupported manifest type: "{}"'.format(manifest_type))
+    if version not in SUPPORTED_VERSIONS[manifest_type]:
+        raise ValueError('Unsupported {} manifest version: "{}"'.format(manifest_type, version))
+    return _VALIDATOR_BUILDERS[manifest_type](version)
+
+
+def manifest_errors(header, tests, key_names=None):
+    """Validate a manifest one test at a time, so that tests can be read as they are validated.
+
+    :param dict header: All top-level manifest members other than the tests
+    :param tests: Iterable of (test ID, test description) pairs
+    :param key_names: Names of all keys in the keys manifest, or None to not check key references
+    :returns: Iterator of error messages, each prefixed with the location of the error in the manifest
+    """
+    identity = header.get("manifest") if isinstance(header, dict) else None
+    try:
+        validate_header, validate_test = manifest_validators(identity["type"], identity["version"])
+    except (KeyError, TypeError, ValueError) as error:
+        yield "manifest: {}".format(error if isinstance(error, ValueError) else "missing manifest type or version")
+        return
+
+    context = {"errors": [], "keys": key_names}
+    validate_header(header, "", context)
+    for table in ("plaintexts", "encryption-contexts", "master-key-sets"):
+        if isinstance(header.get(table), dict):
+            context[table] = header[table]
+    context.setdefault("encryption-contexts", {})
+    context.setdefault("master-key-sets", {})
+    for error in context["errors"]:
+        yield error
+
+    seen = set()
+    for name, test in tests:
+        context["errors"] = []
+        location = _location("tests", name)
+        if validate_test is None:
+            _fail(context, location, "unexpected test in a manifest without tests")
+        else:
+            if name in seen:
+                _fail(context, location, "duplicate test ID")
+            seen.add(name)
+            validate_test(test, location, context)
+        for error in context["errors"]:
+            yield error
+
+
+def validate_manifest(filename, check_keys=True):
+    """Validate a manifest file of any type, serialization, and compression, reading one test at a time.
+
+    :param str filename: Name of file containing the manifest
+    :param bool check_keys: Whether to check that master keys refer to keys in the keys manifest,
+        if the keys manifest can be found
+    :returns: Iterator of error messages, each prefixed with the location of the error in the manifest
+    """
+    with open_manifest(filename) as (header, tests):
+        key_names = None
+        if check_keys and isinstance(header.get("keys"), str):
+            try:
+                keys_filename = resolve_uri(header["keys"], os.path.dirname(os.path.abspath(filename)))
+            except ValueError:
+                keys_filename = None
+            if keys_filename is not None and os.path.isfile(keys_filename):
+                with open(keys_filename, "r") as keys_file:
+                    key_names = frozenset(json.load(keys_file).get("keys", {}))
+        for error in manifest_errors(header, tests, key_names):
+            yield error
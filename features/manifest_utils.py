@@ -0,0 +1,573 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import sys
+from urllib.parse import quote, unquote, urlparse
+
+MANIFEST_FORMATS = ("json", "jsonl", "msgpack")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+# Manifest versions that introduced each serialization and layout,
+# shared by both awses-encrypt and awses-decrypt-generate manifests
+MESSAGE_MANIFEST_VERSION = 2
+SERIALIZED_MANIFEST_VERSION = 3
+NORMALIZED_MANIFEST_VERSION = 4
+# Decrypt generation manifest version that introduced lists of byte tamperings, which no earlier version can describe
+SHARED_TAMPERING_MANIFEST_VERSION = 5
+
+_MISSING = object()
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _msgpack():
+    """Import the optional msgpack package."""
+    try:
+        import msgpack
+    except ImportError as error:
+        raise ImportError('MessagePack manifests require the "msgpack" package') from error
+    return msgpack
+
+
+def _zstandard():
+    """Import the optional zstandard package."""
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError('zstd compressed manifests require the "zstandard" package') from error
+    return zstandard
+
+
+def _newline(indent, depth):
+    """Build the whitespace that ``json.dumps`` places before a member at the given depth.
+
+    :param int indent: Indentation width, or None for compact output
+    :param int depth: Nesting depth of the member
+    """
+    if indent is None:
+        return ""
+    return "\n" + " " * (indent * depth)
+
+
+def _json_fragment(value, indent, depth):
+    """Serialize a value as it would appear nested at the given depth inside a larger document.
+
+    :param value: JSON-serializable value
+    :param int indent: Indentation width, or None for compact output
+    :param int depth: Nesting depth of the value
+    """
+    fragment = json.dumps(value, indent=indent)
+    if indent is None:
+        return fragment
+    # json.dumps escapes control characters inside strings,
+    # so every literal newline in the fragment is structural.
+    return fragment.replace("\n", _newline(indent, depth))
+
+
+def _encode_json_test(name, test, indent):
+    """Serialize a single test as a member of ``tests`` in the JSON serialization.
+
+    :param str name: Test ID
+    :param dict test: Test description
+    :param int indent: Indentation width, or None for compact output
+    """
+    return _newline(indent, 2) + json.dumps(name) + ": " + _json_fragment(test, indent, 2)
+
+
+def _encode_lines_test(name, test, indent):
+    """Serialize a single test as a line of the JSON Lines serialization.
+
+    :param str name: Test ID
+    :param dict test: Test description
+    :param int indent: Ignored: every JSON Lines entry must be on a single line
+    """
+    return json.dumps({name: test}) + "\n"
+
+
+def _encode_msgpack_test(name, test, indent):
+    """Serialize a single test as an object of the MessagePack serialization.
+
+    :param str name: Test ID
+    :param dict test: Test description
+    :param int indent: Ignored
+    """
+    return _msgpack().packb({name: test}, use_bin_type=True)
+
+
+_TEST_ENCODERS = {
+    "json": _encode_json_test,
+    "jsonl": _encode_lines_test,
+    "msgpack": _encode_msgpack_test,
+}
+
+
+def encode_tests(manifest_format, tests, indent=None):
+    """Serialize each test as it will appear in a manifest, for later use with ``write_encoded_manifest``.
+
+    :param str manifest_format: Serialization: "json", "jsonl", or "msgpack"
+    :param tests: Iterable of (test ID, test description) pairs
+    :param int indent: Indentation width, or None for compact output
+    """
+    encode = _TEST_ENCODERS[manifest_format]
+    for name, test in tests:
+        yield encode(name, test, indent)
+
+
+def write_encoded_manifest(manifest_format, stream, header, encoded_tests, indent=None):
+    """Write a manifest to a stream from tests that were already serialized by ``encode_tests``.
+
+    :param str manifest_format: Serialization: "json", "jsonl", or "msgpack"
+    :param stream: Stream to which to write the manifest: binary for "msgpack", otherwise text
+    :param dict header: All top-level manifest members other than ``tests``
+    :param encoded_tests: Iterable of serialized tests
+    :param int indent: Indentation width, or None for compact output
+    :returns: Number of tests written
+    :rtype: int
+    """
+    item_separator = ", " if indent is None else ","
+    if manifest_format == "jsonl":
+        stream.write(json.dumps(header) + "\n")
+    elif manifest_format == "msgpack":
+        stream.write(_msgpack().packb(header, use_bin_type=True))
+    else:
+        stream.write("{")
+        for name, value in header.items():
+            stream.write(
+                _newline(indent, 1) + json.dumps(name) + ": " + _json_fragment(value, indent, 1) + item_separator
+            )
+        stream.write(_newline(indent, 1) + '"tests": {')
+
+    count = 0
+    for encoded_test in encoded_tests:
+        if count and manifest_format == "json":
+            stream.write(item_separator)
+        stream.write(encoded_test)
+        count += 1
+
+    if manifest_format == "json":
+        if count:
+            stream.write(_newline(indent, 1))
+        stream.write("}" + _newline(indent, 0) + "}")
+
+    return count
+
+
+def write_manifest(stream, header, tests, indent=None):
+    """Write a manifest to a stream one test at a time.
+
+    The output is identical to ``json.dumps(manifest, indent=indent)`` for a manifest built
+    from ``header`` with a final ``tests`` member, but only one test is held in memory at a time.
+
+    :param stream: Text stream to which to write the manifest
+    :param dict header: All top-level manifest members other than ``tests``
+    :param tests: Iterable of (test ID, test description) pairs
+    :param int indent: Indentation width, or None for compact output
+    :returns: Number of tests written
+    :rtype: int
+    """
+    return write_encoded_manifest("json", stream, header, encode_tests("json", tests, indent), indent)
+
+
+def write_manifest_lines(stream, header, tests, indent=None):
+    """Write a manifest to a stream in JSON Lines serialization, one test at a time.
+
+    The first line holds all top-level manifest members other than ``tests``.
+    Each following line holds a single member of ``tests``.
+
+    :param stream: Text stream to which to write the manifest
+    :param dict header: All top-level manifest members other than ``tests``
+    :param tests: Iterable of (test ID, test description) pairs
+    :param int indent: Ignored: every JSON Lines entry must be on a single line
+    :returns: Number of tests written
+    :rtype: int
+    """
+    return write_encoded_manifest("jsonl", stream, header, encode_tests("jsonl", tests))
+
+
+def write_manifest_msgpack(stream, header, tests, indent=None):
+    """Write a manifest to a binary stream in MessagePack serialization, one test at a time.
+
+    The manifest is a sequence of MessagePack maps laid out exactly as the lines of
+    the JSON Lines serialization.
+
+    :param stream: Binary stream to which to write the manifest
+    :param dict header: All top-level manifest members other than ``tests``
+    :param tests: Iterable of (test ID, test description) pairs
+    :param int indent: Ignored
+    :returns: Number of tests written
+    :rtype: int
+    """
+    return write_encoded_manifest("msgpack", stream, header, encode_tests("msgpack", tests))
+
+
+MANIFEST_WRITERS = {
+    "json": write_manifest,
+    "jsonl": write_manifest_lines,
+    "msgpack": write_manifest_msgpack,
+}
+
+
+def shard_tests(tests, test_id, shard_count=1, shard_index=0):
+    """Select a single shard of tests, building IDs only for the tests in that shard.
+
+    Tests are assigned to shards round-robin in the order they are built, so shards are
+    deterministic and interleaving all shards restores the original order.
+    The full iterable is always consumed, so anything counting the tests as they are
+    built still sees every test.
+
+    :param tests: Iterable of test descriptions
+    :param callable test_id: Function that builds a test ID given a test description
+    :param int shard_count: Number of shards
+    :param int shard_index: Index of the shard to select
+    """
+    for index, test in enumerate(tests):
+        if index % shard_count == shard_index:
+            yield test_id(test), test
+
+
+def interleave_shards(shards):
+    """Merge shards built by ``shard_tests`` back into the original order.
+
+    :param list shards: Lists of shard entries, ordered by shard index
+    """
+    for group in itertools.zip_longest(*shards, fillvalue=_MISSING):
+        for entry in group:
+            if entry is not _MISSING:
+                yield entry
+
+
+def run_shards(worker, shard_count, jobs, *args):
+    """Run a worker for every shard concurrently across a pool of processes.
+
+    :param callable worker: Module-level function called with ``*args``, the shard count,
+        and the shard index
+    :param int shard_count: Number of shards
+    :param int jobs: Maximum number of worker processes
+    :returns: List of worker results, ordered by shard index
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(worker, *args, shard_count, shard_index) for shard_index in range(shard_count)]
+        return [future.result() for future in futures]
+
+
+@contextlib.contextmanager
+def output_stream(filename, binary=False, compression="none"):
+    """Open the destination for a streamed manifest.
+
+    :param str filename: Name of file to write, or "-" for stdout
+    :param bool binary: Open a binary stream rather than a text stream
+    :param str compression: Compression to apply to everything written: "none", "gzip", or "zstd"
+    """
+    if filename == "-" and not binary and compression == "none":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+
+    with contextlib.ExitStack() as stack:
+        if filename == "-":
+            sys.stdout.flush()
+            raw = sys.stdout.buffer
+            stack.callback(raw.flush)
+        else:
+            raw = stack.enter_context(open(filename, "wb"))
+
+        if compression == "gzip":
+            raw = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="wb"))
+        elif compression == "zstd":
+            raw = stack.enter_context(_zstandard().ZstdCompressor().stream_writer(raw, closefd=False))
+
+        if binary:
+            yield raw
+            return
+
+        text = io.TextIOWrapper(raw, encoding="utf-8")
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Number of characters to read from a JSON manifest at a time
+_READ_SIZE = 64 * 1024
+
+
+def _iter_lines_tests(stream):
+    """Read tests from the remaining lines of a JSON Lines manifest.
+
+    :param stream: Text stream positioned after the manifest header line
+    """
+    for line in stream:
+        if line.strip():
+            yield from json.loads(line).items()
+
+
+class _JsonObjectReader(object):
+    """Incremental reader of the members of a JSON object in a text stream.
+
+    Only the member values that are read are held in memory, so the tests of a JSON manifest
+    can be read one at a time like those of a JSON Lines manifest.
+
+    :param stream: Text stream positioned at the start of a JSON object
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+
+    def _fill(self):
+        """Read more of the stream into the buffer, dropping what was already parsed.
+
+        :returns: False once the stream is exhausted
+        """
+        # Read at least as much as is buffered, so that values larger than a chunk are parsed in linear time
+        chunk = self._stream.read(max(_READ_SIZE, len(self._buffer) - self._position))
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return bool(chunk)
+
+    def _next_character(self):
+        """Skip whitespace and get the next character, or an empty string at the end of the stream."""
+        while True:
+            self._position = _JSON_WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position : self._position + 1]
+
+    def _expect(self, characters):
+        """Consume the next character, which must be one of ``characters``."""
+        character = self._next_character()
+        if not character or character not in characters:
+            raise ValueError("Expected one of {!r} in JSON manifest, found {!r}".format(characters, character))
+        self._position += 1
+        return character
+
+    def value(self):
+        """Read the value at the current position."""
+        self._next_character()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal that ends with the buffer may continue in the rest of the stream
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def names(self):
+        """Iterate over the member names of the object at the current position.
+
+        Each name is yielded with the reader positioned at the value of that member,
+        which must be read with :meth:`value` or :meth:`names` before iteration continues.
+        """
+        self._expect("{")
+        if self._next_character() == "}":
+            self._position += 1
+            return
+        while True:
+            name = self.value()
+            if not isinstance(name, str):
+                raise ValueError("Expected a member name in JSON manifest, found {!r}".format(name))
+            self._expect(":")
+            yield name
+            if self._expect(",}") == "}":
+                return
+
+    def lines(self):
+        """Iterate over the remaining lines of the stream."""
+        lines = self._buffer[self._position :].split("\n")
+        self._buffer, self._position = "", 0
+        partial = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        for line in self._stream:
+            yield partial + line
+            partial = ""
+        if partial:
+            yield partial
+
+
+def _iter_json_tests(reader, names, header):
+    """Read tests from the ``tests`` member of a JSON manifest, then any members that follow it.
+
+    :param reader: JSON object reader positioned at the value of the ``tests`` member
+    :param names: Iterator of the remaining top-level member names
+    :param dict header: Manifest header, to which members that follow ``tests`` are added
+    """
+    for name in reader.names():
+        yield name, reader.value()
+    for name in names:
+        header[name] = reader.value()
+
+
+def _iter_msgpack_tests(unpacker):
+    """Read tests from the remaining objects of a MessagePack manifest.
+
+    :param unpacker: MessagePack unpacker positioned after the manifest header
+    """
+    for entry in unpacker:
+        yield from entry.items()
+
+
+@contextlib.contextmanager
+def open_manifest(filename):
+    """Open a manifest in any supported serialization and compression for reading.
+
+    Manifests of every serialization are read one test at a time.
+    Members of a JSON manifest that follow its ``tests`` member are only added to the header
+    once all tests have been read; the generators always write ``tests`` last.
+
+    :param str filename: Name of file containing the manifest
+    :returns: Tuple of all top-level manifest members other than ``tests``,
+        and an iterator of (test ID, test description) pairs
+    """
+    with contextlib.ExitStack() as stack:
+        raw = stack.enter_context(open(filename, "rb"))
+        magic = raw.peek(len(_ZSTD_MAGIC))[: len(_ZSTD_MAGIC)]
+        if magic.startswith(_GZIP_MAGIC):
+            raw = io.BufferedReader(stack.enter_context(gzip.GzipFile(fileobj=raw, mode="rb")))
+        elif magic == _ZSTD_MAGIC:
+            raw = io.BufferedReader(stack.enter_context(_zstandard().ZstdDecompressor().stream_reader(raw)))
+
+        if raw.peek(1)[:1] not in b"{ \t\r\n":
+            unpacker = _msgpack().Unpacker(raw, raw=False)
+            yield next(unpacker), _iter_msgpack_tests(unpacker)
+            return
+
+        reader = _JsonObjectReader(io.TextIOWrapper(raw, encoding="utf-8"))
+        header = {}
+        names = reader.names()
+        for name in names:
+            if name == "tests":
+                yield header, _iter_json_tests(reader, names, header)
+                return
+            header[name] = reader.value()
+
+        # A JSON document without tests is the header line of a JSON Lines manifest
+        yield header, _iter_lines_tests(reader.lines())
+
+
+def resolve_uri(uri, base_directory):
+    """Resolve a manifest URI to a local path.
+
+    Manifests identify files with ``file://`` URIs, which are relative to the directory
+    containing the manifest unless they are absolute (``file:///``).
+
+    :param str uri: URI to resolve
+    :param str base_directory: Directory containing the manifest that identifies the URI
+    :rtype: str
+    """
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        raise ValueError('Unsupported URI scheme: "{}"'.format(uri))
+    return os.path.join(base_directory, unquote(parsed.netloc + parsed.path))
+
+
+def file_uri(path, base_directory):
+    """Build a ``file://`` URI that identifies a path relative to the directory of the manifest that contains it,
+    or absolute if the path is outside that directory. This is the inverse of :func:`resolve_uri`.
+
+    :param str path: Path to identify
+    :param str base_directory: Directory containing the manifest that identifies the path
+    :rtype: str
+    """
+    relative_path = os.path.relpath(path, base_directory)
+    if relative_path.split(os.path.sep)[0] == os.path.pardir:
+        relative_path = os.path.abspath(path)
+    return "file://" + quote("/".join(relative_path.split(os.path.sep)))
+
+
+def scenario_digest(test):
+    """Build a digest that identifies a test by the content of its description alone.
+
+    :param dict test: Test description
+    :rtype: bytes
+    """
+    return hashlib.sha256(json.dumps(test, sort_keys=True).encode("utf-8")).digest()
+
+
+# Test members that only advise runners, such as cost hints, and do not change what a test tests.
+# They are valid in manifests of every version, so adding them never changes the manifest version.
+ADVISORY_TEST_MEMBERS = ("cost",)
+
+
+def _test_identity(test):
+    """Build a digest that identifies a test by its description without advisory members."""
+    return scenario_digest({member: value for member, value in test.items() if member not in ADVISORY_TEST_MEMBERS})
+
+
+class IncrementalTestIds(object):
+    """Test ID builder that reuses the IDs of matching tests from a previous manifest.
+
+    Tests whose description, apart from advisory members such as cost hints, exactly matches a test
+    in the previous manifest keep that test's ID.
+    All other tests are new and are given an ID by the fallback builder.
+    Once all tests are built, any previous tests that were not matched have been removed.
+    Building the same ID twice raises a ValueError, since a manifest cannot hold both tests.
+
+    :param previous_tests: Iterable of (test ID, test description) pairs of the previously generated manifest,
+        in the inline layout
+    :param callable fallback: Function that builds a test ID for new tests given a test description
+    """
+
+    def __init__(self, previous_tests, fallback):
+        self._previous = {_test_identity(test): name for name, test in previous_tests}
+        self._fallback = fallback
+        self._built = set()
+        self.reused = 0
+        self.added = []
+
+    def __call__(self, test):
+        """Build the ID for a single test.
+
+        :param dict test: Test description
+        """
+        name = self._previous.pop(_test_identity(test), None)
+        if name is None:
+            name = self._fallback(test)
+            self.added.append(name)
+        else:
+            self.reused += 1
+        if name in self._built:
+            raise ValueError('Duplicate test ID: "{}"'.format(name))
+        self._built.add(name)
+        return name
+
+    def delta_report(self):
+        """Build a report of the differences from the previous manifest.
+
+        This must only be called once all tests have been built.
+        """
+        return {
+            "reused": self.reused,
+            "added": self.added,
+            "removed": sorted(self._previous.values()),
+        }
@@ -0,0 +1,258 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import concurrent.futures
+import json
+import os
+import time
+
+from manifest_utils import open_manifest, resolve_uri
+
+META_MANIFEST_VERSIONS = (1, 2)
+# Meta manifests of this version and later may reference other meta manifests
+NESTED_META_MANIFEST_VERSION = 2
+
+# Manifest type to the types of the manifests that it depends on, following the Dependencies tables
+# of the feature specs. Each manifest identifies the manifest that it depends on by a URI in the header member
+# named after the type of that manifest.
+FEATURE_DEPENDENCIES = {
+    "keys": (),
+    "awses-encrypt": ("keys",),
+    "awses-decrypt-generate": ("keys",),
+    "awses-decrypt": ("keys",),
+}
+
+NODE_STATUSES = ("pass", "fail", "invalid", "error", "skipped")
+
+
+class ManifestNode(object):
+    """A manifest in the dependency graph of a meta manifest.
+
+    :param str name: Normalized file name of the manifest, or its URI if it cannot be resolved to a file
+    :param str manifest_type: Manifest type
+    :param str uri: URI by which the manifest was first identified
+    :param bool listed: Whether a meta manifest lists the manifest, rather than only another manifest depending on it
+    """
+
+    def __init__(self, name, manifest_type, uri, listed):
+        self.name = name
+        self.type = manifest_type
+        self.uri = uri
+        self.listed = listed
+        self.depends_on = []
+        self.errors = []
+
+
+def _listed_manifests(filename, seen):
+    """List the manifests that a meta manifest identifies, expanding any meta manifests that it identifies in turn.
+
+    Meta manifest references in meta manifests older than ``NESTED_META_MANIFEST_VERSION`` are listed with an error.
+
+    :param str filename: Name of file containing the meta manifest
+    :param set seen: Normalized file names of the meta manifests already expanded, updated in place
+    :returns: Iterator of (URI, manifest type, file name or None, error or None)
+    """
+    seen.add(os.path.normpath(os.path.abspath(filename)))
+    with open(filename, "r") as meta_file:
+        meta = json.load(meta_file)
+    if meta["manifest"]["type"] != "meta":
+        raise ValueError('Unsupported manifest type: "{}"'.format(meta["manifest"]["type"]))
+    if meta["manifest"]["version"] not in META_MANIFEST_VERSIONS:
+        raise ValueError('Unsupported meta manifest version: "{}"'.format(meta["manifest"]["version"]))
+
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    for reference in meta["tests"]:
+        if reference["type"] == "meta" and meta["manifest"]["version"] < NESTED_META_MANIFEST_VERSION:
+            yield reference["manifest"], reference["type"], None, (
+                "Meta manifest references are only valid in meta manifests of version {} and later".format(
+                    NESTED_META_MANIFEST_VERSION
+                )
+            )
+            continue
+        try:
+            listed_filename = os.path.normpath(resolve_uri(reference["manifest"], base_directory))
+        except ValueError as error:
+            yield reference["manifest"], reference["type"], None, str(error)
+            continue
+        if reference["type"] != "meta":
+            yield reference["manifest"], reference["type"], listed_filename, None
+        elif listed_filename not in seen:
+            for listed in _listed_manifests(listed_filename, seen):
+                yield listed
+
+
+def manifest_graph(filename):
+    """Build the dependency graph of the manifests that a meta manifest identifies.
+
+    Each manifest depends on the manifests that its header identifies, such as the keys manifest
+    shared by encrypt, decrypt generation, and decrypt manifests. Manifests that are depended on
+    but not listed are added to the graph, so that they too are loaded and checked only once.
+    Problems with a manifest, such as an unreadable file or a type that does not match its reference,
+    are recorded on its node rather than raised.
+
+    :param str filename: Name of file containing the meta manifest
+    :returns: Map of node name to :class:`ManifestNode`, in the order in which manifests are listed
+    :rtype: dict
+    """
+    nodes = {}
+
+    def _node(name, manifest_type, uri, listed):
+        node = nodes.get(name)
+        if node is None:
+            node = nodes[name] = ManifestNode(name, manifest_type, uri, listed)
+        elif node.type != manifest_type:
+            node.errors.append('Manifest is referenced as both "{}" and "{}"'.format(node.type, manifest_type))
+        node.listed = node.listed or listed
+        return node
+
+    for uri, manifest_type, listed_filename, error in _listed_manifests(filename, set()):
+        node = _node(listed_filename or uri, manifest_type, uri, True)
+        if error is not None:
+            node.errors.append(error)
+
+    # Nodes added for dependencies are appended while iterating, so that their own dependencies are found too
+    index = 0
+    while index < len(nodes):
+        node = list(nodes.values())[index]
+        index += 1
+        if node.errors:
+            continue
+        if node.type not in FEATURE_DEPENDENCIES:
+            node.errors.append('Unsupported manifest type: "{}"'.format(node.type))
+            continue
+        try:
+            with open_manifest(node.name) as (header, _tests):
+                pass
+        except (OSError, ValueError) as error:
+            node.errors.append("Cannot read manifest: {}".format(error))
+            continue
+        if header.get("manifest", {}).get("type") != node.type:
+            node.errors.append(
+                'Manifest type "{}" does not match reference type "{}"'.format(
+                    header.get("manifest", {}).get("type"), node.type
+                )
+            )
+            continue
+
+        base_directory = os.path.dirname(node.name)
+        for dependency_type in FEATURE_DEPENDENCIES[node.type]:
+            try:
+                dependency_name = os.path.normpath(resolve_uri(header[dependency_type], base_directory))
+            except (KeyError, TypeError, ValueError) as error:
+                node.errors.append('Cannot resolve "{}" manifest: {}'.format(dependency_type, error))
+                continue
+            _node(dependency_name, dependency_type, header[dependency_type], False)
+            node.depends_on.append(dependency_name)
+    return nodes
+
+
+def _node_report(node, status, duration, **members):
+    """Build the report of one manifest."""
+    report = {
+        "manifest": node.uri,
+        "path": node.name,
+        "type": node.type,
+        "listed": node.listed,
+        "depends-on": list(node.depends_on),
+        "status": status,
+        "errors": list(node.errors),
+        "duration": duration,
+    }
+    report.update(members)
+    return report
+
+
+def run_graph(nodes, run_node, jobs=1):
+    """Run every manifest in a dependency graph once all of the manifests that it depends on have passed,
+    running manifests that do not depend on each other concurrently.
+
+    Manifests whose dependencies did not pass are skipped rather than run.
+
+    :param dict nodes: Map of node name to :class:`ManifestNode`, as built by :func:`manifest_graph`
+    :param run_node: Callable that runs a node and returns a map with its ``status``, any ``errors``,
+        and any other members to report
+    :param int jobs: Number of manifests to run at once
+    :returns: Iterator of manifest reports, in the order in which manifests finish
+    """
+    statuses = {}
+    waiting = dict(nodes)
+    running = {}
+
+    def _run(node):
+        start = time.perf_counter()
+        try:
+            outcome = dict(run_node(node))
+        except Exception as error:  # Reported with the manifest rather than ending the run
+            outcome = {"status": "error", "errors": [str(error)]}
+        node.errors.extend(outcome.pop("errors", []))
+        return outcome, time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        while waiting or running:
+            progress = True
+            while progress:
+                progress = False
+                for name, node in list(waiting.items()):
+                    failed = [
+                        dependency for dependency in node.depends_on if statuses.get(dependency) not in (None, "pass")
+                    ]
+                    if node.errors:
+                        status = "error"
+                    elif failed:
+                        status = "skipped"
+                        node.errors.extend("Dependency {} did not pass".format(dependency) for dependency in failed)
+                    elif all(statuses.get(dependency) == "pass" for dependency in node.depends_on):
+                        del waiting[name]
+                        running[executor.submit(_run, node)] = node
+                        continue
+                    else:
+                        continue
+                    del waiting[name]
+                    statuses[name] = status
+                    progress = True
+                    yield _node_report(node, status, 0.0)
+
+            if not running:
+                # Only a dependency cycle can leave manifests waiting with nothing running
+                for name, node in list(waiting.items()):
+                    del waiting[name]
+                    statuses[name] = "error"
+                    node.errors.append("Dependency cycle")
+                    yield _node_report(node, "error", 0.0)
+                break
+
+            done, _pending = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                outcome, duration = future.result()
+                statuses[node.name] = outcome.pop("status")
+                yield _node_report(node, statuses[node.name], duration, **outcome)
+
+
+def aggregate_reports(reports, result_statuses):
+    """Combine the reports of every manifest into a single report.
+
+    :param list reports: Manifest reports, as built by :func:`run_graph`
+    :param result_statuses: Statuses of individual test results to total
+    :returns: Aggregated report with the number of manifests by status and the number of test results by status
+    :rtype: dict
+    """
+    manifests = {status: 0 for status in NODE_STATUSES}
+    counts = {status: 0 for status in result_statuses}
+    for report in reports:
+        manifests[report["status"]] += 1
+        for status, count in report.get("counts", {}).items():
+            counts[status] = counts.get(status, 0) + count
+    return {"manifests": manifests, "counts": counts, "reports": reports}
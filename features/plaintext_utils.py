@@ -0,0 +1,196 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import collections.abc
+import hashlib
+import os
+import tempfile
+
+# Plaintexts are derived one block at a time, so that any block can be derived independently
+# and the derivation does not depend on how much of the plaintext is read at once.
+PLAINTEXT_BLOCK_SIZE = 1024 * 1024
+
+
+def _plaintext_block(name, size, index):
+    """Derive a single block of a plaintext.
+
+    Each block is the SHAKE256 output of the UTF-8 encoding of "<name>:<size>:<index>",
+    truncated to the block size or to the remainder of the plaintext, whichever is shorter.
+
+    :param str name: Plaintext name
+    :param int size: Plaintext size in bytes
+    :param int index: Index of the block within the plaintext
+    :rtype: bytes
+    """
+    length = min(PLAINTEXT_BLOCK_SIZE, size - index * PLAINTEXT_BLOCK_SIZE)
+    return hashlib.shake_256("{}:{}:{}".format(name, size, index).encode("utf-8")).digest(length)
+
+
+def plaintext_chunks(name, size):
+    """Derive a plaintext deterministically from its name and size, one block at a time.
+
+    :param str name: Plaintext name
+    :param int size: Plaintext size in bytes
+    :returns: Iterator of blocks of at most ``PLAINTEXT_BLOCK_SIZE`` bytes
+    """
+    for index in range((size + PLAINTEXT_BLOCK_SIZE - 1) // PLAINTEXT_BLOCK_SIZE):
+        yield _plaintext_block(name, size, index)
+
+
+def plaintext(name, size):
+    """Derive a complete plaintext in memory.
+
+    Only suitable for small plaintexts; use :func:`plaintext_chunks` or :class:`PlaintextCache` otherwise.
+
+    :param str name: Plaintext name
+    :param int size: Plaintext size in bytes
+    :rtype: bytes
+    """
+    return b"".join(plaintext_chunks(name, size))
+
+
+class PlaintextCache(object):
+    """Content-addressed on-disk cache of materialized plaintexts.
+
+    Each distinct plaintext is stored once as ``objects/<sha256>``, and ``refs/<size>/<name>``
+    records the digest of the plaintext with that name and size.
+    Plaintexts are only materialized the first time they are requested,
+    and every file is written to a temporary file and then moved into place,
+    so one cache directory can be shared by any number of concurrent handlers.
+
+    :param str directory: Cache directory
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _ref_path(self, name, size):
+        """Get the path to the ref of a plaintext, rejecting names and sizes that would lead outside the cache."""
+        # Both separators are rejected on every platform, so that a manifest is valid everywhere or nowhere
+        if not name or name in (".", "..") or "/" in name or "\\" in name:
+            raise ValueError('Invalid plaintext name: "{}"'.format(name))
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            raise ValueError('Invalid size of plaintext "{}": {!r}'.format(name, size))
+        return os.path.join(self.directory, "refs", str(size), name)
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest)
+
+    def _stage(self, chunks):
+        """Write chunks to a new temporary file in the cache directory.
+
+        :returns: Path to the temporary file and SHA256 hex digest of the written data
+        :rtype: tuple
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as temporary_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    temporary_file.write(chunk)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        return temporary_path, digest.hexdigest()
+
+    def _commit(self, temporary_path, path):
+        """Move a staged file into place, so that it only ever appears complete."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temporary_path, path)
+
+    def digest(self, name, size):
+        """Get the SHA256 hex digest of a plaintext, materializing it if necessary.
+
+        :param str name: Plaintext name
+        :param int size: Plaintext size in bytes
+        :rtype: str
+        """
+        ref_path = self._ref_path(name, size)
+        try:
+            with open(ref_path, "r") as ref_file:
+                digest = ref_file.read().strip()
+            if os.path.isfile(self._object_path(digest)):
+                return digest
+        except FileNotFoundError:
+            pass
+
+        temporary_path, digest = self._stage(plaintext_chunks(name, size))
+        self._commit(temporary_path, self._object_path(digest))
+        temporary_path, _ref_digest = self._stage([digest.encode("ascii")])
+        self._commit(temporary_path, ref_path)
+        return digest
+
+    def path(self, name, size):
+        """Get the path to a plaintext, materializing it if necessary.
+
+        :param str name: Plaintext name
+        :param int size: Plaintext size in bytes
+        :rtype: str
+        """
+        return self._object_path(self.digest(name, size))
+
+    def open(self, name, size):
+        """Open a plaintext for reading, materializing it if necessary.
+
+        :param str name: Plaintext name
+        :param int size: Plaintext size in bytes
+        """
+        return open(self.path(name, size), "rb")
+
+    def materialize(self, plaintexts):
+        """Materialize all plaintexts described by a manifest.
+
+        :param dict plaintexts: Map of plaintext names to sizes in bytes
+        :returns: Map of plaintext names to paths
+        :rtype: dict
+        """
+        return {name: self.path(name, size) for name, size in plaintexts.items()}
+
+    def paths(self, plaintexts):
+        """Map the plaintexts described by a manifest to their paths, materializing each one
+        only when its path is first looked up.
+
+        :param dict plaintexts: Map of plaintext names to sizes in bytes
+        :rtype: LazyPlaintextPaths
+        """
+        return LazyPlaintextPaths(self, plaintexts)
+
+
+class LazyPlaintextPaths(collections.abc.Mapping):
+    """Read-only map of plaintext names to paths in a :class:`PlaintextCache`,
+    which materializes a plaintext the first time its path is looked up,
+    so that plaintexts that no request uses are never written.
+
+    :param PlaintextCache cache: Cache in which to materialize the plaintexts
+    :param dict plaintexts: Map of plaintext names to sizes in bytes
+    """
+
+    def __init__(self, cache, plaintexts):
+        self._cache = cache
+        self._plaintexts = plaintexts
+        self._paths = {}
+
+    def __getitem__(self, name):
+        if name not in self._paths:
+            self._paths[name] = self._cache.path(name, self._plaintexts[name])
+        return self._paths[name]
+
+    def __iter__(self):
+        return iter(self._plaintexts)
+
+    def __len__(self):
+        return len(self._plaintexts)
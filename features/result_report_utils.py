@@ -0,0 +1,443 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+import os
+import struct
+import sys
+
+# Numeric members of a test result that the collector summarizes
+RESULT_METRICS = ("duration", "cpu-time", "bytes", "peak-memory")
+
+# Members of the dimensions of a test result by which the collector groups results
+SUMMARY_DIMENSIONS = ("algorithm", "frame-size", "master-keys")
+
+# Content type of a message header that identifies an unframed message
+_NON_FRAMED = b"\x01"
+
+
+def rusage_usage(usage):
+    """Convert the resource usage of a process, as returned by ``resource.getrusage`` or ``os.wait4``,
+    to the CPU time and peak memory of a test result.
+
+    :returns: Map with ``cpu-time`` in seconds and ``peak-memory`` in bytes
+    :rtype: dict
+    """
+    # Linux reports the maximum resident set size in KiB, macOS in bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"cpu-time": usage.ru_utime + usage.ru_stime, "peak-memory": usage.ru_maxrss * scale}
+
+
+def reset_peak_memory(pid):
+    """Reset the peak resident set size of a running process, where the platform allows it (Linux).
+
+    :param int pid: Process ID
+    :returns: Whether the peak was reset, so that a later :func:`process_usage` measures it from now on
+    """
+    try:
+        with open("/proc/{}/clear_refs".format(pid), "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def process_usage(pid):
+    """Read the CPU time and peak resident set size of a running process, where the platform exposes them (Linux).
+
+    :param int pid: Process ID
+    :returns: Map with ``cpu-time`` in seconds and ``peak-memory`` in bytes, or an empty map
+    :rtype: dict
+    """
+    usage = {}
+    try:
+        try:
+            # Nanoseconds on the CPU, where the kernel keeps scheduler statistics
+            with open("/proc/{}/schedstat".format(pid), "r") as schedstat_file:
+                usage["cpu-time"] = int(schedstat_file.read().split()[0]) / 1e9
+        except OSError:
+            with open("/proc/{}/stat".format(pid), "r") as stat_file:
+                # Fields after the parenthesized command name start at field 3; utime and stime are fields 14 and 15
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+            usage["cpu-time"] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/{}/status".format(pid), "r") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    usage["peak-memory"] = int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return usage
+
+
+def message_dimensions(filename, offset=0, length=None):
+    """Read the algorithm suite and frame size from the header of an AWS Encryption SDK message.
+
+    Reading stops at the frame length, so only the start of the message is read.
+    Tampered messages yield whatever could be read before the header stopped making sense.
+
+    :param str filename: Name of file containing the message
+    :param int offset: Offset of the message in the file (default: 0)
+    :param int length: Length of the message, or None if it runs to the end of the file
+    :returns: Map with ``algorithm`` and ``frame-size``, for as much of the header as could be read
+    :rtype: dict
+    """
+    dimensions = {}
+    end = None if length is None else offset + length
+
+    def _read(message_file, size):
+        data = message_file.read(size)
+        if len(data) != size or (end is not None and message_file.tell() > end):
+            raise ValueError("Message header is truncated")
+        return data
+
+    try:
+        with open(filename, "rb") as message_file:
+            message_file.seek(offset)
+            version = _read(message_file, 1)
+            if version == b"\x01":
+                _read(message_file, 1)  # Message type
+                dimensions["algorithm"] = _read(message_file, 2).hex()
+                _read(message_file, 16)  # Message ID
+            elif version == b"\x02":
+                dimensions["algorithm"] = _read(message_file, 2).hex()
+                _read(message_file, 32)  # Message ID
+            else:
+                return dimensions
+            (aad_length,) = struct.unpack(">H", _read(message_file, 2))
+            _read(message_file, aad_length)
+            (edk_count,) = struct.unpack(">H", _read(message_file, 2))
+            for _edk in range(edk_count):
+                # Provider ID, provider info, and encrypted data key
+                for _field in range(3):
+                    (field_length,) = struct.unpack(">H", _read(message_file, 2))
+                    _read(message_file, field_length)
+            content_type = _read(message_file, 1)
+            if version == b"\x01":
+                _read(message_file, 5)  # Reserved bytes and IV length
+            (frame_length,) = struct.unpack(">I", _read(message_file, 4))
+    except (OSError, ValueError):
+        return dimensions
+    dimensions["frame-size"] = 0 if content_type == _NON_FRAMED else frame_length
+    return dimensions
+
+
+def master_keys_label(master_keys):
+    """Describe the provider types of a list of master key descriptions, such as "aws-kms+raw-aes".
+
+    :param list master_keys: Master key descriptions
+    :rtype: str
+    """
+    labels = set()
+    for master_key in master_keys:
+        if master_key.get("type") == "raw":
+            labels.add("raw-" + master_key.get("encryption-algorithm", "unknown"))
+        else:
+            labels.add(str(master_key.get("type")))
+    return "+".join(sorted(labels))
+
+
+def request_dimensions(request):
+    """Describe the scenario of a handler request by algorithm suite, frame size, and master key provider types.
+
+    Encrypt requests name their algorithm suite and frame size. For decrypt requests, they are read
+    from the header of the ciphertext, whether it is a file or stored in an archive.
+
+    :param dict request: Encrypt or decrypt handler request
+    :rtype: dict
+    """
+    if "algorithm" in request:
+        dimensions = {"algorithm": request["algorithm"], "frame-size": request["frame-size"]}
+    elif "archive" in request:
+        dimensions = message_dimensions(request["archive"], *request["ciphertext-location"])
+    else:
+        dimensions = message_dimensions(request["ciphertext"])
+    dimensions["master-keys"] = master_keys_label(request["master-keys"])
+    return dimensions
+
+
+def _statistics(values):
+    """Summarize the values of one metric."""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "mean": sum(values) / len(values),
+        "p50": values[(len(values) - 1) // 2],
+        "p95": values[int(0.95 * (len(values) - 1))],
+        "max": values[-1],
+    }
+
+
+class _Group(object):
+    """Metrics of all test results that share a dimension value."""
+
+    def __init__(self):
+        self.statuses = {}
+        self.metrics = {metric: [] for metric in RESULT_METRICS}
+
+    def add(self, result):
+        self.statuses[result["status"]] = self.statuses.get(result["status"], 0) + 1
+        for metric in RESULT_METRICS:
+            if result.get(metric) is not None:
+                self.metrics[metric].append(result[metric])
+
+    def summary(self):
+        summary = {"tests": sum(self.statuses.values()), "statuses": dict(sorted(self.statuses.items()))}
+        summary["metrics"] = {metric: _statistics(values) for metric, values in self.metrics.items() if values}
+        return summary
+
+
+class ResultCollector(object):
+    """Collector of timed test results that summarizes their metrics overall and for every value of every dimension,
+    so that slow algorithm suites, frame sizes, or master key providers stand out.
+
+    :param dimensions: Names of the dimensions by which to group results
+    """
+
+    def __init__(self, dimensions=SUMMARY_DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self._overall = _Group()
+        self._groups = {dimension: {} for dimension in self.dimensions}
+
+    def add(self, result):
+        """Collect a test result.
+
+        Results without a value for a dimension are grouped under "unknown".
+
+        :param dict result: Test result
+        """
+        self._overall.add(result)
+        dimensions = result.get("dimensions", {})
+        for dimension in self.dimensions:
+            value = str(dimensions.get(dimension, "unknown"))
+            self._groups[dimension].setdefault(value, _Group()).add(result)
+
+    def summary(self):
+        """Summarize all collected results.
+
+        :returns: Summary of all results and of the results with each value of each dimension,
+            each with test counts by status and count, total, mean, median, 95th percentile, and maximum of each metric
+        :rtype: dict
+        """
+        return {
+            "overall": self._overall.summary(),
+            "by-dimension": {
+                dimension: {value: group.summary() for value, group in sorted(values.items())}
+                for dimension, values in self._groups.items()
+            },
+        }
+
+
+def collected_results(results, collector):
+    """Pass test results through unchanged while collecting them.
+
+    :param results: Iterable of test results
+    :param ResultCollector collector: Collector to which to add every result
+    """
+    for result in results:
+        collector.add(result)
+        yield result
+
+
+def read_results(filename):
+    """Read test results written one JSON object per line, as the runners write them.
+
+    :param str filename: Name of file containing test results
+    :returns: Iterator of test results
+    """
+    with open(filename, "r") as results_file:
+        for line in results_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def results_label(results, filename):
+    """Name a run of test results after the client that its handler announced,
+    or otherwise after its handler or the file containing it.
+
+    :param list results: Test results of the run
+    :param str filename: Name of file containing the test results
+    :rtype: str
+    """
+    for result in results:
+        handler = result.get("handler", {})
+        if "client" in handler:
+            client = handler["client"]
+            return " ".join(str(client[member]) for member in ("name", "version") if member in client)
+    for result in results:
+        if "name" in result.get("handler", {}):
+            return result["handler"]["name"]
+    return os.path.basename(filename)
+
+
+def describe_scenario(dimensions):
+    """Describe the dimensions of a scenario, such as "0578 with 512-byte frames (aws-kms)".
+
+    :param dict dimensions: Scenario dimensions
+    :rtype: str
+    """
+    frame_size = dimensions.get("frame-size", "unknown")
+    frames = "unframed" if str(frame_size) == "0" else "{}-byte frames".format(frame_size)
+    return "{} with {} ({})".format(
+        dimensions.get("algorithm", "unknown"), frames, dimensions.get("master-keys", "unknown")
+    )
+
+
+def _result_key(result):
+    """Identify the vector of a test result, which is only unique within its manifest."""
+    return result.get("manifest"), result["test"]
+
+
+def _vector(key):
+    """Describe the vector that a result key identifies."""
+    manifest, test = key
+    return {"test": test} if manifest is None else {"manifest": manifest, "test": test}
+
+
+def _scenario(result):
+    return tuple(str(result.get("dimensions", {}).get(dimension, "unknown")) for dimension in SUMMARY_DIMENSIONS)
+
+
+def _median(values):
+    return sorted(values)[(len(values) - 1) // 2]
+
+
+def _median_entry(entries):
+    """Find the (value, key) pair with the median value."""
+    return sorted(entries)[(len(entries) - 1) // 2]
+
+
+def _comparable(result, metric):
+    return result["status"] == "pass" and result.get(metric) is not None
+
+
+def compare_results(runs, join="test", metric="duration", threshold=2.0, baseline=None):
+    """Compare a metric across runs of the same manifest by different handlers, scenario by scenario,
+    and flag every run that is at least ``threshold`` times slower than the reference run of a scenario.
+
+    Joined by ``test``, only tests that passed in every run are compared, and the ratio of a run for a scenario
+    is the median of its per-test ratios to the reference run. Joined by ``scenario``, every passing test is used,
+    and the ratio is that of the medians. The reference run is ``baseline``, or the run with the lowest median.
+    Each outlier names the test that reproduces it: the test with the highest ratio when joined by ``test``,
+    or the test with the median value in the slow run when joined by ``scenario``.
+
+    :param dict runs: Map of run label to list of test results
+    :param str join: How to join results across runs: "test" or "scenario"
+    :param str metric: Metric to compare
+    :param float threshold: Smallest ratio to the reference run that is flagged as an outlier
+    :param str baseline: Label of the run to compare every other run to (optional)
+    :returns: Comparison report
+    :rtype: dict
+    """
+    if join not in ("test", "scenario"):
+        raise ValueError('Unsupported join: "{}"'.format(join))
+    if len(runs) < 2:
+        raise ValueError("At least two runs are required")
+    if baseline is not None and baseline not in runs:
+        raise ValueError('Unknown baseline run: "{}"'.format(baseline))
+
+    by_key = {label: {_result_key(result): result for result in results} for label, results in runs.items()}
+    common = set.intersection(*(set(results) for results in by_key.values()))
+    status_mismatches = [
+        dict(_vector(key), statuses={label: by_key[label][key]["status"] for label in runs})
+        for key in sorted(common, key=str)
+        if len({by_key[label][key]["status"] for label in runs}) > 1
+    ]
+
+    # Map of scenario to map of run label to list of (value, key) pairs
+    scenarios = {}
+    scenario_dimensions = {}
+    if join == "test":
+        for key in common:
+            if all(_comparable(by_key[label][key], metric) for label in runs):
+                result = next(iter(by_key.values()))[key]
+                scenario_dimensions.setdefault(_scenario(result), result.get("dimensions", {}))
+                scenario = scenarios.setdefault(_scenario(result), {})
+                for label in runs:
+                    scenario.setdefault(label, []).append((by_key[label][key][metric], key))
+    else:
+        for label, results in by_key.items():
+            for key, result in results.items():
+                if _comparable(result, metric):
+                    scenario_dimensions.setdefault(_scenario(result), result.get("dimensions", {}))
+                    scenarios.setdefault(_scenario(result), {}).setdefault(label, []).append((result[metric], key))
+
+    rows = []
+    outliers = []
+    for scenario, entries in sorted(scenarios.items()):
+        if len(entries) != len(runs):
+            continue
+        dimensions = {
+            dimension: scenario_dimensions[scenario].get(dimension, "unknown") for dimension in SUMMARY_DIMENSIONS
+        }
+        medians = {label: _median([value for value, _key in entries[label]]) for label in runs}
+        reference = baseline or min(medians, key=medians.get)
+        row = {"dimensions": dimensions, "reference": reference, "runs": {}}
+        for label in runs:
+            if join == "test":
+                # Entries of every run are in the same test order
+                ratios = [
+                    (value / reference_value, key)
+                    for (value, key), (reference_value, _key) in zip(entries[label], entries[reference])
+                    if reference_value > 0
+                ]
+                ratio = _median([ratio for ratio, _key in ratios]) if ratios else None
+                example = max(ratios)[1] if ratios else None
+            else:
+                ratio = medians[label] / medians[reference] if medians[reference] > 0 else None
+                example = _median_entry(entries[label])[1]
+            row["runs"][label] = {"tests": len(entries[label]), "median": medians[label], "ratio": ratio}
+            if label != reference and ratio is not None and ratio >= threshold:
+                outlier = {"run": label, "reference": reference, "ratio": ratio, "dimensions": dimensions}
+                outlier["vector"] = _vector(example)
+                outliers.append(outlier)
+        rows.append(row)
+    outliers.sort(key=lambda outlier: outlier["ratio"], reverse=True)
+
+    return {
+        "join": join,
+        "metric": metric,
+        "threshold": threshold,
+        "runs": {
+            label: {"results": len(results), "unmatched": len(set(results) - common)}
+            for label, results in by_key.items()
+        },
+        "status-mismatches": status_mismatches,
+        "scenarios": rows,
+        "outliers": outliers,
+    }
+
+
+def describe_outlier(outlier, metric="duration"):
+    """Describe an outlier of a comparison, such as
+    "Java 3.0x slower than C on 0578 with 512-byte frames (aws-kms): test 4be2393c-...".
+
+    :param dict outlier: Outlier from :func:`compare_results`
+    :param str metric: Metric that was compared
+    :rtype: str
+    """
+    comparison = "slower" if metric in ("duration", "cpu-time") else "higher {}".format(metric)
+    vector = outlier["vector"]
+    where = "test {}".format(vector["test"])
+    if "manifest" in vector:
+        where += " of {}".format(vector["manifest"])
+    return "{run} {ratio:.1f}x {comparison} than {reference} on {scenario}: {where}".format(
+        run=outlier["run"],
+        ratio=outlier["ratio"],
+        comparison=comparison,
+        reference=outlier["reference"],
+        scenario=describe_scenario(outlier["dimensions"]),
+        where=where,
+    )
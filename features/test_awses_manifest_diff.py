@@ -0,0 +1,82 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import importlib.util
+import json
+import os
+
+MASTER_KEYS = [{"type": "raw", "key": "aes-128", "provider-id": "test", "encryption-algorithm": "aes"}]
+
+
+def _diff_module():
+    """Import the diff script, whose file name is not a valid module name."""
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "awses-manifest-diff.py")
+    spec = importlib.util.spec_from_file_location("awses_manifest_diff", filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _scenario(algorithm, frame_size=0):
+    return {
+        "plaintext": "small",
+        "algorithm": algorithm,
+        "frame-size": frame_size,
+        "encryption-context": {},
+        "master-keys": MASTER_KEYS,
+    }
+
+
+def _write(directory, filename, tests):
+    manifest = {
+        "manifest": {"type": "awses-encrypt", "version": 2},
+        "keys": "file://keys.json",
+        "plaintexts": {"small": 10240},
+        "tests": tests,
+    }
+    (directory / filename).write_text(json.dumps(manifest))
+    return str(directory / filename)
+
+
+def test_scenario_changed_under_the_same_id_is_a_change(tmp_path):
+    old = _write(tmp_path, "old.json", {"a": _scenario("0014"), "b": _scenario("0078")})
+    new = _write(tmp_path, "new.json", {"a": _scenario("0078"), "b": _scenario("0078")})
+
+    report = _diff_module().diff_manifests(old, new)
+
+    assert report["tests"] == {"old": 2, "new": 2, "unchanged": 1}
+    assert report["changed"]["count"] == 1
+    assert report["changed"]["examples"] == ["a"]
+    assert report["changed"]["members"] == {"algorithm": 1}
+    assert report["added"]["count"] == report["removed"]["count"] == 0
+
+
+def test_tests_with_new_ids_are_matched_by_content(tmp_path):
+    old = _write(
+        tmp_path, "old.json", {"a": _scenario("0014"), "b": _scenario("0078"), "c": _scenario("0046")}
+    )
+    new = _write(
+        tmp_path,
+        "new.json",
+        {"x": _scenario("0078"), "y": dict(_scenario("0014"), **{"cost": {"weight": 1}}), "z": _scenario("0114")},
+    )
+
+    report = _diff_module().diff_manifests(old, new)
+
+    assert report["tests"] == {"old": 3, "new": 3, "unchanged": 1}
+    assert report["changed"]["examples"] == ["y"]
+    assert report["changed"]["members"] == {"cost": 1}
+    assert report["added"]["examples"] == ["z"]
+    assert report["removed"]["examples"] == ["c"]
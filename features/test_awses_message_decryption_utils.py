@@ -0,0 +1,62 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import time
+
+from awses_message_decryption_utils import run_test, run_tests
+
+MASTER_KEYS = [{"type": "raw", "key": "aes-128", "provider-id": "test", "encryption-algorithm": "aes"}]
+
+
+def swallowing_handler(_request):
+    """Handler callable that never finishes, and swallows every exception while it waits."""
+    while True:
+        try:
+            time.sleep(1)
+        except Exception:  # Deliberately as broad as a careless handler
+            pass
+
+
+def failing_handler(_request):
+    """Handler callable that fails every decryption."""
+    raise ValueError("Decryption failed")
+
+
+def _requests(tmp_path, count, consumed):
+    ciphertext = tmp_path / "ciphertext"
+    ciphertext.write_bytes(b"\x01\x80" + bytes(64))
+    for index in range(count):
+        consumed.append(index)
+        yield {"test": "test-{}".format(index), "ciphertext": str(ciphertext), "master-keys": MASTER_KEYS}
+
+
+def test_callable_timeout_cannot_be_swallowed(tmp_path):
+    request = next(_requests(tmp_path, 1, []))
+    result = run_test("callable", "test_awses_message_decryption_utils:swallowing_handler", request, 0.2)
+
+    assert result["status"] == "timeout"
+
+
+def test_run_tests_bounds_requests_in_flight(tmp_path):
+    consumed = []
+    results = run_tests(
+        "callable", "test_awses_message_decryption_utils:failing_handler", _requests(tmp_path, 50, consumed), 2
+    )
+
+    first = next(results)
+    assert len(consumed) <= 4
+    assert sorted(result["test"] for result in [first] + list(results)) == sorted(
+        "test-{}".format(index) for index in range(50)
+    )
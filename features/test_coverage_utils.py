@@ -0,0 +1,68 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import itertools
+import json
+import os
+
+import pytest
+
+from awses_message_encryption_utils import matrix_dimensions, scenario_matrix
+from coverage_utils import coverage_strength, covering_array, uncovered_combinations
+from keys_manifest_utils import load_keys_manifest
+
+CANONICAL_KEYS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "CANONICAL-GENERATED-MANIFESTS", "0002-keys.v3.json"
+)
+
+
+def _assert_covers(sizes, rows, strength):
+    """Check every combination of values of every ``strength`` dimensions directly against the rows."""
+    for dimensions in itertools.combinations(range(len(sizes)), strength):
+        covered = {tuple(row[dimension] for dimension in dimensions) for row in rows}
+        for values in itertools.product(*(range(sizes[dimension]) for dimension in dimensions)):
+            assert values in covered, (dimensions, values)
+
+
+def test_coverage_strength():
+    assert coverage_strength("full") is None
+    assert coverage_strength("pairwise") == 2
+    assert coverage_strength("3-way") == 3
+    for value in ("0-way", "x-way", "triplewise"):
+        with pytest.raises(ValueError):
+            coverage_strength(value)
+
+
+@pytest.mark.parametrize("sizes, strength", (([3, 3, 3, 3], 2), ([2, 4, 3, 2, 5], 3), ([4, 1, 6], 2), ([5, 2], 4)))
+def test_covering_array_covers_every_combination(sizes, strength):
+    rows = covering_array(sizes, strength)
+
+    _assert_covers(sizes, rows, min(strength, len(sizes)))
+    assert uncovered_combinations(sizes, rows, strength)[0] == 0
+    assert covering_array(sizes, strength) == rows
+
+
+def test_pairwise_scenarios_cover_every_pair_of_values():
+    dimensions = matrix_dimensions(load_keys_manifest(CANONICAL_KEYS))
+    scenarios = list(scenario_matrix(dimensions, 2))
+
+    assert len(scenarios) == 165
+    for (first, first_values), (second, second_values) in itertools.combinations(dimensions, 2):
+        covered = {
+            (json.dumps(scenario[first], sort_keys=True), json.dumps(scenario[second], sort_keys=True))
+            for scenario in scenarios
+        }
+        for first_value, second_value in itertools.product(first_values, second_values):
+            assert (json.dumps(first_value, sort_keys=True), json.dumps(second_value, sort_keys=True)) in covered
@@ -0,0 +1,38 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import os
+
+import pytest
+
+from handler_protocol_utils import output_path
+
+
+def test_output_path_keeps_plain_test_ids():
+    assert output_path("out", "6f2ab5a4-5c6e-4d1c-9b1a-0c2b8d5d8f3e") == os.path.join(
+        "out", "6f2ab5a4-5c6e-4d1c-9b1a-0c2b8d5d8f3e"
+    )
+
+
+def test_output_path_encodes_separators_and_escapes():
+    names = [os.path.basename(output_path("out", test_id)) for test_id in ("../x", "a/b", "a\\b", "a%2Fb")]
+
+    assert names == ["..%2Fx", "a%2Fb", "a%5Cb", "a%252Fb"]
+
+
+@pytest.mark.parametrize("test_id", ("", ".", ".."))
+def test_output_path_rejects_ids_outside_the_output_directory(test_id):
+    with pytest.raises(ValueError):
+        output_path("out", test_id)
@@ -0,0 +1,75 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+from manifest_schema_utils import manifest_errors
+
+MASTER_KEYS = [
+    {"type": "raw", "key": "aes-128", "provider-id": "aws-raw-vectors-persistant", "encryption-algorithm": "aes"}
+]
+
+
+def _decrypt_errors(version, test):
+    header = {
+        "manifest": {"type": "awses-decrypt", "version": version},
+        "client": {"name": "aws/aws-encryption-sdk-python", "version": "1.3.4"},
+        "keys": "file://keys.json",
+    }
+    return list(manifest_errors(header, [("test", test)]))
+
+
+def test_decrypt_v3_accepts_decryption_method():
+    test = {
+        "ciphertext": "file://ciphertexts/test",
+        "master-keys": MASTER_KEYS,
+        "decryption-method": "streaming-unsigned-only",
+        "result": {"output": {"plaintext": "file://plaintexts/small"}},
+    }
+    assert _decrypt_errors(3, test) == []
+
+
+def test_decrypt_v2_rejects_decryption_method():
+    test = {
+        "ciphertext": "file://ciphertexts/test",
+        "master-keys": MASTER_KEYS,
+        "decryption-method": "streaming-unsigned-only",
+        "result": {"output": {"plaintext": "file://plaintexts/small"}},
+    }
+    errors = _decrypt_errors(2, test)
+    assert len(errors) == 1
+    assert "decryption-method" in errors[0]
+
+
+def test_decrypt_v1_requires_plaintext_rather_than_result():
+    test = {"ciphertext": "file://ciphertexts/test", "master-keys": MASTER_KEYS, "plaintext": "file://plaintexts/small"}
+    assert _decrypt_errors(1, test) == []
+    assert _decrypt_errors(2, test) != []
+
+
+def test_encrypt_cost_hints_are_valid_in_every_version():
+    test = {
+        "plaintext": "small",
+        "algorithm": "0014",
+        "frame-size": 0,
+        "encryption-context": {},
+        "master-keys": MASTER_KEYS,
+        "cost": {"plaintext-bytes": 10240, "frames": 1, "key-families": ["aes"], "signed": False, "weight": 10240},
+    }
+    for version in (1, 2, 3, 4):
+        header = {
+            "manifest": {"type": "awses-encrypt", "version": version},
+            "keys": "file://keys.json",
+            "plaintexts": {"small": 10240},
+        }
+        assert list(manifest_errors(header, [("test", test)])) == []
@@ -0,0 +1,98 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+
+import pytest
+
+from manifest_utils import (
+    COMPRESSIONS,
+    MANIFEST_FORMATS,
+    MANIFEST_WRITERS,
+    IncrementalTestIds,
+    interleave_shards,
+    open_manifest,
+    output_stream,
+    run_shards,
+    shard_tests,
+)
+
+HEADER = {"manifest": {"type": "awses-encrypt", "version": 3}, "keys": "file://keys.json", "plaintexts": {"small": 10}}
+TESTS = [
+    (
+        "test-{}".format(index),
+        {"plaintext": "small", "algorithm": "0014", "frame-size": index, "encryption-context": {}},
+    )
+    for index in range(25)
+]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("manifest_format", MANIFEST_FORMATS)
+def test_written_manifest_reads_back(tmp_path, manifest_format, compression):
+    filename = str(tmp_path / "manifest")
+    with output_stream(filename, manifest_format == "msgpack", compression) as stream:
+        written = MANIFEST_WRITERS[manifest_format](stream, HEADER, iter(TESTS), 4)
+
+    assert written == len(TESTS)
+    with open_manifest(filename) as (header, tests):
+        assert list(tests) == TESTS
+    assert header == HEADER
+
+
+@pytest.mark.parametrize("indent", (None, 2))
+def test_json_manifest_matches_json_dumps(tmp_path, indent):
+    filename = str(tmp_path / "manifest.json")
+    with output_stream(filename) as stream:
+        MANIFEST_WRITERS["json"](stream, HEADER, iter(TESTS), indent)
+
+    expected = dict(HEADER, tests=dict(TESTS))
+    with open(filename, "r") as manifest_file:
+        assert manifest_file.read() == json.dumps(expected, indent=indent)
+
+
+def test_incremental_ids_reuse_unchanged_tests():
+    previous = [("old-0", TESTS[0][1]), ("old-1", dict(TESTS[1][1], **{"cost": {"weight": 1}})), ("gone", {})]
+    test_id = IncrementalTestIds(previous, lambda test: "new-{}".format(test["frame-size"]))
+
+    assert [test_id(test) for _name, test in TESTS[:3]] == ["old-0", "old-1", "new-2"]
+    assert test_id.delta_report() == {"reused": 2, "added": ["new-2"], "removed": ["gone"]}
+
+
+def test_incremental_ids_reject_duplicate_ids():
+    test_id = IncrementalTestIds([("old-0", TESTS[0][1])], lambda _test: "old-0")
+
+    assert test_id(TESTS[0][1]) == "old-0"
+    with pytest.raises(ValueError, match="Duplicate test ID"):
+        test_id(TESTS[1][1])
+
+
+def _name(test):
+    return "test-{}".format(test["frame-size"])
+
+
+def _build_shard(tests, shard_count, shard_index):
+    return list(shard_tests(tests, _name, shard_count, shard_index))
+
+
+@pytest.mark.parametrize("shard_count", (1, 3, 7, 30))
+def test_shards_are_disjoint_and_cover_every_test(shard_count):
+    tests = [test for _name, test in TESTS]
+    shards = run_shards(_build_shard, shard_count, 2, tests)
+
+    names = [name for shard in shards for name, _test in shard]
+    assert len(names) == len(set(names))
+    assert sorted(names) == sorted(name for name, _test in TESTS)
+    assert list(interleave_shards(shards)) == TESTS
@@ -0,0 +1,52 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+
+import pytest
+
+from meta_manifest_utils import manifest_graph
+
+
+def _write_meta(directory, version):
+    """Write a meta manifest that references another meta manifest, which lists a keys manifest."""
+    (directory / "keys.json").write_text(json.dumps({"manifest": {"type": "keys", "version": 3}, "keys": {}}))
+    nested = {"manifest": {"type": "meta", "version": 1}, "tests": [{"manifest": "file://keys.json", "type": "keys"}]}
+    (directory / "nested.json").write_text(json.dumps(nested))
+    meta = {
+        "manifest": {"type": "meta", "version": version},
+        "tests": [{"manifest": "file://nested.json", "type": "meta"}],
+    }
+    (directory / "meta.json").write_text(json.dumps(meta))
+    return str(directory / "meta.json")
+
+
+def test_nested_meta_manifests_are_expanded_from_version_2(tmp_path):
+    nodes = manifest_graph(_write_meta(tmp_path, 2))
+
+    assert [(node.type, node.errors) for node in nodes.values()] == [("keys", [])]
+
+
+def test_nested_meta_manifests_are_rejected_before_version_2(tmp_path):
+    nodes = manifest_graph(_write_meta(tmp_path, 1))
+
+    [node] = nodes.values()
+    assert node.type == "meta"
+    assert node.errors == ["Meta manifest references are only valid in meta manifests of version 2 and later"]
+
+
+def test_unsupported_meta_manifest_versions_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        manifest_graph(_write_meta(tmp_path, 3))
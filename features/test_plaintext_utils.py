@@ -0,0 +1,80 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import hashlib
+import os
+
+import pytest
+
+from plaintext_utils import PLAINTEXT_BLOCK_SIZE, PlaintextCache, plaintext, plaintext_chunks
+
+
+def test_plaintext_blocks_are_derived_from_name_size_and_index():
+    size = PLAINTEXT_BLOCK_SIZE + 10
+    blocks = list(plaintext_chunks("small", size))
+
+    assert [len(block) for block in blocks] == [PLAINTEXT_BLOCK_SIZE, 10]
+    assert blocks[0] == hashlib.shake_256(b"small:%d:0" % size).digest(PLAINTEXT_BLOCK_SIZE)
+    assert blocks[1] == hashlib.shake_256(b"small:%d:1" % size).digest(10)
+    assert list(plaintext_chunks("small", size)) == blocks
+    assert plaintext("small", 0) == b""
+
+
+def test_plaintexts_differ_by_name_and_size():
+    assert plaintext("small", 100) != plaintext("other", 100)
+    assert plaintext("small", 100) != plaintext("small", 101)[:100]
+
+
+def test_cache_stores_each_plaintext_by_content(tmp_path):
+    cache = PlaintextCache(str(tmp_path))
+    path = cache.path("small", 100)
+
+    with open(path, "rb") as plaintext_file:
+        assert plaintext_file.read() == plaintext("small", 100)
+    assert os.path.basename(path) == hashlib.sha256(plaintext("small", 100)).hexdigest()
+    assert PlaintextCache(str(tmp_path)).path("small", 100) == path
+    # Every empty plaintext has the same content, whatever its name
+    assert cache.path("zero", 0) == cache.path("empty", 0)
+    assert len(os.listdir(str(tmp_path / "objects"))) == 2
+
+
+def test_cache_rematerializes_missing_objects(tmp_path):
+    cache = PlaintextCache(str(tmp_path))
+    path = cache.path("small", 100)
+    os.remove(path)
+
+    assert cache.path("small", 100) == path
+    assert os.path.isfile(path)
+
+
+@pytest.mark.parametrize(
+    "name, size", (("..", 10), ("a/b", 10), ("a\\b", 10), ("", 10), ("small", -1), ("small", True))
+)
+def test_cache_rejects_names_and_sizes_outside_the_cache(tmp_path, name, size):
+    with pytest.raises(ValueError):
+        PlaintextCache(str(tmp_path)).path(name, size)
+
+
+def test_lazy_paths_only_materialize_looked_up_plaintexts(tmp_path):
+    cache = PlaintextCache(str(tmp_path))
+    paths = cache.paths({"small": 100, "large": 10 * PLAINTEXT_BLOCK_SIZE})
+
+    assert sorted(paths) == ["large", "small"]
+    assert len(paths) == 2
+    assert not (tmp_path / "objects").exists()
+    assert paths["small"] == cache.path("small", 100)
+    assert os.listdir(str(tmp_path / "objects")) == [os.path.basename(paths["small"])]
+    with pytest.raises(KeyError):
+        paths["missing"]
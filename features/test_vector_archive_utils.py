@@ -0,0 +1,100 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+
+from vector_archive_utils import VectorArchive, pack_archive
+
+KEYS = {
+    "manifest": {"type": "keys", "version": 3},
+    "keys": {
+        "aes-128": {
+            "key-id": "aes-128",
+            "encrypt": True,
+            "decrypt": True,
+            "algorithm": "aes",
+            "type": "symmetric",
+            "bits": 128,
+            "encoding": "base64",
+            "material": "AAECAwQFBgcICRAREhMUFQ==",
+        }
+    },
+}
+MASTER_KEYS = [{"type": "raw", "key": "aes-128", "provider-id": "test", "encryption-algorithm": "aes"}]
+
+
+def _write_vectors(directory, version, tests):
+    """Write a keys manifest, a ciphertext and plaintext for every test, and a decrypt manifest."""
+    (directory / "keys.json").write_text(json.dumps(KEYS))
+    for name in tests:
+        (directory / ("ciphertext-" + name)).write_bytes(b"ciphertext of " + name.encode("utf-8"))
+        (directory / ("plaintext-" + name)).write_bytes(b"plaintext")
+    manifest = {
+        "manifest": {"type": "awses-decrypt", "version": version},
+        "client": {"name": "test", "version": "1"},
+        "keys": "file://keys.json",
+        "tests": tests,
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return str(directory / "manifest.json")
+
+
+def test_pack_version_1_manifest(tmp_path):
+    tests = {
+        name: {
+            "ciphertext": "file://ciphertext-" + name,
+            "master-keys": MASTER_KEYS,
+            "plaintext": "file://plaintext-" + name,
+        }
+        for name in ("a", "b")
+    }
+    manifest = _write_vectors(tmp_path, 1, tests)
+
+    # Each distinct file is a blob: two ciphertexts and two plaintexts
+    assert pack_archive(manifest, str(tmp_path / "vectors.ava")) == (2, 4)
+    with VectorArchive(str(tmp_path / "vectors.ava")) as archive:
+        assert archive.manifest["manifest"]["version"] == 1
+        assert sorted(archive.tests()) == ["a", "b"]
+        for name in ("a", "b"):
+            with archive.ciphertext(name) as ciphertext, archive.plaintext(name) as plaintext:
+                assert bytes(ciphertext) == b"ciphertext of " + name.encode("utf-8")
+                assert bytes(plaintext) == b"plaintext"
+
+
+def test_pack_version_2_manifest(tmp_path):
+    tests = {
+        "good": {
+            "ciphertext": "file://ciphertext-good",
+            "master-keys": MASTER_KEYS,
+            "result": {"output": {"plaintext": "file://plaintext-good"}},
+        },
+        "bad": {
+            "ciphertext": "file://ciphertext-bad",
+            "master-keys": MASTER_KEYS,
+            "result": {"error": {"error-description": "Tampered"}},
+        },
+    }
+    manifest = _write_vectors(tmp_path, 2, tests)
+
+    assert pack_archive(manifest, str(tmp_path / "vectors.ava")) == (2, 3)
+    with VectorArchive(str(tmp_path / "vectors.ava")) as archive:
+        assert archive.manifest["tests"] == tests
+        assert archive.keys["keys"] == KEYS["keys"]
+        with archive.ciphertext("good") as ciphertext, archive.plaintext("good") as plaintext:
+            assert bytes(ciphertext) == b"ciphertext of good"
+            assert bytes(plaintext) == b"plaintext"
+        with archive.ciphertext("bad") as ciphertext:
+            assert bytes(ciphertext) == b"ciphertext of bad"
+        assert archive.plaintext("bad") is None
@@ -0,0 +1,134 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import hashlib
+import json
+
+from manifest_utils import resolve_uri
+from vector_dedup_utils import dedup_manifest
+
+MASTER_KEYS = [{"type": "raw", "key": "aes-128", "provider-id": "test", "encryption-algorithm": "aes"}]
+PLAINTEXT = b"shared plaintext"
+
+
+def _write_manifest(directory, version, tests):
+    """Write a decrypt manifest of three tests that share one plaintext, each in a file of its own."""
+    (directory / "keys.json").write_text("{}")
+    for name in tests:
+        (directory / ("ciphertext-" + name)).write_bytes(b"ciphertext of " + name.encode("utf-8"))
+        (directory / ("plaintext-" + name)).write_bytes(PLAINTEXT)
+    manifest = {
+        "manifest": {"type": "awses-decrypt", "version": version},
+        "client": {"name": "test", "version": "1"},
+        "keys": "file://keys.json",
+        "tests": tests,
+    }
+    (directory / "manifest.json").write_text(json.dumps(manifest))
+    return str(directory / "manifest.json")
+
+
+def _version_1_tests():
+    return {
+        name: {
+            "ciphertext": "file://ciphertext-" + name,
+            "master-keys": MASTER_KEYS,
+            "plaintext": "file://plaintext-" + name,
+        }
+        for name in ("a", "b", "c")
+    }
+
+
+def _version_2_tests():
+    return {
+        name: {
+            "ciphertext": "file://ciphertext-" + name,
+            "master-keys": MASTER_KEYS,
+            "result": {"output": {"plaintext": "file://plaintext-" + name}},
+        }
+        for name in ("a", "b", "c")
+    }
+
+
+def _plaintext_uri(test):
+    return test["plaintext"] if "result" not in test else test["result"]["output"]["plaintext"]
+
+
+def _check_deduplicated(output_directory):
+    """Check that every test of a deduplicated manifest refers to the shared plaintext object."""
+    with open(str(output_directory / "manifest.json")) as manifest_file:
+        manifest = json.load(manifest_file)
+    plaintexts = {_plaintext_uri(test) for test in manifest["tests"].values()}
+    assert plaintexts == {"file://objects/" + hashlib.sha256(PLAINTEXT).hexdigest()}
+    for test in manifest["tests"].values():
+        with open(resolve_uri(test["ciphertext"], str(output_directory)), "rb") as ciphertext_file:
+            assert ciphertext_file.read().startswith(b"ciphertext of ")
+    return manifest
+
+
+def test_dedup_version_1_manifest(tmp_path):
+    manifest = _write_manifest(tmp_path, 1, _version_1_tests())
+    output = tmp_path / "out"
+    output.mkdir()
+
+    dedup_manifest(manifest, str(output / "manifest.json"), str(output / "objects"))
+
+    assert "result" not in next(iter(_check_deduplicated(output)["tests"].values()))
+
+
+def test_dedup_version_2_manifest(tmp_path):
+    manifest = _write_manifest(tmp_path, 2, _version_2_tests())
+    output = tmp_path / "out"
+    output.mkdir()
+
+    dedup_manifest(manifest, str(output / "manifest.json"), str(output / "objects"))
+
+    _check_deduplicated(output)
+
+
+def test_copying_saves_nothing(tmp_path):
+    manifest = _write_manifest(tmp_path, 2, _version_2_tests())
+
+    report = dedup_manifest(manifest, str(tmp_path / "deduplicated.json"), str(tmp_path / "objects"))
+
+    assert report == {
+        "files": 6,
+        "objects": 4,
+        "bytes-before": 3 * len(b"ciphertext of a") + 3 * len(PLAINTEXT),
+        "bytes-stored": 3 * len(b"ciphertext of a") + len(PLAINTEXT),
+        "bytes-saved": 0,
+    }
+    assert (tmp_path / "plaintext-b").exists()
+
+
+def test_moving_saves_removed_duplicates(tmp_path):
+    manifest = _write_manifest(tmp_path, 1, _version_1_tests())
+
+    report = dedup_manifest(manifest, str(tmp_path / "deduplicated.json"), str(tmp_path / "objects"), move=True)
+
+    # The first plaintext moves into the store and the two duplicates are removed
+    assert report["objects"] == 4
+    assert report["bytes-saved"] == 2 * len(PLAINTEXT)
+    assert not any((tmp_path / ("plaintext-" + name)).exists() for name in ("a", "b", "c"))
+
+
+def test_existing_objects_are_not_savings(tmp_path):
+    manifest = _write_manifest(tmp_path, 2, _version_2_tests())
+    dedup_manifest(manifest, str(tmp_path / "first.json"), str(tmp_path / "objects"))
+
+    report = dedup_manifest(manifest, str(tmp_path / "second.json"), str(tmp_path / "objects"))
+
+    assert report["objects"] == 0
+    assert report["bytes-stored"] == 0
+    assert report["bytes-saved"] == 0
@@ -0,0 +1,135 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Subcommand name to generator script and the feature name of the manifests that it generates
+GENERATORS = {
+    "keys": ("0002-keys-generate.py", "0002-keys"),
+    "encrypt": ("0003-awses-message-encryption-generate.py", "0003-awses-message-encryption"),
+    "decrypt-generate": (
+        "0006-awses-message-decryption-generation-generate.py",
+        "0006-awses-message-decryption-generation",
+    ),
+}
+
+
+def _load_generator(subcommand):
+    """Import a generator script, whose file name is not a valid module name.
+
+    The module is registered under its own name, so that shard worker processes can find its functions.
+
+    :param str subcommand: Generator subcommand
+    """
+    script, _feature = GENERATORS[subcommand]
+    name = os.path.splitext(script)[0].replace("-", "_")
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, script))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def _canonical_filename(subcommand, version):
+    """Build the file name of a manifest, following the pattern of the canonical manifests."""
+    return "{feature}.v{version}.json".format(feature=GENERATORS[subcommand][1], version=version)
+
+
+def _write_json(manifest, filename, indent):
+    """Write a manifest as a single JSON document."""
+    with open(filename, "w") as output_file:
+        json.dump(manifest, output_file, indent=indent)
+        output_file.write("\n")
+
+
+def write_all(output_directory, indent=None, id_seed=None):
+    """Generate the keys manifest and every message manifest that uses it in a single process.
+
+    The keys manifest is built once and shared by all message manifest generators, without ever being parsed.
+    Every manifest refers to the keys manifest by its file name in the same directory.
+
+    :param str output_directory: Directory to which to write the manifests
+    :param int indent: Indentation width, or None for compact output
+    :param str id_seed: Seed for deterministic test IDs, or None for random test IDs
+    :returns: Names of the files written
+    :rtype: list
+    """
+    # Imported here so that the other subcommands do not pay for it
+    from keys_manifest_utils import KeysManifest
+
+    os.makedirs(output_directory, exist_ok=True)
+    keys_generator = _load_generator("keys")
+    keys_manifest = keys_generator.build_manifest()
+    keys_generator._test_manifest(keys_manifest)
+    keys_filename = _canonical_filename("keys", keys_generator.VERSION)
+    written = [os.path.join(output_directory, keys_filename)]
+    _write_json(keys_manifest, written[0], indent)
+
+    keys = KeysManifest(keys_manifest)
+    for subcommand in ("encrypt", "decrypt-generate"):
+        generator = _load_generator(subcommand)
+        test_id = generator.random_test_id
+        if id_seed is not None:
+            test_id = generator.deterministic_test_id_builder(id_seed)
+        manifest = generator.build_manifest(keys_filename, test_id, keys=keys)
+        written.append(os.path.join(output_directory, _canonical_filename(subcommand, generator.MANIFEST_VERSION)))
+        _write_json(manifest, written[-1], indent)
+    return written
+
+
+def main(args=None):
+    """Entry point for CLI
+
+    Generator scripts are only imported when their subcommand runs, so every subcommand starts quickly.
+    """
+    parser = argparse.ArgumentParser(description="Generate AWS Crypto Tools test vector manifests.")
+    subparsers = parser.add_subparsers(dest="subcommand", metavar="subcommand")
+    subparsers.required = True
+    for subcommand, (script, _feature) in GENERATORS.items():
+        subparsers.add_parser(subcommand, add_help=False, help="Run {} with all remaining arguments".format(script))
+    all_parser = subparsers.add_parser("all", help="Generate the keys manifest and all message manifests at once")
+    all_parser.add_argument("--output-dir", required=True, help="Directory to which to write the manifests")
+    all_parser.add_argument("--human", action="store_true", help="Write human-readable JSON")
+    all_parser.add_argument(
+        "--deterministic-ids", action="store_true", help="Derive test IDs from test content rather than at random"
+    )
+    all_parser.add_argument("--id-seed", default="", help="Seed for deterministic test IDs")
+
+    parsed, remaining = parser.parse_known_args(args)
+
+    if parsed.subcommand in GENERATORS:
+        return _load_generator(parsed.subcommand).main(remaining)
+    if remaining:
+        parser.error("unrecognized arguments: " + " ".join(remaining))
+
+    kwargs = {}
+    if parsed.human:
+        kwargs["indent"] = 4
+    if parsed.deterministic_ids:
+        kwargs["id_seed"] = parsed.id_seed
+
+    for filename in write_all(parsed.output_dir, **kwargs):
+        print(filename, file=sys.stderr)
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import functools
+import json
+import mmap
+import os
+import struct
+
+from keys_manifest_utils import KeysManifest
+from manifest_utils import open_manifest, resolve_uri
+
+# An archive is the magic bytes, the offset and length of the index, every blob, and finally the index.
+# The index is a JSON object that holds the decrypt manifest, its keys manifest,
+# and the offset and length of the ciphertext and plaintext of every test.
+ARCHIVE_MAGIC = b"AWSESVA1"
+_HEADER = struct.Struct(">8sQQ")
+# Blobs start on aligned offsets, so that buffers handed out by readers are aligned as well
+_ALIGNMENT = 64
+_COPY_SIZE = 1024 * 1024
+
+
+def _copy_blob(source_filename, archive_file):
+    """Append a file to an archive at the next aligned offset.
+
+    :returns: Offset and length of the blob
+    :rtype: list
+    """
+    offset = archive_file.tell()
+    padding = -offset % _ALIGNMENT
+    archive_file.write(b"\x00" * padding)
+    offset += padding
+
+    length = 0
+    with open(source_filename, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(_COPY_SIZE), b""):
+            archive_file.write(chunk)
+            length += len(chunk)
+    return [offset, length]
+
+
+def pack_archive(manifest_filename, archive_filename):
+    """Pack an AWS Encryption SDK message decryption manifest, its keys manifest,
+    and all of its ciphertexts and plaintexts into a single archive.
+
+    Each distinct file is stored once, however many tests refer to it.
+
+    :param str manifest_filename: Name of file containing the decrypt manifest
+    :param str archive_filename: Name of archive file to write
+    :returns: Number of tests and number of distinct blobs packed
+    :rtype: tuple
+    """
+    base_directory = os.path.dirname(os.path.abspath(manifest_filename))
+    blobs = {}
+    index_tests = {}
+
+    with open(archive_filename, "wb") as archive_file:
+        archive_file.write(_HEADER.pack(ARCHIVE_MAGIC, 0, 0))
+
+        with open_manifest(manifest_filename) as (header, tests):
+            if header["manifest"]["type"] != "awses-decrypt":
+                raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+            with open(resolve_uri(header["keys"], base_directory), "r") as keys_file:
+                keys = json.load(keys_file)
+
+            manifest = dict(header, tests={})
+            for name, test in tests:
+                manifest["tests"][name] = test
+                locations = {}
+                uris = {"ciphertext": test["ciphertext"]}
+                if "result" not in test:
+                    # Version 1 test cases always succeed, and name their plaintext directly
+                    uris["plaintext"] = test["plaintext"]
+                elif "output" in test["result"]:
+                    uris["plaintext"] = test["result"]["output"]["plaintext"]
+                for member, uri in uris.items():
+                    path = resolve_uri(uri, base_directory)
+                    if path not in blobs:
+                        blobs[path] = _copy_blob(path, archive_file)
+                    locations[member] = blobs[path]
+                index_tests[name] = locations
+
+        index = json.dumps({"manifest": manifest, "keys": keys, "tests": index_tests}).encode("utf-8")
+        index_offset = archive_file.tell()
+        archive_file.write(index)
+        archive_file.seek(0)
+        archive_file.write(_HEADER.pack(ARCHIVE_MAGIC, index_offset, len(index)))
+
+    return len(index_tests), len(blobs)
+
+
+class VectorArchive(object):
+    """Memory-mapped reader for an archive written by :func:`pack_archive`.
+
+    Ciphertexts and plaintexts are returned as read-only memoryviews of the mapped archive,
+    so reading them never copies them and the operating system pages them in on demand.
+    All memoryviews must be released before the archive is closed.
+
+    :param str filename: Name of archive file
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self._view = memoryview(self._map)
+
+        magic, index_offset, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError("Not a test vector archive: {}".format(filename))
+        index = json.loads(self._map[index_offset : index_offset + index_length].decode("utf-8"))
+
+        self.manifest = index["manifest"]
+        self.keys = KeysManifest(index["keys"])
+        self._tests = index["tests"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap and close the archive."""
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def tests(self):
+        """List the IDs of all tests in the archive."""
+        return list(self._tests)
+
+    def _blob(self, location):
+        offset, length = location
+        return self._view[offset : offset + length]
+
+    def ciphertext(self, test_id):
+        """Get the ciphertext of a test without copying it.
+
+        :param str test_id: Test ID
+        :rtype: memoryview
+        """
+        return self._blob(self._tests[test_id]["ciphertext"])
+
+    def locations(self, test_id):
+        """Get the offset and length in the archive of the ciphertext and expected plaintext of a test.
+
+        :param str test_id: Test ID
+        :returns: Map of ``ciphertext`` and, if the test must succeed, ``plaintext`` to offset and length
+        :rtype: dict
+        """
+        return dict(self._tests[test_id])
+
+    def plaintext(self, test_id):
+        """Get the expected plaintext of a test without copying it.
+
+        :param str test_id: Test ID
+        :returns: Expected plaintext, or None if the test must fail
+        :rtype: memoryview
+        """
+        location = self._tests[test_id].get("plaintext")
+        if location is None:
+            return None
+        return self._blob(location)
+
+
+def is_archive(filename):
+    """Determine whether a file is an archive written by :func:`pack_archive` rather than a manifest.
+
+    :param str filename: Name of file
+    :rtype: bool
+    """
+    with open(filename, "rb") as archive_file:
+        return archive_file.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+
+
+@functools.lru_cache()
+def _open_archive(filename, _mtime, _size):
+    """Open an archive, memoized by absolute file name and by the modification time and size of the file."""
+    return VectorArchive(filename)
+
+
+def open_archive(filename):
+    """Open an archive at most once per process, so that every test read from it shares the same mapping.
+
+    Every reference to the same file shares it, however the file name is spelled,
+    until the file is replaced. The archive stays open for the lifetime of the process.
+
+    :param str filename: Name of archive file
+    :rtype: VectorArchive
+    """
+    filename = os.path.abspath(filename)
+    status = os.stat(filename)
+    return _open_archive(filename, status.st_mtime_ns, status.st_size)
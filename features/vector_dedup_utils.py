@@ -0,0 +1,108 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+#
+# Only Python 3.7+ compatibility is guaranteed.
+
+import json
+import os
+import shutil
+
+from awses_message_decryption_utils import file_digest
+from manifest_utils import file_uri, open_manifest, resolve_uri
+
+
+class _BlobStore(object):
+    """Content-addressed store of files, each kept once as ``<objects directory>/<sha256>``.
+
+    :param str directory: Objects directory
+    :param bool move: Whether to move files into the store and remove duplicates, rather than copy them
+    """
+
+    def __init__(self, directory, move):
+        self.directory = directory
+        self.move = move
+        self._objects = {}
+        self.report = {"files": 0, "objects": 0, "bytes-before": 0, "bytes-stored": 0, "bytes-saved": 0}
+
+    def add(self, path):
+        """Store a file, if its content is not already stored.
+
+        Only files that this run removes count as saved space: copying never frees any,
+        and neither does moving a file into the store.
+
+        :param str path: Path to the file
+        :returns: Path to the stored object
+        """
+        if path in self._objects:
+            return self._objects[path]
+
+        size = os.path.getsize(path)
+        object_path = os.path.join(self.directory, file_digest(path).hex())
+        self.report["files"] += 1
+        self.report["bytes-before"] += size
+        if not os.path.exists(object_path):
+            self.report["objects"] += 1
+            self.report["bytes-stored"] += size
+            if self.move:
+                os.replace(path, object_path)
+            else:
+                shutil.copyfile(path, object_path)
+        elif self.move and os.path.abspath(path) != os.path.abspath(object_path):
+            os.remove(path)
+            self.report["bytes-saved"] += size
+
+        self._objects[path] = object_path
+        return object_path
+
+
+def dedup_manifest(manifest_filename, output_filename, objects_directory, move=False, indent=None):
+    """Rewrite an AWS Encryption SDK message decryption manifest so that all tests with identical
+    ciphertexts or plaintexts refer to a single shared content-addressed file.
+
+    :param str manifest_filename: Name of file containing the decrypt manifest
+    :param str output_filename: Name of file to which to write the rewritten manifest
+    :param str objects_directory: Directory in which to store the content-addressed files
+    :param bool move: Whether to move files rather than copy them, removing duplicates
+    :param int indent: Indentation width, or None for compact output
+    :returns: Report of the files referenced, the objects and bytes stored, and the bytes freed by this run
+    :rtype: dict
+    """
+    base_directory = os.path.dirname(os.path.abspath(manifest_filename))
+    output_directory = os.path.dirname(os.path.abspath(output_filename))
+    os.makedirs(objects_directory, exist_ok=True)
+    store = _BlobStore(objects_directory, move)
+
+    with open_manifest(manifest_filename) as (header, tests):
+        if header["manifest"]["type"] != "awses-decrypt":
+            raise ValueError('Unsupported manifest type: "{}"'.format(header["manifest"]["type"]))
+
+        manifest = dict(header, tests={})
+        manifest["keys"] = file_uri(resolve_uri(header["keys"], base_directory), output_directory)
+        for name, test in tests:
+            test["ciphertext"] = file_uri(store.add(resolve_uri(test["ciphertext"], base_directory)), output_directory)
+            if "result" not in test:
+                # Version 1 test cases always succeed, and name their plaintext directly
+                test["plaintext"] = file_uri(
+                    store.add(resolve_uri(test["plaintext"], base_directory)), output_directory
+                )
+            elif "output" in test["result"]:
+                output = test["result"]["output"]
+                output["plaintext"] = file_uri(
+                    store.add(resolve_uri(output["plaintext"], base_directory)), output_directory
+                )
+            manifest["tests"][name] = test
+
+    with open(output_filename, "w") as output_file:
+        json.dump(manifest, output_file, indent=indent)
+
+    return store.report